@@ -0,0 +1,30 @@
+"""add IRT ability to user_progress and calibrated parameters to questions
+
+Revision ID: 1b6d4e9f3a72
+Revises: f7b3d9e2a615
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '1b6d4e9f3a72'
+down_revision = 'f7b3d9e2a615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('questions', sa.Column('irt_difficulty', sa.Float(), nullable=True))
+    op.add_column('questions', sa.Column('irt_discrimination', sa.Float(), nullable=True))
+    op.add_column('user_progress', sa.Column('ability', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('user_progress', sa.Column('ability_var', sa.Float(), nullable=False, server_default='1'))
+    # Seed abilities from the old +-1 rule so returning students do not restart at the middle
+    op.execute("UPDATE user_progress SET ability = (COALESCE(current_difficulty, 3) - 3.5) * 0.8")
+
+
+def downgrade() -> None:
+    op.drop_column('user_progress', 'ability_var')
+    op.drop_column('user_progress', 'ability')
+    op.drop_column('questions', 'irt_discrimination')
+    op.drop_column('questions', 'irt_difficulty')
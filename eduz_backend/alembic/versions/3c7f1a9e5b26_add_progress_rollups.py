@@ -0,0 +1,38 @@
+"""add progress_rollups table for dashboards
+
+Revision ID: 3c7f1a9e5b26
+Revises: 6e4b2d8f0a35
+Create Date: 2026-10-18 00:00:00.000000
+
+Fill it with `python -m app.db.rebuild_rollups` after upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3c7f1a9e5b26'
+down_revision = '6e4b2d8f0a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'progress_rollups',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('scope', sa.String(), primary_key=True),
+        sa.Column('scope_id', sa.Integer(), primary_key=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('questions', sa.Integer(), nullable=False),
+        sa.Column('correct', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Integer(), nullable=False),
+        sa.Column('last_activity_at', sa.DateTime(), nullable=False),
+        sa.Column('streak_start_day', sa.Integer(), nullable=False),
+        sa.Column('last_active_day', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_progress_rollups_scope', 'progress_rollups', ['scope', 'scope_id', 'user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_progress_rollups_scope', table_name='progress_rollups')
+    op.drop_table('progress_rollups')
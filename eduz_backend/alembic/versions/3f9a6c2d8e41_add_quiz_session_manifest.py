@@ -0,0 +1,22 @@
+"""add manifest to quiz_sessions
+
+Revision ID: 3f9a6c2d8e41
+Revises: b7f3c9a1d2e3
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3f9a6c2d8e41'
+down_revision = 'b7f3c9a1d2e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quiz_sessions', sa.Column('manifest', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('quiz_sessions', 'manifest')
@@ -0,0 +1,33 @@
+"""add question_scope_moves so delta sync can report questions leaving a scope
+
+Revision ID: 5b9e3f1c7a28
+Revises: 8d2a6c4e7f13
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5b9e3f1c7a28'
+down_revision = '8d2a6c4e7f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'question_scope_moves',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id'), nullable=False),
+        sa.Column('old_topic_id', sa.Integer(), nullable=True),
+        sa.Column('old_subject_id', sa.Integer(), nullable=True),
+        sa.Column('old_level', sa.String(), nullable=True),
+    )
+    # Moves made before this revision are not known: devices synced to a re-tagged scope need a full resync
+    op.create_index('ix_question_scope_moves_change_seq', 'question_scope_moves', ['change_seq'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_question_scope_moves_change_seq', table_name='question_scope_moves')
+    op.drop_table('question_scope_moves')
@@ -0,0 +1,23 @@
+"""add answer_key to questions
+
+Revision ID: 5c1e7a9b3d20
+Revises: 3f9a6c2d8e41
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9b3d20'
+down_revision = '3f9a6c2d8e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Populated for existing rows by `python -m app.db.backfill_answer_keys`
+    op.add_column('questions', sa.Column('answer_key', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('questions', 'answer_key')
@@ -0,0 +1,99 @@
+"""move graded answers from quiz_sessions.responses into a quiz_responses table
+
+Revision ID: 6e4b2d8f0a35
+Revises: d8e2f6a4c159
+Create Date: 2026-10-18 00:00:00.000000
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '6e4b2d8f0a35'
+down_revision = 'd8e2f6a4c159'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+quiz_sessions = sa.table(
+    'quiz_sessions',
+    sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('ended_at', sa.DateTime),
+    sa.column('responses', sa.JSON),
+)
+quiz_responses = sa.table(
+    'quiz_responses',
+    sa.column('session_id', sa.Integer), sa.column('question_id', sa.Integer), sa.column('user_id', sa.Integer),
+    sa.column('selected', sa.String), sa.column('correct', sa.Boolean), sa.column('time_ms', sa.Integer),
+    sa.column('answered_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'quiz_responses',
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('quiz_sessions.id'), primary_key=True),
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id'), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('selected', sa.String(), nullable=True),
+        sa.Column('correct', sa.Boolean(), nullable=False),
+        sa.Column('time_ms', sa.Integer(), nullable=True),
+        sa.Column('answered_at', sa.DateTime(), nullable=False),
+    )
+
+    # Backfill from the JSON column in keyset batches
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        sessions = conn.execute(
+            sa.select(quiz_sessions.c.id, quiz_sessions.c.user_id, quiz_sessions.c.ended_at, quiz_sessions.c.responses)
+            .where(quiz_sessions.c.id > last_id, quiz_sessions.c.responses.isnot(None),
+                   quiz_sessions.c.ended_at.isnot(None))
+            .order_by(quiz_sessions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not sessions:
+            break
+        rows = []
+        for s in sessions:
+            responses = json.loads(s.responses) if isinstance(s.responses, str) else s.responses
+            rows.extend(
+                {"session_id": s.id, "question_id": r["question_id"], "user_id": s.user_id,
+                 "selected": r.get("selected"), "correct": bool(r["correct"]), "time_ms": r.get("time_ms"),
+                 "answered_at": s.ended_at}
+                for r in responses or ()
+            )
+        if rows:
+            conn.execute(sa.insert(quiz_responses), rows)
+        last_id = sessions[-1].id
+
+    op.create_index('ix_quiz_responses_question', 'quiz_responses', ['question_id', 'answered_at'])
+    op.create_index('ix_quiz_responses_user', 'quiz_responses', ['user_id', 'answered_at'])
+    with op.batch_alter_table('quiz_sessions') as batch:
+        batch.drop_column('responses')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('quiz_sessions') as batch:
+        batch.add_column(sa.Column('responses', sa.JSON(), nullable=True))
+
+    questions = sa.table('questions', sa.column('id', sa.Integer), sa.column('difficulty', sa.Integer))
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(quiz_responses.c.session_id, quiz_responses.c.question_id, questions.c.difficulty,
+                  quiz_responses.c.correct, quiz_responses.c.selected, quiz_responses.c.time_ms)
+        .join(questions, questions.c.id == quiz_responses.c.question_id)
+        .order_by(quiz_responses.c.session_id)
+    )
+    by_session = {}
+    for r in rows:
+        by_session.setdefault(r.session_id, []).append(
+            {"question_id": r.question_id, "difficulty": r.difficulty, "correct": r.correct,
+             "selected": r.selected, "time_ms": r.time_ms})
+    for session_id, responses in by_session.items():
+        conn.execute(quiz_sessions.update().where(quiz_sessions.c.id == session_id).values(responses=responses))
+
+    op.drop_index('ix_quiz_responses_user', table_name='quiz_responses')
+    op.drop_index('ix_quiz_responses_question', table_name='quiz_responses')
+    op.drop_table('quiz_responses')
@@ -0,0 +1,33 @@
+"""add task_outbox table for background tasks
+
+Revision ID: 8d2a6c4e7f13
+Revises: 3c7f1a9e5b26
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8d2a6c4e7f13'
+down_revision = '3c7f1a9e5b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.String(), nullable=True),
+    )
+    op.create_index('ix_task_outbox_available', 'task_outbox', ['available_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_outbox_available', table_name='task_outbox')
+    op.drop_table('task_outbox')
@@ -0,0 +1,37 @@
+"""add change_seq to content tables and the change_counter table
+
+Revision ID: 8d2b4f6a1c73
+Revises: 5c1e7a9b3d20
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8d2b4f6a1c73'
+down_revision = '5c1e7a9b3d20'
+branch_labels = None
+depends_on = None
+
+CONTENT_TABLES = ('subjects', 'branches', 'topics', 'questions')
+
+
+def upgrade() -> None:
+    counter = op.create_table(
+        'change_counter',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+    )
+    # Existing rows all become change 1, so a client syncing from 0 receives everything
+    op.bulk_insert(counter, [{'id': 1, 'value': 1}])
+    for table in CONTENT_TABLES:
+        op.add_column(table, sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default='0'))
+        op.execute(f"UPDATE {table} SET change_seq = 1")
+        op.create_index(f'ix_{table}_change_seq', table, ['change_seq'])
+
+
+def downgrade() -> None:
+    for table in CONTENT_TABLES:
+        op.drop_index(f'ix_{table}_change_seq', table_name=table)
+        op.drop_column(table, 'change_seq')
+    op.drop_table('change_counter')
@@ -0,0 +1,32 @@
+"""add the review_items spaced-repetition queue
+
+Revision ID: 9a3c5e7b1d48
+Revises: 1b6d4e9f3a72
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9a3c5e7b1d48'
+down_revision = '1b6d4e9f3a72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'review_items',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id'), primary_key=True),
+        sa.Column('due_at', sa.DateTime(), nullable=False),
+        sa.Column('interval_days', sa.Float(), nullable=False),
+        sa.Column('reps', sa.Integer(), nullable=False),
+        sa.Column('lapses', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_review_items_user_due', 'review_items', ['user_id', 'due_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_review_items_user_due', table_name='review_items')
+    op.drop_table('review_items')
@@ -0,0 +1,25 @@
+"""add client_key to quiz_sessions for idempotent offline result uploads
+
+Revision ID: a4e8c2f1b956
+Revises: 8d2b4f6a1c73
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8c2f1b956'
+down_revision = '8d2b4f6a1c73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quiz_sessions', sa.Column('client_key', sa.String(), nullable=True))
+    # Sessions started online keep client_key NULL, which the unique index ignores
+    op.create_index('uq_quiz_sessions_user_client_key', 'quiz_sessions', ['user_id', 'client_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_quiz_sessions_user_client_key', table_name='quiz_sessions')
+    op.drop_column('quiz_sessions', 'client_key')
@@ -0,0 +1,33 @@
+"""add content_hash and duplicate_of to questions
+
+Revision ID: c2d7e5a3f184
+Revises: a4e8c2f1b956
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c2d7e5a3f184'
+down_revision = 'a4e8c2f1b956'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # batch mode: SQLite cannot ALTER TABLE ADD COLUMN with a foreign key, so the table is rebuilt there
+    with op.batch_alter_table('questions') as batch:
+        batch.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch.add_column(sa.Column('duplicate_of', sa.Integer(),
+                                   sa.ForeignKey('questions.id', name='fk_questions_duplicate_of'), nullable=True))
+    # Existing rows stay NULL (allowed by the unique index) until
+    # `python -m app.db.dedupe_questions` hashes them and collapses duplicates
+    op.create_index('uq_questions_content_hash', 'questions', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_questions_content_hash', table_name='questions')
+    # Dropping the column drops its foreign key, whatever name it was created with
+    with op.batch_alter_table('questions') as batch:
+        batch.drop_column('duplicate_of')
+        batch.drop_column('content_hash')
@@ -0,0 +1,43 @@
+"""add question_stats, job_state and quiz_sessions.submitted_at
+
+Revision ID: d8e2f6a4c159
+Revises: 9a3c5e7b1d48
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd8e2f6a4c159'
+down_revision = '9a3c5e7b1d48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quiz_sessions', sa.Column('submitted_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE quiz_sessions SET submitted_at = ended_at WHERE ended_at IS NOT NULL")
+    op.create_index('ix_quiz_sessions_submitted_at', 'quiz_sessions', ['submitted_at'])
+    op.create_table(
+        'question_stats',
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id'), primary_key=True),
+        sa.Column('responses', sa.Integer(), nullable=False),
+        sa.Column('p_value', sa.Float(), nullable=True),
+        sa.Column('discrimination', sa.Float(), nullable=True),
+        sa.Column('median_time_ms', sa.Integer(), nullable=True),
+        sa.Column('option_counts', sa.JSON(), nullable=False),
+        sa.Column('totals', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        'job_state',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('watermark', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_state')
+    op.drop_table('question_stats')
+    op.drop_index('ix_quiz_sessions_submitted_at', table_name='quiz_sessions')
+    op.drop_column('quiz_sessions', 'submitted_at')
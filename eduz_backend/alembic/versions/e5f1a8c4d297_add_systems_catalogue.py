@@ -0,0 +1,32 @@
+"""add the systems catalogue table
+
+Revision ID: e5f1a8c4d297
+Revises: c2d7e5a3f184
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5f1a8c4d297'
+down_revision = 'c2d7e5a3f184'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'systems',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('question_count', sa.Integer(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO systems (name, question_count) "
+        "SELECT systems, COUNT(*) FROM questions "
+        "WHERE systems IS NOT NULL AND systems <> '' AND duplicate_of IS NULL "
+        "GROUP BY systems"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('systems')
@@ -0,0 +1,38 @@
+"""add composite and partial indexes for quiz selection, listings, packs and sync
+
+Revision ID: f7b3d9e2a615
+Revises: e5f1a8c4d297
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f7b3d9e2a615'
+down_revision = 'e5f1a8c4d297'
+branch_labels = None
+depends_on = None
+
+APPROVED = {'postgresql_where': sa.text('approved = true'), 'sqlite_where': sa.text('approved = 1')}
+
+
+def upgrade() -> None:
+    op.create_index('ix_subjects_level', 'subjects', ['level'])
+    op.create_index('ix_branches_subject_id', 'branches', ['subject_id'])
+    op.create_index('ix_topics_subject_id', 'topics', ['subject_id'])
+    op.create_index('ix_questions_approved_id', 'questions', ['approved', 'id'])
+    op.create_index('ix_questions_topic_id', 'questions', ['topic_id', 'id'])
+    op.create_index('ix_questions_approved_topic_difficulty', 'questions', ['topic_id', 'difficulty', 'id'], **APPROVED)
+    op.create_index('ix_questions_approved_branch_difficulty', 'questions', ['branch_id', 'difficulty', 'id'], **APPROVED)
+    op.create_index('ix_quiz_sessions_user_id', 'quiz_sessions', ['user_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_quiz_sessions_user_id', table_name='quiz_sessions')
+    op.drop_index('ix_questions_approved_branch_difficulty', table_name='questions')
+    op.drop_index('ix_questions_approved_topic_difficulty', table_name='questions')
+    op.drop_index('ix_questions_topic_id', table_name='questions')
+    op.drop_index('ix_questions_approved_id', table_name='questions')
+    op.drop_index('ix_topics_subject_id', table_name='topics')
+    op.drop_index('ix_branches_subject_id', table_name='branches')
+    op.drop_index('ix_subjects_level', table_name='subjects')
@@ -0,0 +1,63 @@
+# app/api/packs.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.core import packs
+from app.core.auth import require_role
+from app.core.database import get_db
+
+router = APIRouter()
+
+
+def _serve_pack(request: Request, db: Session, scope: str, scope_id, fmt: str):
+    try:
+        info = packs.get_pack(db, scope, scope_id, fmt)
+    except packs.PackScopeNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{scope.capitalize()} not found.")
+    headers = {
+        "ETag": info.etag,
+        "X-Pack-Version": info.version,
+        # Devices must revalidate, which costs a 304 when nothing changed
+        "Cache-Control": "private, no-cache",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and info.etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # FileResponse handles Range / If-Range, so interrupted downloads can resume
+    return FileResponse(
+        info.path,
+        media_type="application/gzip",
+        filename=f"eduz-{scope}-{scope_id}-{info.version}.{packs.PACK_FORMATS[fmt]}",
+        headers=headers,
+    )
+
+
+@router.get("/levels/{level}", dependencies=[Depends(require_role("student", "teacher", "admin"))])
+def download_level_pack(
+    level: str,
+    request: Request,
+    format: str = Query("json", pattern="^(json|sqlite)$"),
+    db: Session = Depends(get_db),
+):
+    return _serve_pack(request, db, "level", level, format)
+
+
+@router.get("/subjects/{subject_id}", dependencies=[Depends(require_role("student", "teacher", "admin"))])
+def download_subject_pack(
+    subject_id: int,
+    request: Request,
+    format: str = Query("json", pattern="^(json|sqlite)$"),
+    db: Session = Depends(get_db),
+):
+    return _serve_pack(request, db, "subject", subject_id, format)
+
+
+@router.get("/topics/{topic_id}", dependencies=[Depends(require_role("student", "teacher", "admin"))])
+def download_topic_pack(
+    topic_id: int,
+    request: Request,
+    format: str = Query("json", pattern="^(json|sqlite)$"),
+    db: Session = Depends(get_db),
+):
+    return _serve_pack(request, db, "topic", topic_id, format)
@@ -0,0 +1,68 @@
+# app/api/progress.py
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Path, Query, Response
+from sqlalchemy.orm import Session
+
+from app.core.auth import Principal, require_role
+from app.core.database import get_read_db, db_handler
+from app.core.pagination import keyset_page
+from app.core.rollups import progress_out
+from app.models import ProgressRollup, User
+from app.schemas import ClassProgressRow, ProgressOut
+
+router = APIRouter()
+
+SCOPE_PATTERN = "^(subject|branch|topic)$"
+ROLLUP_COLUMNS = (
+    ProgressRollup.user_id, ProgressRollup.scope, ProgressRollup.scope_id, ProgressRollup.attempts,
+    ProgressRollup.questions, ProgressRollup.correct, ProgressRollup.score_sum, ProgressRollup.last_activity_at,
+    ProgressRollup.streak_start_day, ProgressRollup.last_active_day,
+)
+
+
+@router.get(
+    "/me",
+    response_model=List[ProgressOut],
+    dependencies=[Depends(require_role("student", "teacher", "admin"))]
+)
+@db_handler
+def my_progress(
+    scope: str = Query("subject", pattern=SCOPE_PATTERN),
+    scope_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_role("student", "teacher", "admin")),
+):
+    """
+    The logged-in student's progress per subject, branch or topic (or in one of them with `scope_id`).
+    """
+    query = db.query(*ROLLUP_COLUMNS).filter(ProgressRollup.user_id == current_user.id, ProgressRollup.scope == scope)
+    if scope_id is not None:
+        query = query.filter(ProgressRollup.scope_id == scope_id)
+    return [progress_out(r._mapping) for r in query.order_by(ProgressRollup.scope_id)]
+
+
+@router.get(
+    "/{scope}/{scope_id}/students",
+    response_model=List[ClassProgressRow],
+    dependencies=[Depends(require_role("teacher", "admin"))]
+)
+@db_handler
+def class_progress(
+    response: Response,
+    scope: str = Path(..., pattern=SCOPE_PATTERN),
+    scope_id: int = Path(...),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Class overview: progress of every student who took a quiz in the scope, by user id.
+    """
+    query = (
+        db.query(*ROLLUP_COLUMNS, User.name)
+        .join(User, User.id == ProgressRollup.user_id)
+        .filter(ProgressRollup.scope == scope, ProgressRollup.scope_id == scope_id)
+    )
+    rows = keyset_page(query, ProgressRollup.user_id, cursor, limit, response)
+    return [dict(progress_out(r), user_id=r["user_id"], name=r["name"]) for r in rows]
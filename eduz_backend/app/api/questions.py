@@ -1,28 +1,110 @@
+import csv
+import io
 import json
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.schemas import QuestionCreate, QuestionOut, BranchOut, TopicOut
 from app.schemas import TopicCreate, BranchCreate
-from app.schemas import SubjectCreate, SubjectOut
-from app.models import Question, Topic, Branch, Subject
-from app.core.database import get_db
+from app.schemas import SubjectCreate, SubjectOut, QuestionImportReport
+from app.schemas import QuestionStatsOut, QuestionStatsRow
+from app.models import Question, QuestionStats, Topic, Branch, Subject
+from app.core.database import get_db, get_read_db, db_handler
 from app.core.auth import require_role
-from typing import List
+from app.core import packs
+from app.core.answer_keys import answer_key_cache
+from app.core.importer import ImportFormatError, detect_format, import_questions
+from app.core.item_stats import flags
+from app.core.pagination import keyset_page, page_limit
+from app.core.question_index import question_index
+from app.core.taxonomy import taxonomy_cache
+from typing import List, Optional
 
 router = APIRouter()
 
-# Get all unique systems from questions
+# Listings select only the QuestionOut columns, so rows skip ORM hydration
+QUESTION_LIST_COLUMNS = (
+    Question.id, Question.question_text, Question.options, Question.correct_option,
+    Question.topic_id, Question.branch_id, Question.created_by, Question.approved, Question.difficulty,
+)
+
+
+EXPORT_COLUMNS = QUESTION_LIST_COLUMNS + (Question.systems,)
+EXPORT_BATCH_SIZE = 2000
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _filter_questions(query, topic_id=None, branch_id=None, difficulty=None, systems=None):
+    if topic_id is not None:
+        query = query.filter(Question.topic_id == topic_id)
+    if branch_id is not None:
+        query = query.filter(Question.branch_id == branch_id)
+    if difficulty is not None:
+        query = query.filter(Question.difficulty == difficulty)
+    if systems:
+        query = query.filter(Question.systems == systems)
+    return query
+
+
+def _question_page(db, approved, response, cursor, limit, topic_id, branch_id, difficulty, systems):
+    query = db.query(*QUESTION_LIST_COLUMNS).filter(Question.approved == approved)
+    query = _filter_questions(query, topic_id, branch_id, difficulty, systems)
+    return keyset_page(query, Question.id, cursor, limit, response)
+
+
+def iter_export(bind, fmt="ndjson", approved=None, **filters):
+    """Yield the matching questions as NDJSON lines or CSV, a batch of rows per chunk.
+
+    Runs on its own Session so the stream is not tied to the request's session,
+    and reads through a server-side cursor (stream_results + yield_per), so memory
+    stays flat however large the bank is.
+    """
+    with Session(bind=bind) as db:
+        query = _filter_questions(db.query(*EXPORT_COLUMNS), **filters)
+        if approved is not None:
+            query = query.filter(Question.approved == approved)
+        rows = query.order_by(Question.id).execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        names = [c.key for c in EXPORT_COLUMNS]
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer:
+            writer.writerow(names)
+        for i, row in enumerate(rows, 1):
+            if writer:
+                writer.writerow([json.dumps(v) if k == "options" else v for k, v in zip(names, row)])
+            else:
+                buf.write(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n")
+            if i % EXPORT_BATCH_SIZE == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+def _taxonomy_response(request: Request, db: Session, view):
+    """Serve a cached taxonomy view, or 304 if the client's ETag still matches."""
+    body, etag = taxonomy_cache.get(db).body(view)
+    # Clients may keep the response but must revalidate, which costs a 304 when nothing changed
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Get all unique systems from questions (read from the systems catalogue)
 @router.get("/systems", response_model=list)
-def get_systems(db: Session = Depends(get_db)):
-    systems = db.query(Question.systems).filter(Question.systems != None).filter(Question.systems != '').distinct().all()
-    return [s[0] for s in systems if s[0]]
+@db_handler
+def get_systems(request: Request, db: Session = Depends(get_read_db)):
+    return _taxonomy_response(request, db, "systems")
 
 @router.post(
     "/",
     response_model=QuestionOut,
     dependencies=[Depends(require_role("teacher", "admin"))]
 )
+@db_handler
 def create_question(
     payload: QuestionCreate,
     db: Session = Depends(get_db),
@@ -45,71 +127,185 @@ def create_question(
         approved=False,
         difficulty=payload.difficulty 
     )
+    existing = db.query(Question.id).filter(Question.content_hash == q.content_hash).first()
+    if existing:
+        raise HTTPException(status_code=409, detail=f"Duplicate of question {existing.id}")
     db.add(q)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with an identical question on the content_hash unique index
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Duplicate question")
     db.refresh(q)
+    # New questions start unapproved, so this is a no-op until approve_question runs
+    question_index.add(db, q)
+    taxonomy_cache.note_system(q.systems)
 
     # Options are already in the correct format (JSONB)
     return q
 
+# Approve a question so it can be served in quizzes
+@router.post(
+    "/{question_id}/approve",
+    response_model=QuestionOut,
+    dependencies=[Depends(require_role("teacher", "admin"))]
+)
+@db_handler
+def approve_question(question_id: int, db: Session = Depends(get_db)):
+    q = db.query(Question).filter(Question.id == question_id).first()
+    if not q:
+        raise HTTPException(status_code=404, detail="Question not found")
+    if not q.approved:
+        q.approved = True
+        db.commit()
+        db.refresh(q)
+        # Keep the quiz selection index in sync without a full rebuild
+        question_index.add(db, q)
+        packs.invalidate()
+    return q
+
+# Withdraw a question from quizzes; synced devices drop it on their next delta
+@router.post(
+    "/{question_id}/unapprove",
+    response_model=QuestionOut,
+    dependencies=[Depends(require_role("teacher", "admin"))]
+)
+@db_handler
+def unapprove_question(question_id: int, db: Session = Depends(get_db)):
+    q = db.query(Question).filter(Question.id == question_id).first()
+    if not q:
+        raise HTTPException(status_code=404, detail="Question not found")
+    if q.approved:
+        q.approved = False
+        db.commit()
+        db.refresh(q)
+        question_index.discard(db, q)
+        packs.invalidate()
+    return q
+
 # List all approved questions for students and teachers and Admins
 @router.get(
     "/",
     response_model=List[QuestionOut],
     dependencies=[Depends(require_role("student", "teacher", "admin"))]
 )
-def list_questions(db: Session = Depends(get_db)):
-    questions = db.query(Question).filter(Question.approved == True).all()
-    return questions
+@db_handler
+def list_questions(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1),
+    topic_id: Optional[int] = None,
+    branch_id: Optional[int] = None,
+    difficulty: Optional[int] = Query(None, ge=1, le=6),
+    systems: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    return _question_page(db, True, response, cursor, limit, topic_id, branch_id, difficulty, systems)
+
+# Stream the whole bank (or a filtered part of it) for review and backup
+@router.get("/export", dependencies=[Depends(require_role("teacher", "admin"))])
+def export_questions(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    approved: Optional[bool] = None,
+    topic_id: Optional[int] = None,
+    branch_id: Optional[int] = None,
+    difficulty: Optional[int] = Query(None, ge=1, le=6),
+    systems: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    stream = iter_export(db.get_bind(), format, approved, topic_id=topic_id, branch_id=branch_id,
+                         difficulty=difficulty, systems=systems)
+    filename = f"questions.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(stream, media_type=EXPORT_FORMATS[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# Bulk upload from the admin dashboard; imported questions start unapproved
+@router.post(
+    "/import",
+    response_model=QuestionImportReport,
+    dependencies=[Depends(require_role("teacher", "admin"))]
+)
+def import_questions_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson|json)$"),
+    on_duplicate: str = Query("skip", pattern="^(skip|merge)$"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("teacher", "admin")),
+):
+    """
+    Imports questions from a CSV, NDJSON or JSON-array upload. Topics and branches
+    may be given by id (topic_id, branch_id) or by name (topic, branch, plus subject
+    to disambiguate). Rows failing validation are skipped and listed in the report.
+    Rows duplicating an existing question are skipped, or with on_duplicate=merge
+    update its answer, taxonomy and difficulty.
+    """
+    try:
+        fmt = detect_format(file.filename, format)
+        report = import_questions(db, file.file, fmt, created_by=current_user.id, on_duplicate=on_duplicate)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if report["imported"] or report["duplicates"]:
+        # New rows may introduce systems the taxonomy cache does not list yet
+        taxonomy_cache.invalidate()
+    if on_duplicate == "merge" and report["duplicates"]:
+        # Merged rows may be approved questions already indexed and packed
+        question_index.invalidate()
+        packs.invalidate()
+        answer_key_cache.clear()
+    return report
 
 # List all subjects
 @router.get("/subjects", response_model=List[SubjectOut])
-def list_subjects(db: Session = Depends(get_db)):
-    # Query only the columns we expect to exist in older schemas (id, name, level)
-    rows = db.query(Subject.id, Subject.name, Subject.level).all()
-    # Convert to list of dicts compatible with SubjectOut
-    return [
-        {"id": r[0], "name": r[1], "level": r[2]}
-        for r in rows
-    ]
+@db_handler
+def list_subjects(request: Request, db: Session = Depends(get_read_db)):
+    return _taxonomy_response(request, db, "subjects")
 
 # List all topics
 @router.get("/topics", response_model=List[TopicOut])
-def list_topics(db: Session = Depends(get_db)):
-    return db.query(Topic).all()
+@db_handler
+def list_topics(request: Request, db: Session = Depends(get_read_db)):
+    return _taxonomy_response(request, db, "topics")
 
 # List all branches
 @router.get("/branches", response_model=List[BranchOut])
-def list_branches(db: Session = Depends(get_db)):
-    return db.query(Branch).all()
+@db_handler
+def list_branches(request: Request, db: Session = Depends(get_read_db)):
+    return _taxonomy_response(request, db, "branches")
 
 
 # Add new subject
 @router.post("/subjects", response_model=SubjectOut, dependencies=[Depends(require_role("teacher", "admin"))])
+@db_handler
 def create_subject(payload: SubjectCreate, db: Session = Depends(get_db)):
     subject = Subject(name=payload.name, level=payload.level)
     db.add(subject)
     db.commit()
     db.refresh(subject)
+    taxonomy_cache.invalidate()
     return subject
 
 # Add new topic
 @router.post("/topics", response_model=TopicOut, dependencies=[Depends(require_role("teacher", "admin"))])
+@db_handler
 def create_topic(payload: TopicCreate, db: Session = Depends(get_db)):
     topic = Topic(name=payload.name, subject_id=payload.subject_id, branch_id=payload.branch_id)
     # Optionally store level in the topic if your Topic model supports it, or just accept it for filtering/logic
     db.add(topic)
     db.commit()
     db.refresh(topic)
+    taxonomy_cache.invalidate()
     return topic
 
 # Add new branch
 @router.post("/branches", response_model=BranchOut, dependencies=[Depends(require_role("teacher", "admin"))])
+@db_handler
 def create_branch(payload: BranchCreate, db: Session = Depends(get_db)):
     branch = Branch(name=payload.name, subject_id=payload.subject_id)
     db.add(branch)
     db.commit()
     db.refresh(branch)
+    taxonomy_cache.invalidate()
     return branch
 # Teacher and Admin can see all questions, including unapproved ones
 @router.get(
@@ -117,21 +313,102 @@ def create_branch(payload: BranchCreate, db: Session = Depends(get_db)):
     response_model=List[QuestionOut],
     dependencies=[Depends(require_role("teacher", "admin"))]
 )
-def list_unapproved(db: Session = Depends(get_db)):
-    questions = db.query(Question).filter(Question.approved == False).all()
-    for q in questions:
-        q.options = json.loads(q.options)
-    return questions
+@db_handler
+def list_unapproved(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1),
+    topic_id: Optional[int] = None,
+    branch_id: Optional[int] = None,
+    difficulty: Optional[int] = Query(None, ge=1, le=6),
+    systems: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    # options is a JSON column and already comes back as a list
+    return _question_page(db, False, response, cursor, limit, topic_id, branch_id, difficulty, systems)
+
+STATS_SORT_COLUMNS = {
+    "p_value": QuestionStats.p_value,
+    "discrimination": QuestionStats.discrimination,
+    "responses": QuestionStats.responses,
+    "median_time_ms": QuestionStats.median_time_ms,
+}
+
+# Teacher report: questions ranked by an item statistic, e.g. hardest or least discriminating first
+@router.get(
+    "/stats",
+    response_model=List[QuestionStatsRow],
+    dependencies=[Depends(require_role("teacher", "admin"))]
+)
+@db_handler
+def question_stats_report(
+    sort: str = Query("discrimination", pattern="^(p_value|discrimination|responses|median_time_ms)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    min_responses: int = Query(20, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    topic_id: Optional[int] = None,
+    branch_id: Optional[int] = None,
+    difficulty: Optional[int] = Query(None, ge=1, le=6),
+    systems: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    column = STATS_SORT_COLUMNS[sort]
+    query = (
+        db.query(QuestionStats.question_id, Question.question_text, Question.topic_id, Question.difficulty,
+                 QuestionStats.responses, QuestionStats.p_value, QuestionStats.discrimination,
+                 QuestionStats.median_time_ms)
+        .join(Question, Question.id == QuestionStats.question_id)
+        .filter(QuestionStats.responses >= min_responses)
+    )
+    query = _filter_questions(query, topic_id, branch_id, difficulty, systems)
+    # Questions without a value for the statistic go last either way
+    query = query.order_by(column.is_(None), column.asc() if order == "asc" else column.desc(),
+                           QuestionStats.question_id)
+    return [
+        dict(r._mapping, flags=flags(r.p_value, r.discrimination))
+        for r in query.limit(page_limit(limit))
+    ]
+
+@router.get(
+    "/{question_id}/stats",
+    response_model=QuestionStatsOut,
+    dependencies=[Depends(require_role("teacher", "admin"))]
+)
+@db_handler
+def get_question_stats(question_id: int, db: Session = Depends(get_read_db)):
+    row = (
+        db.query(QuestionStats, Question.options)
+        .join(Question, Question.id == QuestionStats.question_id)
+        .filter(QuestionStats.question_id == question_id)
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="No statistics for this question yet")
+    stats, options = row
+    counts = stats.option_counts
+    return {
+        "question_id": stats.question_id,
+        "responses": stats.responses,
+        "p_value": stats.p_value,
+        "discrimination": stats.discrimination,
+        "median_time_ms": stats.median_time_ms,
+        "options": [{"option": option, "count": count} for option, count in zip(options, counts[:-1])],
+        "other": counts[-1],
+        "flags": flags(stats.p_value, stats.discrimination),
+        "updated_at": stats.updated_at,
+    }
 
 @router.get("/subjects/by_level/{level}", response_model=List[SubjectOut])
-def get_subjects_by_level(level: str, db: Session = Depends(get_db)):
-    rows = db.query(Subject.id, Subject.name, Subject.level).filter(Subject.level == level).all()
-    return [{"id": r[0], "name": r[1], "level": r[2]} for r in rows]
+@db_handler
+def get_subjects_by_level(level: str, request: Request, db: Session = Depends(get_read_db)):
+    return _taxonomy_response(request, db, ("subjects", level))
 
 @router.get("/topics/by_level/{level}", response_model=List[TopicOut])
-def get_topics_by_level(level: str, db: Session = Depends(get_db)):
-    return db.query(Topic).join(Subject).filter(Subject.level == level).all()
+@db_handler
+def get_topics_by_level(level: str, request: Request, db: Session = Depends(get_read_db)):
+    return _taxonomy_response(request, db, ("topics", level))
 
 @router.get("/branches/by_level/{level}", response_model=List[BranchOut])
-def get_branches_by_level(level: str, db: Session = Depends(get_db)):
-    return db.query(Branch).join(Subject).filter(Subject.level == level).all()
\ No newline at end of file
+@db_handler
+def get_branches_by_level(level: str, request: Request, db: Session = Depends(get_read_db)):
+    return _taxonomy_response(request, db, ("branches", level))
\ No newline at end of file
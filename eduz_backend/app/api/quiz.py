@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 import json
-import random
+from collections import defaultdict
 from datetime import datetime
 
-from app.core.database import get_db
-from app.core.auth import require_role
-from app.models import Quiz_session, Question, Subject, Topic, Branch, User,UserProgress
+from app.core.database import get_db, get_read_db, db_handler
+from app.core import tasks
+from app.core.auth import Principal, require_role
+from app.core.answers import answer_key, grade_responses
+from app.core.irt import difficulty_level, item_params, update_ability
+from app.core.question_index import question_index
+from app.core.review import due_reviews, record_reviews, review_quota
+from app.core.rollups import record_rollups
+from app.models import Quiz_session, Question, Subject, Topic, Branch, User,UserProgress, QuizResponse
 from app.schemas import (
     QuizStartRequest,
     QuizQuestionResponse,
@@ -22,70 +28,61 @@ from typing import List, Optional
 
 router = APIRouter()
 
+QUIZ_SUBMITTED = "quiz_submitted"  # task kind, see apply_submissions
+
 @router.post(
     "/start",
     response_model=QuizStartResponse, # Return questions and session id
     dependencies=[Depends(require_role("student","teacher","admin"))]
 )
+@db_handler
 def start_quiz(
     payload: QuizStartRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("student","teacher","admin")) # Ensure current_user is typed
+    current_user: Principal = Depends(require_role("student","teacher","admin"))
 ):
     """
     Starts a new quiz session for the logged-in student.
     Fetches questions based on subject, topic, or branch.
     """
-    questions_query = db.query(Question).filter(Question.approved == True)
-
-    # Join to Subject for level filtering
-    questions_query = questions_query.join(Topic).join(Subject)
-
-    if payload.level:
-        questions_query = questions_query.filter(Subject.level == payload.level)
-
     if payload.subject_id:
-        # Filter by subject and ensure the subject exists
+        # Ensure the subject exists
         subject = db.query(Subject).filter(Subject.id == payload.subject_id).first()
         if not subject:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subject not found.")
-        questions_query = questions_query.filter(Subject.id == payload.subject_id)
+        scope, scope_id = "subject", payload.subject_id
     elif payload.topic_id:
-        # Filter by topic and ensure the topic exists
+        # Ensure the topic exists
         topic = db.query(Topic).filter(Topic.id == payload.topic_id).first()
         if not topic:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Topic not found.")
-        questions_query = questions_query.filter(Question.topic_id == payload.topic_id)
+        scope, scope_id = "topic", payload.topic_id
     elif payload.branch_id:
-        # Filter by branch and ensure the branch exists
+        # Ensure the branch exists
         branch = db.query(Branch).filter(Branch.id == payload.branch_id).first()
         if not branch:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Branch not found.")
-        questions_query = questions_query.filter(Question.branch_id == payload.branch_id)
+        scope, scope_id = "branch", payload.branch_id
     else:
         # This case should ideally be caught by the Pydantic validator, but as a fallback
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Please specify a subject_id, topic_id, or branch_id.")
 
-    # Get all matching questions and shuffle them
-    # difficulty allowed range: 1..6
-    questions_by_difficulty = {d: get_question_for_difficulty(db, questions_query, d) for d in range(1,7)}
-
-    selected_questions = []
-    difficulty = 3
-
-    while len(selected_questions) < payload.num_questions:
-        available = questions_by_difficulty.get(difficulty, [])
-        if available:
-            q = random.choice(available)
-            selected_questions.append(q)
-            questions_by_difficulty[difficulty].remove(q)
-        else:
-            # Fallback: try easier, then harder
-            fallback = [d for d in range(1,6) if questions_by_difficulty.get(d)]
-            if not fallback:
-                break  # no questions left
-            difficulty = min(fallback, key=lambda d: abs(d - difficulty))
-
+    # Start at the difficulty nearest the student's estimated ability, then pick question ids
+    # from the in-memory difficulty buckets and hydrate only the chosen rows with a single IN query.
+    user_progress = db.query(UserProgress).filter_by(user_id=current_user.id).first()
+    start_difficulty = difficulty_level(user_progress.ability) if user_progress else 3
+    question_index.ensure_loaded(db)
+    picked = question_index.sample(scope, scope_id, payload.num_questions, level=payload.level,
+                                   start_difficulty=start_difficulty)
+    question_ids = [qid for qid, _ in picked]
+    if payload.include_reviews:
+        # Due review items come first; sampled questions fill the rest of the quiz
+        review_ids = due_reviews(db, current_user.id, scope, scope_id, review_quota(payload.num_questions),
+                                 level=payload.level)
+        queued = set(review_ids)
+        question_ids = review_ids + [qid for qid in question_ids if qid not in queued]
+        question_ids = question_ids[:payload.num_questions]
+    selected_questions = hydrate_questions(db, question_ids)
 
     if not selected_questions:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Could not retrieve enough questions for the requested number.")
@@ -99,18 +96,10 @@ def start_quiz(
         started_at=datetime.utcnow(),
         total_questions=len(selected_questions),
         score=0, # Initialize score to 0
-        correct_answers=0 # Initialize correct answers to 0
-
+        correct_answers=0, # Initialize correct answers to 0
+        manifest=build_manifest(selected_questions)
     )
 
-    # Always reset at the beginning of a new quiz
-    user_progress = db.query(UserProgress).filter_by(user_id=current_user.id).first()
-    if not user_progress:
-        user_progress = UserProgress(user_id=current_user.id, current_difficulty=3)
-    else:
-        user_progress.current_difficulty = 3   # ✅ reset difficulty each new quiz
-        user_progress.incorrect_streak = 0
-
     db.add(quiz_session)
     db.commit()
     db.refresh(quiz_session)
@@ -129,30 +118,82 @@ def start_quiz(
             )
         )
     
-    # Store the question IDs and options in the session (or a temporary cache if stateful)
-    # For a stateless API, the frontend must manage the questions.
-    # We could theoretically store a JSON of question IDs and their correct answers in the quiz session,
-    # but that's a security risk if the frontend can easily access it.
-    # The safest is to re-fetch/re-verify answers on submission.
-
+    # The answer key stays server-side in quiz_session.manifest; the client only gets questions and options.
     return QuizStartResponse(
             questions=quiz_questions_response,
             quiz_session_id=quiz_session.id
         )
-# Filter questions based on current difficulty
-def get_question_for_difficulty(db, base_query, difficulty):
-    q = base_query.filter(Question.difficulty == difficulty).all()
-    return q
+
+def hydrate_questions(db, question_ids):
+    """Fetch the given approved questions in one query, preserving the order of `question_ids`."""
+    if not question_ids:
+        return []
+    rows = (
+        db.query(Question.id, Question.question_text, Question.options, Question.answer_key, Question.correct_option, Question.difficulty)
+        .filter(Question.id.in_(question_ids), Question.approved == True)
+        .all()
+    )
+    by_id = {r.id: r for r in rows}
+    # Rows unapproved by another worker since the index was built are simply dropped
+    return [by_id[qid] for qid in question_ids if qid in by_id]
+
+def stored_answer_key(q):
+    # answer_key is filled at write time; rows not yet backfilled are normalized on the fly
+    return q.answer_key if q.answer_key is not None else answer_key(q.correct_option)
+
+def build_manifest(questions):
+    """Compact record of what start_quiz served: ordered ids, difficulties and normalized answer keys."""
+    return {
+        "ids": [q.id for q in questions],
+        "difficulty": [q.difficulty for q in questions],
+        "answers": [stored_answer_key(q) for q in questions],
+    }
+
+def grade_answers(db, quiz_session, answers):
+    """Return (responses, correct_count, total_questions) for a submission.
+
+    `responses` has one {"question_id", "difficulty", "correct", "selected", "time_ms"}
+    entry per answered question. Sessions started with a manifest are graded from it alone: answers to
+    questions that were never served are ignored and every served question counts
+    towards the total. Older sessions without a manifest fall back to grading the
+    submitted ids.
+    """
+    manifest = quiz_session.manifest
+    if manifest:
+        expected = {qid: (key, difficulty) for qid, key, difficulty
+                    in zip(manifest["ids"], manifest["answers"], manifest["difficulty"])}
+        total = len(manifest["ids"])
+    else:
+        submitted_question_ids = {answer.question_id for answer in answers}
+        rows = (
+            db.query(Question.id, Question.answer_key, Question.correct_option, Question.difficulty)
+            .filter(Question.id.in_(list(submitted_question_ids)))
+            .all()
+        )
+        expected = {r.id: (stored_answer_key(r), r.difficulty) for r in rows}
+        total = len(answers)
+
+    responses = grade_responses(answers, expected)
+    return responses, sum(r["correct"] for r in responses), total
+
+def response_rows(session_id, user_id, responses, answered_at):
+    """quiz_responses rows for the graded `responses` of one session."""
+    return [
+        {"session_id": session_id, "question_id": r["question_id"], "user_id": user_id,
+         "selected": r["selected"], "correct": r["correct"], "time_ms": r["time_ms"], "answered_at": answered_at}
+        for r in responses
+    ]
 
 @router.post(
     "/submit",
     response_model=QuizResultOut,
     dependencies=[Depends(require_role("student","teacher","admin"))]
 )
+@db_handler
 def submit_quiz(
     payload: QuizSubmissionRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("student", "teacher", "admin"))
+    current_user: Principal = Depends(require_role("student", "teacher", "admin"))
 ):
     """
     Submits a completed quiz session, calculates the score, and records results.
@@ -168,117 +209,87 @@ def submit_quiz(
     if quiz_session.ended_at:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="This quiz session has already been submitted.")
 
-    # Initialize counters
-    correct_answers_count = 0
-    submitted_question_ids = {answer.question_id for answer in payload.answers}
-
-    # Fetch all questions that were part of this quiz session
-    # This requires knowing which questions were presented in the start_quiz response.
-    # A safer approach is to include `question_ids` in `Quiz_session` model or `QuizSubmissionRequest`.
-    # For now, let's assume we fetch all questions from the database and match them.
-    # A more robust solution for tracking quiz questions would be a many-to-many relationship
-    # between Quiz_session and Question, or storing the selected question IDs in the session.
-
-    # For simplicity, let's fetch questions by the submitted IDs.
-    questions_in_quiz = db.query(Question).filter(Question.id.in_(list(submitted_question_ids))).all()
-    questions_map = {q.id: q for q in questions_in_quiz}
-
-    for user_answer in payload.answers:
-        question = questions_map.get(user_answer.question_id)
-
-        if question:
-            # Normalize both stored correct_option and submitted selected_option
-            def _normalize(val):
-                """Return dict with:
-                - raw: normalized single-string (lowercased, whitespace/csv/newline collapsed)
-                - tokens: list of token strings (split by whitespace)
-                - multi: True if multiple tokens present
-                This helper will attempt to decode JSON-encoded string values (e.g. '"a\\nb"')
-                and will strip surrounding quotes if present.
-                """
-                import re, json
-                if val is None:
-                    return {"raw": "", "tokens": [], "multi": False}
-                # If it's not a string, coerce to string
-                if not isinstance(val, str):
-                    val = str(val)
-
-                s = val.strip()
-                # If value looks like a JSON string literal (starts/ends with quotes), try to decode it
-                if (len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'"))):
-                    try:
-                        decoded = json.loads(s)
-                        # json.loads may return a list/number; coerce to string
-                        if not isinstance(decoded, str):
-                            decoded = str(decoded)
-                        val = decoded
-                    except Exception:
-                        # Fall back to stripping surrounding quotes
-                        val = s[1:-1]
-                else:
-                    val = s
-
-                # Replace escaped newlines (literal backslash-n) and real newlines with spaces
-                val = val.replace('\\n', ' ').replace('\n', ' ')
-                # Replace commas with spaces to treat them as separators
-                val = val.replace(',', ' ')
-                # collapse whitespace
-                v = re.sub(r"\s+", ' ', val).strip()
-                tokens = [t.strip() for t in v.split(' ') if t.strip()]
-                return {"raw": v.lower(), "tokens": [t.lower() for t in tokens], "multi": len(tokens) > 1}
-
-            nq = _normalize(question.correct_option)
-            nu = _normalize(user_answer.selected_option)
-            print(f"Debug: Question correct option: {question.correct_option!r} -> {nq}, User selected option: {user_answer.selected_option!r} -> {nu}")
-
-            # If either side is multi-select, compare as sets (order-insensitive)
-            if nq["multi"] or nu["multi"]:
-                if set(nq["tokens"]) == set(nu["tokens"]):
-                    print("Debug: Correct (multi-select) submitted")
-                    correct_answers_count += 1
-            else:
-                # Single-value compare using normalized raw strings
-                if nq["raw"] == nu["raw"]:
-                    print("Debug: Correct answer submitted")
-                    correct_answers_count += 1
-        else:
-            # This indicates an invalid question ID was submitted.
-            # You might want to log this or handle it differently.
-            print(f"Warning: Question ID {user_answer.question_id} not found in database for submission.")
-
-
-    total_questions_answered = len(payload.answers) if payload.answers else 0 # Number of questions the user answered
-
-    # Avoid division by zero
-    score = (correct_answers_count/total_questions_answered) * 100 if total_questions_answered > 0 else 0
+    responses, correct_answers_count, total_questions_answered = grade_answers(db, quiz_session, payload.answers)
+
+    # Avoid division by zero; score is an integer column, so round rather than store a fraction
+    score = round(correct_answers_count / total_questions_answered * 100) if total_questions_answered > 0 else 0
 
     quiz_session.score = score
     quiz_session.correct_answers = correct_answers_count
-    quiz_session.ended_at = datetime.utcnow()
+    quiz_session.ended_at = quiz_session.submitted_at = datetime.utcnow()
     quiz_session.total_questions = total_questions_answered
+    if responses:
+        db.execute(insert(QuizResponse),
+                   response_rows(quiz_session.id, current_user.id, responses, quiz_session.ended_at))
 
     # persist quiz session updates
     db.add(quiz_session)
-
-    # Update or create user progress now that we can compute performance
-    user_progress = db.query(UserProgress).filter_by(user_id=current_user.id).first()
-    if not user_progress:
-        user_progress = UserProgress(user_id=current_user.id, current_difficulty=3)
-    # If user answered at least one question, update difficulty based on performance
-    if total_questions_answered > 0:
-        if (correct_answers_count / total_questions_answered) >= 0.6:
-            user_progress.current_difficulty = min(user_progress.current_difficulty + 1, 6)
-            user_progress.incorrect_streak = 0
-        else:
-            user_progress.current_difficulty = max(user_progress.current_difficulty - 1, 1)
-            user_progress.incorrect_streak = user_progress.incorrect_streak + 1 if user_progress.incorrect_streak is not None else 1
-    db.add(user_progress)
+    # Progress, review queue and rollups are updated shortly after, in batches (see apply_submissions)
+    tasks.enqueue(db, QUIZ_SUBMITTED, [{"quiz_session_id": quiz_session.id}])
 
     db.commit()
+    tasks.dispatch(db)
     db.refresh(quiz_session)
     return build_quiz_result_out(quiz_session)
     # Prepare response using helper
 
+def apply_progress_rule(user_progress, correct, total, responses, params):
+    """Update the student's IRT ability from graded responses; the next quiz starts near it.
+
+    `params` maps question ids to calibrated (b, a), see app.core.irt.item_params.
+    """
+    if total <= 0:
+        return
+    answered = [r for r in responses if r["question_id"] in params]
+    if answered:
+        b, a = zip(*(params[r["question_id"]] for r in answered))
+        ability = user_progress.ability if user_progress.ability is not None else 0.0
+        var = user_progress.ability_var if user_progress.ability_var is not None else 1.0
+        user_progress.ability, user_progress.ability_var = update_ability(
+            ability, var, b, a, [r["correct"] for r in answered]
+        )
+    if user_progress.ability is not None:
+        user_progress.current_difficulty = difficulty_level(user_progress.ability)
+    if (correct / total) >= 0.6:
+        user_progress.incorrect_streak = 0
+    else:
+        user_progress.incorrect_streak = user_progress.incorrect_streak + 1 if user_progress.incorrect_streak is not None else 1
+
+@tasks.handler(QUIZ_SUBMITTED)
+def apply_submissions(db, payloads):
+    """Secondary effects of submitted sessions: ability, review queue and progress rollups.
+
+    Runs on the task worker with the payloads ({"quiz_session_id"}) of a whole
+    batch, so each student's progress row is read and written once per batch.
+    Sessions are applied in ended_at order.
+    """
+    session_ids = [p["quiz_session_id"] for p in payloads]
+    sessions = (
+        db.query(Quiz_session.id, Quiz_session.user_id, Quiz_session.correct_answers,
+                 Quiz_session.total_questions, Quiz_session.ended_at)
+        .filter(Quiz_session.id.in_(session_ids))
+        .order_by(Quiz_session.ended_at, Quiz_session.id)
+        .all()
+    )
+    responses = defaultdict(list)
+    for r in db.query(QuizResponse.session_id, QuizResponse.question_id, QuizResponse.correct) \
+            .filter(QuizResponse.session_id.in_(session_ids)):
+        responses[r.session_id].append({"question_id": r.question_id, "correct": r.correct})
+    params = item_params(db, [r["question_id"] for rs in responses.values() for r in rs])
+
+    by_user = defaultdict(list)
+    for s in sessions:
+        by_user[s.user_id].append(s)
+    progress = {p.user_id: p for p in db.query(UserProgress).filter(UserProgress.user_id.in_(list(by_user)))}
+    for user_id, user_sessions in by_user.items():
+        user_progress = progress.get(user_id) or UserProgress(user_id=user_id, current_difficulty=3, incorrect_streak=0)
+        for s in user_sessions:
+            apply_progress_rule(user_progress, s.correct_answers or 0, s.total_questions or 0, responses[s.id], params)
+        db.add(user_progress)
+        graded = [(responses[s.id], s.ended_at) for s in user_sessions]
+        record_reviews(db, user_id, graded)
+        record_rollups(db, user_id, graded)
+
 def build_quiz_result_out(quiz_session):
     score = quiz_session.score
     message = f"Quiz completed! You scored is {score}."
@@ -289,23 +300,28 @@ def build_quiz_result_out(quiz_session):
         message=message
     )
 
+def _user_session(db, session_id, user_id):
+    return db.query(Quiz_session).filter(Quiz_session.id == session_id, Quiz_session.user_id == user_id).first()
+
 @router.get(
     "/result/{session_id}",
     response_model=QuizResultOut,
     dependencies=[Depends(require_role("student","teacher","admin"))]
 )
+@db_handler
 def get_quiz_result(
     session_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("student", "teacher", "admin"))
+    db: Session = Depends(get_read_db),
+    primary: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("student", "teacher", "admin"))
 ):
     """
     Returns the result of a quiz session for the given session_id.
     """
-    quiz_session = db.query(Quiz_session).filter(
-        Quiz_session.id == session_id,
-        Quiz_session.user_id == current_user.id
-    ).first()
+    quiz_session = _user_session(db, session_id, current_user.id)
+    if (not quiz_session or not quiz_session.ended_at) and db.info.get("replica"):
+        # The replica may not have caught up with a submission made moments ago; ask the primary
+        quiz_session = _user_session(primary, session_id, current_user.id)
     if not quiz_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz session not found or not belonging to user.")
     if not quiz_session.ended_at:
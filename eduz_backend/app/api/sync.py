@@ -0,0 +1,236 @@
+# app/api/sync.py
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import Session
+
+from app.api.quiz import QUIZ_SUBMITTED, response_rows
+from app.core import tasks
+from app.core.answer_keys import get_answer_keys
+from app.core.answers import grade_responses
+from app.core.auth import Principal, require_role
+from app.core.changes import current_change_seq
+from app.core.database import get_db, db_handler
+from app.core.upsert import insert_on_conflict
+from app.models import Question, QuestionScopeMove, Topic, Subject, Branch, Quiz_session, QuizResponse
+from app.schemas import QuestionSyncPage, ResultSyncRequest, ResultSyncResponse
+
+router = APIRouter()
+
+SYNC_PAGE_SIZE = 500
+
+
+def _parse_cursor(cursor: str):
+    try:
+        seq, qid = cursor.split(":")
+        return int(seq), int(qid)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+@router.get(
+    "/questions",
+    response_model=QuestionSyncPage,
+    dependencies=[Depends(require_role("student", "teacher", "admin"))]
+)
+@db_handler
+def sync_questions(
+    since: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=SYNC_PAGE_SIZE),
+    level: Optional[str] = None,
+    subject_id: Optional[int] = None,
+    topic_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Returns question-bank rows changed after `since` (a pack version or the `version`
+    of a previous sync), optionally limited to the scope of a content pack.
+    Approved questions are returned in full; unapproved ones are listed in
+    `removed_question_ids`, as are questions re-tagged out of the requested scope
+    (see app.core.changes). Questions are paginated by (change_seq, id); taxonomy
+    rows and scope moves are small and come with the first page.
+    """
+    # Read the committed high-water mark first: everything <= it is visible to the queries below
+    high_water = current_change_seq(db)
+
+    query = _in_scope(
+        db.query(Question.id, Question.question_text, Question.options, Question.correct_option,
+                 Question.topic_id, Question.branch_id, Question.difficulty, Question.systems,
+                 Question.approved, Question.change_seq),
+        level, subject_id, topic_id,
+    ).filter(Question.change_seq > since)
+    if cursor:
+        seq, qid = _parse_cursor(cursor)
+        query = query.filter(or_(Question.change_seq > seq, and_(Question.change_seq == seq, Question.id > qid)))
+    rows = query.order_by(Question.change_seq, Question.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    page = {
+        "since": since,
+        "questions": [r._asdict() for r in rows if r.approved],
+        "removed_question_ids": [r.id for r in rows if not r.approved],
+    }
+
+    if not cursor:
+        subjects = db.query(Subject.id, Subject.name, Subject.level, Subject.change_seq).filter(Subject.change_seq > since)
+        branches = db.query(Branch.id, Branch.name, Branch.subject_id, Branch.change_seq).filter(Branch.change_seq > since)
+        topics = db.query(Topic.id, Topic.name, Topic.subject_id, Topic.branch_id, Topic.change_seq).filter(Topic.change_seq > since)
+        if level:
+            subjects = subjects.filter(Subject.level == level)
+            branches = branches.join(Subject, Branch.subject_id == Subject.id).filter(Subject.level == level)
+            topics = topics.join(Subject, Topic.subject_id == Subject.id).filter(Subject.level == level)
+        if subject_id or topic_id:
+            scope_subject = subject_id or db.query(Topic.subject_id).filter(Topic.id == topic_id).scalar()
+            subjects = subjects.filter(Subject.id == scope_subject)
+            branches = branches.filter(Branch.subject_id == scope_subject)
+            topics = topics.filter(Topic.subject_id == scope_subject)
+        page["subjects"] = [r._asdict() for r in subjects.all()]
+        page["branches"] = [r._asdict() for r in branches.all()]
+        page["topics"] = [r._asdict() for r in topics.all()]
+        page["removed_question_ids"] += _moved_out(db, since, level, subject_id, topic_id)
+
+    if has_more:
+        page["next_cursor"] = f"{rows[-1].change_seq}:{rows[-1].id}"
+    else:
+        page["version"] = max([high_water, since] + [r.change_seq for r in rows])
+    return page
+
+
+def _in_scope(query, level, subject_id, topic_id):
+    query = query.join(Topic, Question.topic_id == Topic.id).join(Subject, Topic.subject_id == Subject.id)
+    if level:
+        query = query.filter(Subject.level == level)
+    if subject_id:
+        query = query.filter(Topic.subject_id == subject_id)
+    if topic_id:
+        query = query.filter(Question.topic_id == topic_id)
+    return query
+
+
+def _moved_out(db, since, level, subject_id, topic_id):
+    """Ids of questions that left the scope after `since` and are not back in it."""
+    if not (level or subject_id or topic_id):
+        return []
+    moves = db.query(QuestionScopeMove.question_id).filter(QuestionScopeMove.change_seq > since)
+    if level:
+        moves = moves.filter(QuestionScopeMove.old_level == level)
+    if subject_id:
+        moves = moves.filter(QuestionScopeMove.old_subject_id == subject_id)
+    if topic_id:
+        moves = moves.filter(QuestionScopeMove.old_topic_id == topic_id)
+    moved = {r.question_id for r in moves}
+    if not moved:
+        return []
+    # Questions back in scope come with the question pages instead
+    back = {r.id for r in _in_scope(db.query(Question.id), level, subject_id, topic_id)
+            .filter(Question.id.in_(moved))}
+    return sorted(moved - back)
+
+
+def _existing_sessions(db, user_id, client_keys):
+    """One lookup on the (user_id, client_key) unique index."""
+    rows = (
+        db.query(Quiz_session.id, Quiz_session.client_key, Quiz_session.score,
+                 Quiz_session.correct_answers, Quiz_session.total_questions)
+        .filter(Quiz_session.user_id == user_id, Quiz_session.client_key.in_(client_keys))
+        .all()
+    )
+    return {r.client_key: r for r in rows}
+
+
+def _check_references(db, results):
+    """404 if a result names a subject, topic or branch that does not exist; one IN query per table."""
+    for model, field, label in ((Subject, "subject_id", "Subject"), (Topic, "topic_id", "Topic"),
+                                (Branch, "branch_id", "Branch")):
+        ids = {getattr(r, field) for r in results} - {None}
+        if not ids:
+            continue
+        unknown = ids - {row.id for row in db.query(model.id).filter(model.id.in_(ids))}
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"{label} not found: {', '.join(map(str, sorted(unknown)))}.")
+
+
+@router.post(
+    "/results",
+    response_model=ResultSyncResponse,
+    dependencies=[Depends(require_role("student", "teacher", "admin"))]
+)
+@db_handler
+def sync_results(
+    payload: ResultSyncRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("student", "teacher", "admin")),
+):
+    """
+    Uploads quiz sessions completed offline. Each result carries a client-generated
+    `client_key`; results already uploaded are reported as duplicates instead of being
+    inserted again, so retrying a batch after a dropped connection is safe and cheap.
+    New sessions are written with one bulk insert and their graded responses with
+    another; progress, review queue and rollups follow on the task worker, as for
+    /quiz/submit. A batch naming an unknown subject, topic or branch is rejected whole.
+    """
+    # Last occurrence wins if a device sends the same key twice in one batch
+    by_key = {r.client_key: r for r in payload.results}
+    existing = _existing_sessions(db, current_user.id, list(by_key))
+    pending = [r for key, r in by_key.items() if key not in existing]
+
+    created = {}
+    if pending:
+        _check_references(db, pending)
+        keys = get_answer_keys(db, [a.question_id for r in pending for a in r.answers])
+        rows, graded, now = [], [], datetime.utcnow()
+        for result in sorted(pending, key=lambda r: r.ended_at):
+            # Unknown question ids are ignored
+            responses = grade_responses(result.answers, keys)
+            correct, total = sum(r["correct"] for r in responses), len(responses)
+            score = round(correct / total * 100) if total > 0 else 0
+            rows.append({
+                "user_id": current_user.id,
+                "client_key": result.client_key,
+                "subject_id": result.subject_id,
+                "topic_id": result.topic_id,
+                "branch_id": result.branch_id,
+                "started_at": result.started_at,
+                "ended_at": result.ended_at,
+                "submitted_at": now,
+                "score": score,
+                "correct_answers": correct,
+                "total_questions": total,
+            })
+            graded.append(responses)
+        # Sessions uploaded concurrently (e.g. an overlapping retry) are skipped here and reported as duplicates
+        inserted = insert_on_conflict(db.connection(), Quiz_session.__table__, rows, ["user_id", "client_key"],
+                                      returning=[Quiz_session.id, Quiz_session.client_key])
+        created = {r.client_key: r.id for r in inserted}
+        raced = [row["client_key"] for row in rows if row["client_key"] not in created]
+        if raced:
+            existing.update(_existing_sessions(db, current_user.id, raced))
+
+        written = [(row, responses) for row, responses in zip(rows, graded) if row["client_key"] in created]
+        answers = [a for row, responses in written
+                   for a in response_rows(created[row["client_key"]], current_user.id, responses, row["ended_at"])]
+        if answers:
+            db.execute(insert(QuizResponse), answers)
+        tasks.enqueue(db, QUIZ_SUBMITTED, [{"quiz_session_id": created[row["client_key"]]} for row, _ in written])
+        db.commit()
+        tasks.dispatch(db)
+
+    items = []
+    rows_by_key = {row["client_key"]: row for row in rows} if pending else {}
+    for key in by_key:
+        if key in created:
+            row = rows_by_key[key]
+            items.append({"client_key": key, "quiz_session_id": created[key], "duplicate": False,
+                          "score": row["score"], "correct_answers": row["correct_answers"],
+                          "total_questions": row["total_questions"]})
+        else:
+            r = existing[key]
+            items.append({"client_key": key, "quiz_session_id": r.id, "duplicate": True,
+                          "score": r.score, "correct_answers": r.correct_answers,
+                          "total_questions": r.total_questions})
+    return {"results": items}
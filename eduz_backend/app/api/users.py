@@ -1,21 +1,34 @@
 # app/api/users.py
 import os
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from pydantic import BaseModel
 
 from app.schemas import UserCreate, UserOut, Token
 from app.models import User
 from app.core import security, database
-from app.core.auth import get_current_user, require_role
+from app.core.auth import Principal, get_current_user, invalidate_principal, require_role
+from app.core.pagination import keyset_page
 
 router = APIRouter()
 
+def _get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+def _save(db: Session, user: User):
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+# register/login are async so that waiting on the password hash pool does not hold
+# a threadpool worker; their short DB calls run in the threadpool explicitly.
 @router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(database.get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
+async def register(user: UserCreate, db: Session = Depends(database.get_db)):
+    existing_user = await run_in_threadpool(_get_user_by_email, db, user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     # Only allow self-registration as student by default
@@ -28,21 +41,25 @@ def register(user: UserCreate, db: Session = Depends(database.get_db)):
         email=user.email,
         name=user.name,
         role=user.role,
-        password_hash=security.hash_password(user.password)
+        password_hash=await security.hash_password_async(user.password)
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    return await run_in_threadpool(_save, db, new_user)
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.password_hash):
+    user = await run_in_threadpool(_get_user_by_email, db, form_data.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, needs_update = await security.verify_and_update_async(form_data.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if needs_update:
+        # Transparently move the stored hash to the configured scheme/cost
+        user.password_hash = await security.hash_password_async(form_data.password)
+        await run_in_threadpool(_save, db, user)
     access_token = security.create_access_token(
         data={"sub": user.email, "role": user.role}
     )
@@ -50,7 +67,7 @@ def login(
     return {"access_token": access_token, "token_type": "bearer", "user": {"id": user.id, "role": user.role, "email": user.email}}
 
 @router.get("/me", response_model=UserOut)
-def read_current_user(current_user: User = Depends(get_current_user)):
+def read_current_user(current_user: Principal = Depends(get_current_user)):
     return current_user
 
 class PromotionRequest(BaseModel):
@@ -63,7 +80,7 @@ def promote_user(
     user_id: int,
     req: PromotionRequest,
     db: Session = Depends(database.get_db),
-    _admin: User = Depends(require_role("admin"))
+    _admin: Principal = Depends(require_role("admin"))
 ):
     new_role = req.new_role
     """
@@ -87,8 +104,26 @@ def promote_user(
     user.role = new_role
     db.commit()
     db.refresh(user)
+    # Drop the cached principal so the new role applies on the user's next request
+    invalidate_principal(user.email)
     return user
 
 @router.get("/", response_model=List[UserOut], dependencies=[Depends(require_role("admin"))])
-def list_users(db: Session = Depends(database.get_db)):
-    return db.query(User).all()
+def list_users(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1),
+    role: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+):
+    # Column-only query: password hashes are never loaded
+    query = db.query(User.id, User.name, User.email, User.role)
+    if role:
+        query = query.filter(User.role == role)
+    return keyset_page(query, User.id, cursor, limit, response)
+
+
+@router.get("/metrics/hashing", dependencies=[Depends(require_role("admin"))])
+def hashing_metrics():
+    """Queue and latency figures for the password hashing pool."""
+    return security.hash_pool.stats()
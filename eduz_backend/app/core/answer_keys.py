@@ -0,0 +1,37 @@
+# app/core/answer_keys.py
+"""
+Process-local cache of (answer_key, difficulty) per question, used to grade
+offline results without re-reading the questions table for every batch.
+"""
+import os
+
+from app.core.answers import answer_key
+from app.core.cache import TTLCache
+from app.models import Question
+
+answer_key_cache = TTLCache(
+    maxsize=int(os.getenv("ANSWER_KEY_CACHE_SIZE", "200000")),
+    ttl=float(os.getenv("ANSWER_KEY_CACHE_TTL", "600")),
+)
+
+
+def get_answer_keys(db, question_ids):
+    """Return {question_id: (answer_key, difficulty)}; misses are loaded with one IN query."""
+    found, missing = {}, []
+    for qid in set(question_ids):
+        entry = answer_key_cache.get(qid)
+        if entry is None:
+            missing.append(qid)
+        else:
+            found[qid] = entry
+    if missing:
+        rows = (
+            db.query(Question.id, Question.answer_key, Question.correct_option, Question.difficulty)
+            .filter(Question.id.in_(missing))
+            .all()
+        )
+        for r in rows:
+            key = r.answer_key if r.answer_key is not None else answer_key(r.correct_option)
+            found[r.id] = (key, r.difficulty)
+            answer_key_cache.set(r.id, found[r.id])
+    return found
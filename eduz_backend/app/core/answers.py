@@ -0,0 +1,103 @@
+# app/core/answers.py
+"""
+Answer normalization shared by quiz grading and the question write paths.
+
+Stored `correct_option` values come in several legacy shapes (JSON-quoted
+strings, escaped newlines, comma separated multi-select), so both sides of a
+comparison go through the same normalization.
+
+`content_hash` applies the same idea to whole questions, to detect duplicates.
+"""
+import hashlib
+import json
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_answer(val):
+    """Return dict with:
+    - raw: normalized single-string (lowercased, whitespace/csv/newline collapsed)
+    - tokens: list of token strings (split by whitespace)
+    - multi: True if multiple tokens present
+    This helper will attempt to decode JSON-encoded string values (e.g. '"a\\nb"')
+    and will strip surrounding quotes if present.
+    """
+    if val is None:
+        return {"raw": "", "tokens": [], "multi": False}
+    # If it's not a string, coerce to string
+    if not isinstance(val, str):
+        val = str(val)
+
+    s = val.strip()
+    # If value looks like a JSON string literal (starts/ends with quotes), try to decode it
+    if len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'")):
+        try:
+            decoded = json.loads(s)
+            # json.loads may return a list/number; coerce to string
+            if not isinstance(decoded, str):
+                decoded = str(decoded)
+            val = decoded
+        except Exception:
+            # Fall back to stripping surrounding quotes
+            val = s[1:-1]
+    else:
+        val = s
+
+    # Replace escaped newlines (literal backslash-n) and real newlines with spaces
+    val = val.replace('\\n', ' ').replace('\n', ' ')
+    # Replace commas with spaces to treat them as separators
+    val = val.replace(',', ' ')
+    # collapse whitespace
+    v = _WHITESPACE.sub(' ', val).strip()
+    tokens = [t for t in v.split(' ') if t]
+    return {"raw": v.lower(), "tokens": [t.lower() for t in tokens], "multi": len(tokens) > 1}
+
+
+def answer_key(val) -> str:
+    """Canonical grading key: the sorted, de-duplicated tokens joined by a space.
+
+    Two answers are considered equal (multi-select compared as sets, single
+    answers compared as normalized strings) exactly when their keys are equal,
+    so grading reduces to a plain string comparison.
+    """
+    return " ".join(sorted(set(normalize_answer(val)["tokens"])))
+
+
+def _normalize_text(val) -> str:
+    return _WHITESPACE.sub(" ", str(val)).strip().casefold()
+
+
+def content_hash(question_text, options) -> str:
+    """Fingerprint of a question: its normalized text and its set of normalized options.
+
+    Case, whitespace and option order do not change the hash, so re-imports and
+    copy-pasted variants of the same question collide.
+    """
+    opts = sorted({_normalize_text(o) for o in (options or [])})
+    payload = json.dumps([_normalize_text(question_text or ""), opts], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def grade_responses(answers, expected) -> list:
+    """Grade submitted answers against `expected`, {question_id: (answer_key, difficulty)}.
+
+    Returns one {"question_id", "difficulty", "correct", "selected", "time_ms"}
+    entry per answered question, in submission order. Answers to questions
+    missing from `expected` and repeated answers to the same question are ignored.
+    """
+    graded = {}
+    for user_answer in answers:
+        entry = expected.get(user_answer.question_id)
+        if entry is None or user_answer.question_id in graded:
+            continue
+        key, difficulty = entry
+        selected = answer_key(user_answer.selected_option)
+        graded[user_answer.question_id] = {
+            "question_id": user_answer.question_id,
+            "difficulty": difficulty,
+            "correct": selected == key,
+            "selected": selected,
+            "time_ms": user_answer.time_ms,
+        }
+    return list(graded.values())
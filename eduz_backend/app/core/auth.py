@@ -1,8 +1,13 @@
 # app/core/auth.py
+import functools
+import os
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.cache import TTLCache
+from app.core.database import get_db, db_handler
 from app.core.security import decode_token
 from app.models import User
 from fastapi.security import OAuth2PasswordBearer
@@ -10,10 +15,29 @@ from jose import JWTError
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login", scheme_name="JWT")
 
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by route handlers (a detached snapshot, not an ORM row)."""
+    id: int
+    name: str
+    email: str
+    role: str
+
+# Resolved principals keyed by token subject, so warm requests never touch the users table.
+# Role changes made through promote_user invalidate the entry; other workers see them after the TTL.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
+
+def invalidate_principal(email: str):
+    principal_cache.pop(email)
+
+@db_handler
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db),
-) -> User:
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -28,17 +52,26 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise credentials_exception
-    return user
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = db.query(User.id, User.name, User.email, User.role).filter(User.email == email).first()
+        if not user:
+            raise credentials_exception
+        principal = Principal(id=user.id, name=user.name, email=user.email, role=user.role)
+        principal_cache.set(email, principal)
+    return principal
 
+@functools.lru_cache(maxsize=None)
 def require_role(*allowed_roles: str):
     """
     Dependency factory that raises 403 unless current_user.role is in allowed_roles.
     Usage: Depends(require_role("teacher", "admin"))
+
+    The checker is memoized per role set, so a route that declares the same
+    require_role(...) in `dependencies=[...]` and as a parameter gets one
+    dependency that FastAPI resolves once per request.
     """
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: Principal = Depends(get_current_user)):
         # Normalize role comparison to be case-insensitive and handle missing roles
         user_role = (current_user.role or '').strip().lower()
         allowed_normalized = [r.strip().lower() for r in allowed_roles]
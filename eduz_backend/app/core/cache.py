@@ -0,0 +1,62 @@
+# app/core/cache.py
+"""Small thread-safe in-process caches shared by the API modules."""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+def can_block() -> bool:
+    """False when running on an event loop thread.
+
+    In DB_MODE=async, sync handlers run on the loop thread and every query
+    switches back to the loop, so another request can run on the same thread
+    while a lock is held. Waiting on that lock would freeze the loop; callers
+    must take build locks with `acquire(blocking=can_block())` and cope with not
+    getting them.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return True
+    return False
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
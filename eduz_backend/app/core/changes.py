@@ -0,0 +1,86 @@
+# app/core/changes.py
+"""
+Change sequence for question-bank content (subjects, branches, topics, questions).
+
+Every insert or update of those rows is stamped with a value taken from the
+single-row `change_counter` table. The counter row stays locked until the
+writing transaction commits, so sequence numbers become visible in order: once
+a client has seen everything up to N, no row with change_seq <= N can appear
+later. That is what lets /sync/questions?since=N return exact deltas.
+
+The stamping happens in a `before_flush` hook, so every ORM write path
+(the question routes, bulk_insert_cs_questions.py, scripts) is covered
+without extra code. Core-level bulk inserts must call `next_change_seq` and
+set the column themselves.
+
+Devices sync one scope (a level, subject or topic). A question leaving a scope
+keeps its row, so the same hook records its previous scope in
+question_scope_moves: on a question's new topic, a topic's new subject and a
+subject's new level (for every question below them, read from the rows before
+the flush). /sync/questions reports those questions as removed from the old
+scope.
+"""
+from itertools import chain
+
+from sqlalchemy import event, inspect, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models import ChangeCounter, Subject, Branch, Topic, Question, QuestionScopeMove
+
+TRACKED_MODELS = (Subject, Branch, Topic, Question)
+_counter = ChangeCounter.__table__
+_moves = QuestionScopeMove.__table__
+
+
+def next_change_seq(conn) -> int:
+    """Allocate the next sequence number inside the caller's transaction."""
+    result = conn.execute(update(_counter).where(_counter.c.id == 1).values(value=_counter.c.value + 1))
+    if result.rowcount == 0:
+        conn.execute(insert(_counter).values(id=1, value=1))
+        return 1
+    return conn.execute(select(_counter.c.value).where(_counter.c.id == 1)).scalar_one()
+
+
+def current_change_seq(db) -> int:
+    """Highest sequence number whose transaction has committed."""
+    return db.execute(select(_counter.c.value).where(_counter.c.id == 1)).scalar() or 0
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_change_seq(session, flush_context, instances):
+    changed = [
+        obj for obj in chain(session.new, session.dirty)
+        if isinstance(obj, TRACKED_MODELS)
+        and (obj in session.new or session.is_modified(obj, include_collections=False))
+    ]
+    if changed:
+        seq = next_change_seq(session.connection())
+        _record_scope_moves(session.connection(), seq, [obj for obj in changed if obj not in session.new])
+        for obj in changed:
+            obj.change_seq = seq
+
+
+def _moved(objs, model, attr):
+    return [obj for obj in objs if isinstance(obj, model) and inspect(obj).attrs[attr].history.has_changes()]
+
+
+def _record_scope_moves(conn, seq, updated):
+    """Insert question_scope_moves rows for the scope changes among `updated` rows, before they are flushed."""
+    q, t, s = Question.__table__, Topic.__table__, Subject.__table__
+    scope = (
+        select(literal(seq), q.c.id, q.c.topic_id, t.c.subject_id, s.c.level)
+        .select_from(q.outerjoin(t, t.c.id == q.c.topic_id).outerjoin(s, s.c.id == t.c.subject_id))
+    )
+    selects = [
+        scope.where(q.c.id == obj.id, q.c.topic_id.is_distinct_from(obj.topic_id))
+        for obj in _moved(updated, Question, "topic_id")
+    ] + [
+        scope.where(t.c.id == obj.id, t.c.subject_id.is_distinct_from(obj.subject_id))
+        for obj in _moved(updated, Topic, "subject_id")
+    ] + [
+        scope.where(s.c.id == obj.id, s.c.level.is_distinct_from(obj.level))
+        for obj in _moved(updated, Subject, "level")
+    ]
+    columns = ["change_seq", "question_id", "old_topic_id", "old_subject_id", "old_level"]
+    for stmt in selects:
+        conn.execute(insert(_moves).from_select(columns, stmt))
@@ -0,0 +1,301 @@
+# app/core/importer.py
+"""
+Bulk question import from uploaded CSV, NDJSON or JSON files.
+
+The upload is parsed as a stream, one row at a time, and every row is validated
+with the same rules as ``QuestionCreate``. Topic and branch names are resolved
+through a lookup loaded once per import. Valid rows are written in chunks of
+IMPORT_CHUNK_SIZE, using ``COPY`` on Postgres (psycopg2) and a Core
+executemany everywhere else, with one commit per chunk. Memory therefore depends
+on the chunk size, not on the size of the file. Each chunk is written with
+``ON CONFLICT (content_hash)``, so duplicates of existing questions are skipped
+or merged by the database in the same statement.
+
+Rows bypass the ORM, so ``answer_key``, ``content_hash`` and ``change_seq`` are
+set here explicitly; the ORM hooks that normally fill them do not run.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from collections import Counter
+
+from pydantic import ValidationError
+
+from app.core.answers import answer_key, content_hash
+from app.core.changes import next_change_seq
+from app.core.systems import adjust_systems
+from app.core.upsert import insert_on_conflict
+from app.models import Question, Topic, Branch, Subject
+from app.schemas import QuestionCreate
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+IMPORT_FORMATS = ("csv", "ndjson", "json")
+
+_questions = Question.__table__
+COPY_COLUMNS = ("question_text", "options", "correct_option", "answer_key", "content_hash", "topic_id",
+                "branch_id", "systems", "difficulty", "created_by", "approved", "change_seq")
+# Columns a "merge" import overwrites on an existing duplicate; approval is left alone
+MERGE_COLUMNS = ("correct_option", "answer_key", "topic_id", "branch_id", "systems", "difficulty", "change_seq")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename, fmt=None) -> str:
+    if fmt:
+        return fmt
+    ext = (filename or "").rsplit(".", 1)[-1].lower()
+    if ext in ("jsonl", "ndjson"):
+        return "ndjson"
+    if ext in IMPORT_FORMATS:
+        return ext
+    raise ImportFormatError("Cannot tell the file format; pass ?format=csv|ndjson|json")
+
+
+def _iter_text(binary, chunk_size=1 << 16):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for chunk in iter(lambda: binary.read(chunk_size), b""):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _iter_json_array(binary):
+    """Yield the elements of a top-level JSON array without loading the whole document."""
+    decoder = json.JSONDecoder()
+    buf, pos, started = "", 0, False
+    text = _iter_text(binary)
+    while True:
+        # Skip whitespace and separators, refilling the buffer as needed
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf):
+                break
+            try:
+                buf, pos = next(text), 0
+            except StopIteration:
+                raise ImportFormatError("Unexpected end of JSON document")
+        if not started:
+            if buf[pos] != "[":
+                raise ImportFormatError("JSON upload must be an array of questions")
+            started, pos = True, pos + 1
+            continue
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                # The element may continue in the next chunk
+                try:
+                    buf, pos = buf[pos:] + next(text), 0
+                except StopIteration:
+                    raise ImportFormatError("Malformed JSON document")
+        yield item
+        pos = end
+
+
+def _parse_options(value):
+    if isinstance(value, list):
+        return value
+    if value is not None and not isinstance(value, str):
+        raise ValueError("options must be a list or a string")
+    value = (value or "").strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [v.strip() for v in value.split("|") if v.strip()]
+
+
+def iter_rows(binary, fmt):
+    """Yield raw row dicts (or a parse error string) from a binary upload."""
+    if fmt == "json":
+        yield from _iter_json_array(binary)
+        return
+    text = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+    try:
+        if fmt == "csv":
+            yield from csv.DictReader(text)
+        else:
+            for line in text:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield f"invalid JSON: {exc.msg}"
+    finally:
+        # Leave the upload open for its owner
+        text.detach()
+
+
+class TaxonomyLookup:
+    """Name -> id maps for topics and branches, loaded with one query each."""
+
+    def __init__(self, db):
+        subjects = dict(db.query(Subject.id, Subject.name).all())
+        self.topic_ids = set()
+        self.topics = {}  # (subject name or None, topic name) -> [topic ids]
+        for tid, name, subject_id in db.query(Topic.id, Topic.name, Topic.subject_id).all():
+            self.topic_ids.add(tid)
+            for key in ((None, _norm(name)), (_norm(subjects.get(subject_id)), _norm(name))):
+                self.topics.setdefault(key, []).append(tid)
+        self.branch_ids = set()
+        self.branches = {}
+        for bid, name, subject_id in db.query(Branch.id, Branch.name, Branch.subject_id).all():
+            self.branch_ids.add(bid)
+            for key in ((None, _norm(name)), (_norm(subjects.get(subject_id)), _norm(name))):
+                self.branches.setdefault(key, []).append(bid)
+
+    @staticmethod
+    def _resolve(ids, names, kind, row):
+        raw_id, name = row.get(f"{kind}_id"), row.get(kind)
+        if raw_id not in (None, ""):
+            try:
+                value = int(raw_id)
+            except (TypeError, ValueError):
+                raise ValueError(f"{kind}_id must be an integer")
+            if value not in ids:
+                raise ValueError(f"{kind}_id {value} does not exist")
+            return value
+        if not name:
+            return None
+        matches = names.get((_norm(row.get("subject")), _norm(name)) if row.get("subject") else (None, _norm(name)))
+        if not matches:
+            raise ValueError(f"unknown {kind} '{name}'")
+        if len(matches) > 1:
+            raise ValueError(f"{kind} '{name}' is ambiguous; add a subject column")
+        return matches[0]
+
+    def topic(self, row):
+        return self._resolve(self.topic_ids, self.topics, "topic", row)
+
+    def branch(self, row):
+        return self._resolve(self.branch_ids, self.branches, "branch", row)
+
+
+def _norm(name):
+    return str(name).strip().lower() if name else None
+
+
+def _error_messages(exc):
+    if isinstance(exc, ValidationError):
+        return [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors()]
+    return [str(exc)]
+
+
+def validate_row(row, lookup):
+    """Turn one raw row into a QuestionCreate, resolving topic/branch names."""
+    if not isinstance(row, dict):
+        raise ValueError(row if isinstance(row, str) else "row must be an object")
+    data = {
+        "question_text": row.get("question_text"),
+        "options": _parse_options(row.get("options")),
+        "correct_option": row.get("correct_option"),
+        "topic_id": lookup.topic(row),
+        "branch_id": lookup.branch(row),
+        "systems": row.get("systems") or None,
+    }
+    if row.get("difficulty") not in (None, ""):
+        data["difficulty"] = row["difficulty"]
+    return QuestionCreate(**data)
+
+
+def _copy_field(value) -> str:
+    # In CSV format COPY reads only an unquoted empty cell as NULL; every value is
+    # quoted so that "" stays an empty string, as on the executemany path
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_chunk(conn, rows, on_duplicate):
+    # COPY cannot resolve conflicts, so rows go through a staging table and one INSERT ... SELECT
+    cols = ", ".join(COPY_COLUMNS)
+    buf = io.StringIO()
+    for r in rows:
+        buf.write(",".join(_copy_field(json.dumps(r[c]) if c == "options" else r[c]) for c in COPY_COLUMNS) + "\n")
+    buf.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.execute(f"CREATE TEMP TABLE questions_import ON COMMIT DROP AS SELECT {cols} FROM questions WITH NO DATA")
+    cursor.copy_expert(f"COPY questions_import ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+    if on_duplicate == "merge":
+        conflict = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in MERGE_COLUMNS)
+    else:
+        conflict = "DO NOTHING"
+    cursor.execute(f"INSERT INTO questions ({cols}) SELECT {cols} FROM questions_import ON CONFLICT (content_hash) {conflict}")
+    return cursor.rowcount
+
+
+def _write_chunk(db, rows, on_duplicate, report):
+    conn = db.connection()
+    seq = next_change_seq(conn)
+    for r in rows:
+        r["change_seq"] = seq
+    # Matches are looked up up front: upserts report inserted and updated rows together,
+    # and the systems catalogue needs the systems value a merged row had before
+    existing = dict(
+        db.query(Question.content_hash, Question.systems)
+        .filter(Question.content_hash.in_([r["content_hash"] for r in rows]))
+        .all()
+    )
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        written = _copy_chunk(conn, rows, on_duplicate)
+    else:
+        written = insert_on_conflict(conn, _questions, rows, ["content_hash"],
+                                     MERGE_COLUMNS if on_duplicate == "merge" else None)
+    systems = Counter()
+    for r in rows:
+        if r["content_hash"] not in existing:
+            systems[r["systems"]] += 1
+        elif on_duplicate == "merge":
+            systems[existing[r["content_hash"]]] -= 1
+            systems[r["systems"]] += 1
+    adjust_systems(conn, systems)
+    db.commit()
+    inserted = written - len(existing) if on_duplicate == "merge" else written
+    report["imported"] += inserted
+    report["duplicates"] += len(rows) - inserted
+
+
+def import_questions(db, binary, fmt, created_by, on_duplicate="skip", chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and insert every row of `binary`; return the import report.
+
+    Rows whose content_hash matches an existing question (or an earlier row of
+    the upload) are duplicates: skipped, or with on_duplicate="merge" used to
+    update the existing question's answer, taxonomy and difficulty.
+    """
+    lookup = TaxonomyLookup(db)
+    report = {"imported": 0, "duplicates": 0, "failed": 0, "errors": []}
+    chunk = {}  # content_hash -> row, so a chunk never conflicts with itself
+    try:
+        for line_no, row in enumerate(iter_rows(binary, fmt), 1):
+            try:
+                q = validate_row(row, lookup)
+            except (ValidationError, ValueError) as exc:
+                report["failed"] += 1
+                if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                    report["errors"].append({"row": line_no, "errors": _error_messages(exc)})
+                continue
+            digest = content_hash(q.question_text, q.options)
+            if digest in chunk:
+                report["duplicates"] += 1
+                if on_duplicate != "merge":
+                    continue
+            chunk[digest] = {
+                "question_text": q.question_text, "options": q.options, "correct_option": q.correct_option,
+                "answer_key": answer_key(q.correct_option), "content_hash": digest,
+                "topic_id": q.topic_id, "branch_id": q.branch_id, "systems": q.systems,
+                "difficulty": q.difficulty, "created_by": created_by, "approved": False,
+            }
+            if len(chunk) >= chunk_size:
+                _write_chunk(db, list(chunk.values()), on_duplicate, report)
+                chunk = {}
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFormatError(f"Cannot parse upload: {exc}")
+    if chunk:
+        _write_chunk(db, list(chunk.values()), on_duplicate, report)
+    return report
@@ -0,0 +1,134 @@
+# app/core/item_stats.py
+"""
+Classical item statistics of questions, aggregated with NumPy.
+
+For every question the batch job (app/db/compute_question_stats.py) computes:
+
+* p-value: share of correct answers;
+* discrimination: point-biserial correlation between answering the question
+  correctly and the rest score of the quiz it was answered in (share of the
+  session's other questions answered correctly), so good students getting
+  it right and weak ones getting it wrong gives a value near 1, and a
+  negative value usually means a wrong answer key;
+* option distribution: how often each option was chosen (plus "other" for
+  answers matching none);
+* median response time, estimated from a log-spaced histogram of the times
+  reported by the devices.
+
+All of these are derived from additive totals (counts, sums, cross products
+and histogram bins), one row of TOTAL_COLUMNS floats per question. ``aggregate``
+turns a batch of responses into such rows with ``np.bincount`` group-bys,
+``combine`` adds rows of the same question together, and ``derive`` computes the
+statistics. The job stores the totals, so folding in new sessions is a matter
+of adding their totals to the stored ones.
+"""
+import numpy as np
+
+MAX_OPTIONS = 8  # options past the 8th are counted as "other"
+# Response-time histogram: bin edges from 0.5 s to 30 min, log-spaced; the last bin is open-ended
+TIME_BIN_EDGES_MS = np.geomspace(500, 1_800_000, 40)
+N_TIME_BINS = len(TIME_BIN_EDGES_MS) + 1
+
+# Column layout of a totals row
+N, SUM_X, N_REST, SUM_X_REST, SUM_Y, SUM_Y2, SUM_XY = range(7)
+OPTIONS = slice(7, 7 + MAX_OPTIONS + 1)
+TIMES = slice(OPTIONS.stop, OPTIONS.stop + N_TIME_BINS)
+TOTAL_COLUMNS = TIMES.stop
+
+# Thresholds used to flag questions in the teacher report
+TOO_EASY_P, TOO_HARD_P, LOW_DISCRIMINATION = 0.9, 0.2, 0.1
+
+
+def aggregate(session_idx, question_ids, correct, option_idx, time_ms):
+    """Totals of one batch of responses.
+
+    All arguments are arrays with one entry per response: the 0-based session
+    the response belongs to (every response of a session must be in the same
+    batch), the question id, whether it was correct, the chosen option (0-based,
+    -1 when it matches no option, -2 when not recorded) and the response time in
+    ms (-1 when unknown).
+    Returns ``(ids, totals)`` with one row per distinct question id.
+    """
+    session_idx = np.asarray(session_idx, dtype=np.intp)
+    x = np.asarray(correct, dtype=np.float64)
+    ids, item = np.unique(np.asarray(question_ids, dtype=np.int64), return_inverse=True)
+    k = len(ids)
+    totals = np.zeros((k, TOTAL_COLUMNS))
+
+    # Rest score: the session's other answers, defined when the session has at least two responses
+    n_s = np.bincount(session_idx)
+    c_s = np.bincount(session_idx, x)
+    others = n_s[session_idx] - 1
+    has_rest = others > 0
+    y = np.where(has_rest, (c_s[session_idx] - x) / np.maximum(others, 1), 0.0)
+    rest = has_rest.astype(np.float64)
+
+    totals[:, N] = np.bincount(item, minlength=k)
+    totals[:, SUM_X] = np.bincount(item, x, k)
+    totals[:, N_REST] = np.bincount(item, rest, k)
+    totals[:, SUM_X_REST] = np.bincount(item, x * rest, k)
+    totals[:, SUM_Y] = np.bincount(item, y, k)
+    totals[:, SUM_Y2] = np.bincount(item, y * y, k)
+    totals[:, SUM_XY] = np.bincount(item, x * y, k)
+
+    option = np.asarray(option_idx, dtype=np.intp)
+    recorded = option >= -1
+    option = np.where((option < 0) | (option >= MAX_OPTIONS), MAX_OPTIONS, option)[recorded]
+    totals[:, OPTIONS] = np.bincount(item[recorded] * (MAX_OPTIONS + 1) + option,
+                                     minlength=k * (MAX_OPTIONS + 1)).reshape(k, MAX_OPTIONS + 1)
+
+    time_ms = np.asarray(time_ms, dtype=np.float64)
+    timed = time_ms >= 0
+    bins = np.searchsorted(TIME_BIN_EDGES_MS, time_ms[timed], side="right")
+    totals[:, TIMES] = np.bincount(item[timed] * N_TIME_BINS + bins,
+                                   minlength=k * N_TIME_BINS).reshape(k, N_TIME_BINS)
+    return ids, totals
+
+
+def combine(ids, totals):
+    """Sum rows sharing a question id; returns ``(unique ids, totals)``."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return ids, np.zeros((0, TOTAL_COLUMNS))
+    order = np.argsort(ids, kind="stable")
+    ids, totals = ids[order], totals[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    return ids[starts], np.add.reduceat(totals, starts, axis=0)
+
+
+def derive(totals):
+    """Return ``(p_value, discrimination, median_time_ms)`` arrays; NaN where undefined."""
+    totals = np.atleast_2d(totals)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_value = totals[:, SUM_X] / totals[:, N]
+
+        n, sx, sy = totals[:, N_REST], totals[:, SUM_X_REST], totals[:, SUM_Y]
+        # x is 0/1, so sum(x^2) == sum(x)
+        var_x = n * sx - sx * sx
+        var_y = n * totals[:, SUM_Y2] - sy * sy
+        discrimination = (n * totals[:, SUM_XY] - sx * sy) / np.sqrt(var_x * var_y)
+        discrimination[(var_x <= 0) | (var_y <= 1e-12)] = np.nan
+
+        hist = totals[:, TIMES]
+        timed = hist.sum(axis=1)
+        # First bin where the cumulative count reaches half; report its geometric midpoint
+        median_bin = (np.cumsum(hist, axis=1) < (timed / 2)[:, None]).sum(axis=1)
+        lower = np.r_[TIME_BIN_EDGES_MS[0] / 2, TIME_BIN_EDGES_MS]
+        upper = np.r_[TIME_BIN_EDGES_MS, TIME_BIN_EDGES_MS[-1] * 2]
+        median = np.sqrt(lower[median_bin] * upper[median_bin])
+        median[timed == 0] = np.nan
+    return p_value, discrimination, median
+
+
+def flags(p_value, discrimination) -> list:
+    """Reasons a teacher should look at a question."""
+    found = []
+    if p_value is not None and p_value >= TOO_EASY_P:
+        found.append("too_easy")
+    if p_value is not None and p_value <= TOO_HARD_P:
+        found.append("too_hard")
+    if discrimination is not None and discrimination < 0:
+        found.append("negative_discrimination")  # often a wrong answer key
+    elif discrimination is not None and discrimination < LOW_DISCRIMINATION:
+        found.append("low_discrimination")
+    return found
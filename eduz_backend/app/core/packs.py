@@ -0,0 +1,223 @@
+# app/core/packs.py
+"""
+Offline MCQ content packs.
+
+A pack holds every approved question of a level, subject or topic together with
+the taxonomy rows it references. Packs are written once per content version to
+PACK_CACHE_DIR as gzip-compressed JSON or a ready-to-query SQLite file, and then
+served straight from disk. The version is a fingerprint of the questions in
+scope, so a pack is only rebuilt after the underlying questions change. The pack
+records the change sequence it was built at, from which devices continue with
+/sync/questions?since=.
+
+Each worker keeps a small registry of built packs. Entries are dropped by the
+question write paths and re-validated against the database after
+PACK_REGISTRY_TTL seconds, so downloads in between cost no queries at all.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import func
+
+from app.core.cache import can_block
+from app.core.changes import current_change_seq
+from app.models import Question, Topic, Subject, Branch
+
+PACK_DIR = os.getenv("PACK_CACHE_DIR", "./data/packs")
+PACK_REGISTRY_TTL = float(os.getenv("PACK_REGISTRY_TTL", "60"))
+PACK_FORMATS = {"json": "json.gz", "sqlite": "sqlite.gz"}
+
+
+class PackScopeNotFound(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class PackInfo:
+    path: str
+    etag: str
+    version: str
+    size: int
+    checked_at: float
+
+
+_registry = {}  # (scope, scope_id, fmt) -> PackInfo
+_registry_lock = threading.Lock()
+_build_locks = {}
+
+
+def invalidate():
+    """Forget every built pack; the next download re-checks its version."""
+    with _registry_lock:
+        _registry.clear()
+
+
+def _scoped(query, scope, scope_id):
+    query = query.join(Topic, Question.topic_id == Topic.id).join(Subject, Topic.subject_id == Subject.id)
+    if scope == "level":
+        return query.filter(Subject.level == scope_id)
+    if scope == "subject":
+        return query.filter(Topic.subject_id == scope_id)
+    return query.filter(Question.topic_id == scope_id)
+
+
+def _scope_exists(db, scope, scope_id) -> bool:
+    if scope == "level":
+        return db.query(Subject.id).filter(Subject.level == scope_id).first() is not None
+    model = Subject if scope == "subject" else Topic
+    return db.query(model.id).filter(model.id == scope_id).first() is not None
+
+
+def pack_version(db, scope, scope_id) -> str:
+    """Cheap fingerprint of the questions in scope.
+
+    Any insert, approval or unapproval bumps a question's change_seq, so the highest
+    change_seq in scope (approved or not) moves whenever the pack content does.
+    """
+    count, max_seq = _scoped(
+        db.query(func.count(Question.id), func.max(Question.change_seq)), scope, scope_id
+    ).one()
+    return f"{max_seq or 0}-{count}"
+
+
+def _pack_rows(db, scope, scope_id):
+    questions = _scoped(
+        db.query(Question.id, Question.question_text, Question.options, Question.correct_option,
+                 Question.topic_id, Question.branch_id, Question.difficulty, Question.systems, Question.change_seq),
+        scope, scope_id,
+    ).filter(Question.approved == True).order_by(Question.id).yield_per(5000)
+
+    topic_q = db.query(Topic.id, Topic.name, Topic.subject_id, Topic.branch_id).join(Subject, Topic.subject_id == Subject.id)
+    if scope == "level":
+        topic_q = topic_q.filter(Subject.level == scope_id)
+    elif scope == "subject":
+        topic_q = topic_q.filter(Topic.subject_id == scope_id)
+    else:
+        topic_q = topic_q.filter(Topic.id == scope_id)
+    topics = [dict(r._mapping) for r in topic_q.all()]
+    subject_ids = {t["subject_id"] for t in topics}
+    subjects = [dict(r._mapping) for r in db.query(Subject.id, Subject.name, Subject.level).filter(Subject.id.in_(subject_ids)).all()]
+    branches = [dict(r._mapping) for r in db.query(Branch.id, Branch.name, Branch.subject_id).filter(Branch.subject_id.in_(subject_ids)).all()]
+    return subjects, branches, topics, questions
+
+
+def _write_json(path, meta, subjects, branches, topics, questions):
+    # mtime=0 keeps the gzip bytes (and so the ETag) identical for identical content
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+        out = lambda s: gz.write(s.encode("utf-8"))
+        out('{"pack": ' + json.dumps(meta))
+        for name, rows in (("subjects", subjects), ("branches", branches), ("topics", topics)):
+            out(f', "{name}": ' + json.dumps(rows))
+        out(', "questions": [')
+        for i, q in enumerate(questions):
+            out(("," if i else "") + json.dumps(dict(q._mapping)))
+        out("]}")
+
+
+def _write_sqlite(path, meta, subjects, branches, topics, questions):
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE pack_meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE subjects (id INTEGER PRIMARY KEY, name TEXT, level TEXT);
+            CREATE TABLE branches (id INTEGER PRIMARY KEY, name TEXT, subject_id INTEGER);
+            CREATE TABLE topics (id INTEGER PRIMARY KEY, name TEXT, subject_id INTEGER, branch_id INTEGER);
+            CREATE TABLE questions (id INTEGER PRIMARY KEY, question_text TEXT, options TEXT, correct_option TEXT,
+                                    topic_id INTEGER, branch_id INTEGER, difficulty INTEGER, systems TEXT,
+                                    change_seq INTEGER);
+            CREATE INDEX ix_questions_topic_difficulty ON questions (topic_id, difficulty);
+        """)
+        conn.executemany("INSERT INTO pack_meta VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+        conn.executemany("INSERT INTO subjects VALUES (:id, :name, :level)", subjects)
+        conn.executemany("INSERT INTO branches VALUES (:id, :name, :subject_id)", branches)
+        conn.executemany("INSERT INTO topics VALUES (:id, :name, :subject_id, :branch_id)", topics)
+        conn.executemany(
+            "INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((q.id, q.question_text, json.dumps(q.options), q.correct_option, q.topic_id, q.branch_id, q.difficulty, q.systems, q.change_seq)
+             for q in questions),
+        )
+        conn.commit()
+        conn.close()
+        with open(db_path, "rb") as src, open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+            shutil.copyfileobj(src, gz)
+    finally:
+        os.remove(db_path)
+
+
+def _file_etag(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()}"'
+
+
+def build_pack(db, scope, scope_id, fmt, version) -> str:
+    """Write the pack for `version` to disk (atomically) and return its path."""
+    os.makedirs(PACK_DIR, exist_ok=True)
+    # Level names are free text, so they are hashed to get a safe file name
+    name = hashlib.sha1(scope_id.encode()).hexdigest()[:12] if scope == "level" else scope_id
+    prefix = f"{scope}-{name}-"
+    path = os.path.join(PACK_DIR, f"{prefix}{version}.{PACK_FORMATS[fmt]}")
+    if os.path.exists(path):
+        return path  # built by another worker
+    # change_seq is the committed high-water mark: devices pass it to /sync/questions?since=
+    meta = {"scope": scope, "scope_id": scope_id, "version": version, "format": fmt,
+            "change_seq": current_change_seq(db)}
+    fd, tmp = tempfile.mkstemp(dir=PACK_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        writer = _write_json if fmt == "json" else _write_sqlite
+        writer(tmp, meta, *_pack_rows(db, scope, scope_id))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    # Older versions of the same pack are no longer served
+    for name in os.listdir(PACK_DIR):
+        if name.startswith(prefix) and name.endswith(PACK_FORMATS[fmt]) and os.path.join(PACK_DIR, name) != path:
+            try:
+                os.remove(os.path.join(PACK_DIR, name))
+            except OSError:
+                pass
+    return path
+
+
+def get_pack(db, scope, scope_id, fmt="json") -> PackInfo:
+    """Return the current pack for a scope, building it if its content changed."""
+    key = (scope, scope_id, fmt)
+    info = _registry.get(key)
+    if info and time.monotonic() - info.checked_at < PACK_REGISTRY_TTL and os.path.exists(info.path):
+        return info
+
+    with _registry_lock:
+        lock = _build_locks.setdefault(key, threading.Lock())
+    # Builds write to a temp file and rename, so building twice is only wasted work
+    acquired = lock.acquire(blocking=can_block())
+    try:
+        version = pack_version(db, scope, scope_id)
+        info = _registry.get(key)
+        if info is None or info.version != version or not os.path.exists(info.path):
+            if version.endswith("-0") and not _scope_exists(db, scope, scope_id):
+                raise PackScopeNotFound(f"{scope} {scope_id} not found")
+            path = build_pack(db, scope, scope_id, fmt, version)
+            info = PackInfo(path=path, etag=_file_etag(path), version=version,
+                            size=os.path.getsize(path), checked_at=time.monotonic())
+        else:
+            info = PackInfo(info.path, info.etag, info.version, info.size, time.monotonic())
+        with _registry_lock:
+            _registry[key] = info
+    finally:
+        if acquired:
+            lock.release()
+    return info
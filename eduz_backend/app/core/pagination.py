@@ -0,0 +1,39 @@
+# app/core/pagination.py
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered by primary key and continue with ``WHERE id > :cursor``, so
+every page is an index range scan of `limit` rows no matter how deep the client
+has paged. The id of the last row is returned to the client in the
+``X-Next-Cursor`` response header; it is absent on the last page.
+"""
+import os
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def page_limit(limit) -> int:
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE (PAGE_SIZE when omitted)."""
+    if limit is None:
+        return min(PAGE_SIZE, MAX_PAGE_SIZE)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(query, id_column, cursor, limit, response=None):
+    """Return one page of `query` as dicts, ordered by `id_column` and starting after `cursor`.
+
+    `query` should select plain columns (not entities) so rows are returned
+    without ORM hydration. One extra row is fetched to know whether another
+    page follows; if so its cursor is set on `response`.
+    """
+    limit = page_limit(limit)
+    if cursor is not None:
+        query = query.filter(id_column > cursor)
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    page = [dict(r._mapping) for r in rows[:limit]]
+    if response is not None and has_more:
+        response.headers[NEXT_CURSOR_HEADER] = str(page[-1][id_column.key])
+    return page
@@ -0,0 +1,177 @@
+# app/core/question_index.py
+"""
+Process-local index of approved question ids used by /quiz/start.
+
+Approved questions are grouped by (level, subject_id, branch_id, topic_id) and,
+inside each group, by difficulty: the calibrated IRT difficulty rounded to the
+1..6 scale when the question has one, its authored difficulty otherwise. Each bucket is a compact ``array('l')`` of
+ids, so a bank of 100k+ questions costs a few hundred KB instead of a full set
+of ORM rows per request. Selection samples ids in O(k); the caller then
+hydrates only the chosen rows with a single ``IN`` query.
+
+The index is built lazily on first use, kept up to date by the write paths in
+``app/api/questions.py`` and fully rebuilt after ``QUESTION_INDEX_TTL`` seconds
+so that changes made by other worker processes are eventually picked up.
+"""
+import bisect
+import os
+import random
+import threading
+import time
+from array import array
+
+from app.core.cache import can_block
+from app.core.irt import difficulty_level
+from app.models import Question, Topic, Subject
+
+QUESTION_INDEX_TTL = int(os.getenv("QUESTION_INDEX_TTL", "300"))
+DIFFICULTIES = range(1, 7)  # 1=easy ... 6=very hard
+
+
+def bucket_of(difficulty, irt_difficulty):
+    return difficulty_level(irt_difficulty) if irt_difficulty is not None else difficulty
+
+
+def difficulty_walk(counts, start=3):
+    """Yield difficulties in the order /quiz/start drains them.
+
+    Starts at `start`; once a difficulty is exhausted it moves to the nearest
+    difficulty that still has questions (ties go to the easier one).
+    """
+    remaining = sorted(d for d, c in counts.items() if c)
+    current = start
+    while remaining:
+        if current not in remaining:
+            current = min(remaining, key=lambda d: abs(d - current))
+        yield current
+        remaining.remove(current)
+
+
+class QuestionIndex:
+    def __init__(self, ttl: int = QUESTION_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._groups = {}   # (level, subject_id, branch_id, topic_id) -> {difficulty: array('l')}
+        self._scopes = {}   # ("subject" | "topic" | "branch", id) -> set of group keys
+        self._loaded_at = None
+
+    # -- lifecycle -------------------------------------------------------
+    def invalidate(self):
+        with self._lock:
+            self._groups, self._scopes, self._loaded_at = {}, {}, None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def ensure_loaded(self, db):
+        if not self.is_stale():
+            return
+        if self._build_lock.acquire(blocking=can_block()):
+            try:
+                if self.is_stale():
+                    self.rebuild(db)
+            finally:
+                self._build_lock.release()
+        elif self._loaded_at is None:
+            # Another request on this event loop is building; nothing to serve yet
+            self.rebuild(db)
+
+    def rebuild(self, db):
+        """Load every approved question id with its bucket coordinates (ids only, no ORM rows)."""
+        groups, scopes = {}, {}
+        rows = (
+            db.query(Question.id, Question.difficulty, Question.irt_difficulty, Question.topic_id, Question.branch_id,
+                     Topic.subject_id, Subject.level)
+            .join(Topic, Question.topic_id == Topic.id)
+            .join(Subject, Topic.subject_id == Subject.id)
+            .filter(Question.approved == True)
+            .yield_per(10000)
+        )
+        for qid, difficulty, irt_difficulty, topic_id, branch_id, subject_id, level in rows:
+            self._insert(groups, scopes, (level, subject_id, branch_id, topic_id), bucket_of(difficulty, irt_difficulty), qid)
+        with self._lock:
+            self._groups, self._scopes, self._loaded_at = groups, scopes, time.monotonic()
+
+    # -- incremental maintenance -----------------------------------------
+    @staticmethod
+    def _insert(groups, scopes, key, difficulty, qid):
+        if difficulty not in DIFFICULTIES:
+            return
+        level, subject_id, branch_id, topic_id = key
+        groups.setdefault(key, {}).setdefault(difficulty, array("l")).append(qid)
+        scopes.setdefault(("subject", subject_id), set()).add(key)
+        scopes.setdefault(("topic", topic_id), set()).add(key)
+        if branch_id is not None:
+            scopes.setdefault(("branch", branch_id), set()).add(key)
+
+    @staticmethod
+    def _group_key(db, question):
+        row = (
+            db.query(Topic.subject_id, Subject.level)
+            .join(Subject, Topic.subject_id == Subject.id)
+            .filter(Topic.id == question.topic_id)
+            .first()
+        )
+        if not row:
+            return None
+        return (row[1], row[0], question.branch_id, question.topic_id)
+
+    def add(self, db, question):
+        """Register a newly approved question. No-op until the index has been loaded."""
+        if self._loaded_at is None or not question.approved:
+            return
+        key = self._group_key(db, question)
+        if key is None:
+            return
+        with self._lock:
+            self._insert(self._groups, self._scopes, key, bucket_of(question.difficulty, question.irt_difficulty), question.id)
+
+    def discard(self, db, question):
+        """Remove a question that was unapproved or deleted."""
+        if self._loaded_at is None:
+            return
+        key = self._group_key(db, question)
+        with self._lock:
+            bucket = self._groups.get(key, {}).get(bucket_of(question.difficulty, question.irt_difficulty))
+            if bucket is not None and question.id in bucket:
+                bucket.remove(question.id)
+
+    # -- selection -------------------------------------------------------
+    def _buckets(self, scope, scope_id, level):
+        by_difficulty = {d: [] for d in DIFFICULTIES}
+        for key in self._scopes.get((scope, scope_id), ()):
+            if level and key[0] != level:
+                continue
+            for difficulty, ids in self._groups[key].items():
+                if ids:
+                    by_difficulty[difficulty].append(ids)
+        return by_difficulty
+
+    def sample(self, scope: str, scope_id: int, k: int, level: str = None, start_difficulty: int = 3):
+        """Return up to `k` distinct ``(question_id, difficulty)`` pairs for the given scope.
+
+        Questions are drained difficulty by difficulty following `difficulty_walk`,
+        picking uniformly at random inside each difficulty.
+        """
+        selected = []
+        with self._lock:
+            by_difficulty = self._buckets(scope, scope_id, level)
+            counts = {d: sum(len(ids) for ids in buckets) for d, buckets in by_difficulty.items()}
+            for difficulty in difficulty_walk(counts, start_difficulty):
+                need = k - len(selected)
+                if need <= 0:
+                    break
+                buckets = by_difficulty[difficulty]
+                offsets, total = [], 0
+                for ids in buckets:
+                    offsets.append(total)
+                    total += len(ids)
+                # random.sample over a range object is O(need), not O(total)
+                for pos in random.sample(range(total), min(need, total)):
+                    b = bisect.bisect_right(offsets, pos) - 1
+                    selected.append((buckets[b][pos - offsets[b]], difficulty))
+        return selected
+
+
+question_index = QuestionIndex()
@@ -0,0 +1,102 @@
+# app/core/review.py
+"""
+Spaced-repetition queue of missed questions.
+
+Every question a student gets wrong gets a row in review_items that is due
+REVIEW_FIRST_INTERVAL_DAYS later. Each later correct answer multiplies the
+interval by REVIEW_GROWTH; once it would exceed REVIEW_GRADUATE_DAYS the
+question has been learnt and its row is deleted. Another miss resets the
+interval. Correct answers to questions that are not queued change nothing.
+
+Submissions update the queue with one read and one bulk upsert, whatever the
+number of answers. /quiz/start can mix due items into a quiz (include_reviews);
+they are read through ix_review_items_user_due, so the lookup is an index range
+scan on (user_id, due_at) however long the student's history is.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from app.core.upsert import insert_on_conflict
+from app.models import Question, ReviewItem, Subject, Topic
+
+REVIEW_FIRST_INTERVAL_DAYS = float(os.getenv("REVIEW_FIRST_INTERVAL_DAYS", "1"))
+REVIEW_GROWTH = float(os.getenv("REVIEW_GROWTH", "2.5"))
+REVIEW_GRADUATE_DAYS = float(os.getenv("REVIEW_GRADUATE_DAYS", "30"))
+# At most this share of a quiz is made of review items
+REVIEW_MAX_SHARE = float(os.getenv("REVIEW_MAX_SHARE", "0.5"))
+
+_items = ReviewItem.__table__
+
+
+def review_quota(num_questions: int) -> int:
+    return max(1, int(num_questions * REVIEW_MAX_SHARE))
+
+
+def record_reviews(db, user_id: int, sessions):
+    """Update the queue from graded sessions, given as (responses, answered_at) pairs in chronological order."""
+    sessions = [(responses, answered_at) for responses, answered_at in sessions if responses]
+    question_ids = {r["question_id"] for responses, _ in sessions for r in responses}
+    if not question_ids:
+        return
+    items = {
+        r.question_id: {"user_id": user_id, "question_id": r.question_id, "due_at": r.due_at,
+                        "interval_days": r.interval_days, "reps": r.reps, "lapses": r.lapses}
+        for r in db.query(ReviewItem.question_id, ReviewItem.due_at, ReviewItem.interval_days,
+                          ReviewItem.reps, ReviewItem.lapses)
+        .filter(ReviewItem.user_id == user_id, ReviewItem.question_id.in_(question_ids))
+    }
+    changed, learnt = set(), set()
+    for responses, answered_at in sessions:
+        for r in responses:
+            qid = r["question_id"]
+            item = items.get(qid)
+            if not r["correct"]:
+                lapses = item["lapses"] + 1 if item else 1
+                items[qid] = {"user_id": user_id, "question_id": qid, "interval_days": REVIEW_FIRST_INTERVAL_DAYS,
+                              "due_at": answered_at + timedelta(days=REVIEW_FIRST_INTERVAL_DAYS),
+                              "reps": 0, "lapses": lapses}
+                changed.add(qid)
+                learnt.discard(qid)
+            elif item is not None and qid not in learnt:
+                interval = item["interval_days"] * REVIEW_GROWTH
+                if interval > REVIEW_GRADUATE_DAYS:
+                    learnt.add(qid)
+                    changed.discard(qid)
+                else:
+                    item.update(interval_days=interval, due_at=answered_at + timedelta(days=interval),
+                                reps=item["reps"] + 1)
+                    changed.add(qid)
+
+    conn = db.connection()
+    if changed:
+        insert_on_conflict(conn, _items, [items[qid] for qid in changed], ["user_id", "question_id"],
+                           update_columns=["due_at", "interval_days", "reps", "lapses"])
+    if learnt:
+        conn.execute(delete(_items).where(_items.c.user_id == user_id, _items.c.question_id.in_(learnt)))
+
+
+def _due_query(db, user_id: int, scope: str, scope_id: int, now: datetime, level: str = None):
+    query = (
+        db.query(ReviewItem.question_id)
+        .join(Question, Question.id == ReviewItem.question_id)
+        .filter(ReviewItem.user_id == user_id, ReviewItem.due_at <= now, Question.approved == True)
+    )
+    if scope == "topic":
+        query = query.filter(Question.topic_id == scope_id)
+    elif scope == "branch":
+        query = query.filter(Question.branch_id == scope_id)
+    if scope == "subject" or level:
+        query = query.join(Topic, Question.topic_id == Topic.id)
+        if scope == "subject":
+            query = query.filter(Topic.subject_id == scope_id)
+        if level:
+            query = query.join(Subject, Topic.subject_id == Subject.id).filter(Subject.level == level)
+    return query.order_by(ReviewItem.due_at)
+
+
+def due_reviews(db, user_id: int, scope: str, scope_id: int, limit: int, level: str = None, now: datetime = None):
+    """Ids of the student's approved review questions in scope that are due, most overdue first."""
+    query = _due_query(db, user_id, scope, scope_id, now or datetime.utcnow(), level)
+    return [qid for (qid,) in query.limit(limit)]
@@ -0,0 +1,137 @@
+# app/core/rollups.py
+"""
+Per-student progress rollups for dashboards.
+
+progress_rollups holds one row per (student, scope, scope id), scope being
+"subject", "branch" or "topic": quizzes that touched the scope, questions
+answered and answered correctly in it, the sum of the per-quiz scores within
+it, the last activity and the current streak of consecutive active days. A
+quiz updates the rows of every subject, branch and topic its questions come
+from; its score within a scope is the share of its questions in that scope
+answered correctly, which is simply its score when the quiz stays inside the
+scope. Dashboards then read a handful of rows by primary key (a student's
+progress) or one range of ix_progress_rollups_scope (a class overview),
+however long the history is.
+
+Submissions fold their sessions in with one INSERT ... ON CONFLICT DO UPDATE,
+so concurrent submissions of the same student add up instead of overwriting
+each other. The streak is stored as (streak_start_day, last_active_day) day
+numbers, which the upsert can extend with integer arithmetic on any backend.
+Sessions older than the stored last activity (offline results uploaded late)
+count towards the totals but leave the streak alone;
+`python -m app.db.rebuild_rollups` recomputes everything from quiz_responses.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, func
+
+from app.core.upsert import insert_on_conflict
+from app.models import ProgressRollup, Question, Topic
+
+SCOPES = ("subject", "branch", "topic")
+LOOKUP_CHUNK_SIZE = 5000
+
+_rollups = ProgressRollup.__table__
+
+
+def day_number(moment: datetime) -> int:
+    return moment.date().toordinal()
+
+
+def question_scopes(db, question_ids) -> dict:
+    """Return {question_id: (subject_id, branch_id, topic_id)}, ordered like SCOPES."""
+    question_ids = list(question_ids)
+    scopes = {}
+    for start in range(0, len(question_ids), LOOKUP_CHUNK_SIZE):
+        chunk = question_ids[start:start + LOOKUP_CHUNK_SIZE]
+        rows = (
+            db.query(Question.id, Topic.subject_id, func.coalesce(Question.branch_id, Topic.branch_id),
+                     Question.topic_id)
+            .outerjoin(Topic, Topic.id == Question.topic_id)
+            .filter(Question.id.in_(chunk))
+        )
+        scopes.update((qid, (subject_id, branch_id, topic_id)) for qid, subject_id, branch_id, topic_id in rows)
+    return scopes
+
+
+def rollup_rows(user_id: int, sessions, scopes) -> list:
+    """Fold graded sessions, given as (responses, answered_at) pairs, into one row per scope they touched.
+
+    `scopes` maps question ids to their (subject_id, branch_id, topic_id), see
+    question_scopes; responses to unknown questions are ignored.
+    """
+    rows = {}
+    for responses, answered_at in sorted(sessions, key=lambda s: s[1]):
+        counts = {}
+        for r in responses:
+            for scope, scope_id in zip(SCOPES, scopes.get(r["question_id"], ())):
+                if scope_id is not None:
+                    c = counts.setdefault((scope, scope_id), [0, 0])
+                    c[0] += 1
+                    c[1] += bool(r["correct"])
+        day = day_number(answered_at)
+        for (scope, scope_id), (answered, correct) in counts.items():
+            row = rows.get((scope, scope_id))
+            if row is None:
+                row = rows[(scope, scope_id)] = {
+                    "user_id": user_id, "scope": scope, "scope_id": scope_id, "attempts": 0, "questions": 0,
+                    "correct": 0, "score_sum": 0, "streak_start_day": day,
+                }
+            elif day > row["last_active_day"] + 1:
+                row["streak_start_day"] = day
+            row["attempts"] += 1
+            row["questions"] += answered
+            row["correct"] += correct
+            row["score_sum"] += round(correct / answered * 100)
+            row["last_activity_at"] = answered_at
+            row["last_active_day"] = day
+    return list(rows.values())
+
+
+def _merge(stored, incoming):
+    stale = incoming.last_active_day <= stored.last_active_day
+    return {
+        "last_activity_at": case((incoming.last_activity_at > stored.last_activity_at, incoming.last_activity_at),
+                                 else_=stored.last_activity_at),
+        "last_active_day": case((stale, stored.last_active_day), else_=incoming.last_active_day),
+        # The incoming rows end on a streak of their own: it replaces the stored one after a gap
+        # and extends it (possibly backwards) when the two touch
+        "streak_start_day": case(
+            (stale, stored.streak_start_day),
+            (incoming.streak_start_day > stored.last_active_day + 1, incoming.streak_start_day),
+            (incoming.streak_start_day < stored.streak_start_day, incoming.streak_start_day),
+            else_=stored.streak_start_day,
+        ),
+    }
+
+
+def record_rollups(db, user_id: int, sessions):
+    """Add graded sessions, given as (responses, answered_at) pairs, to the student's rollups."""
+    sessions = [(responses, answered_at) for responses, answered_at in sessions if responses]
+    if not sessions:
+        return
+    scopes = question_scopes(db, {r["question_id"] for responses, _ in sessions for r in responses})
+    rows = rollup_rows(user_id, sessions, scopes)
+    if rows:
+        insert_on_conflict(db.connection(), _rollups, rows, ["user_id", "scope", "scope_id"],
+                           increment_columns=["attempts", "questions", "correct", "score_sum"], merge=_merge)
+
+
+def current_streak(last_active_day: int, streak_start_day: int, today: datetime = None) -> int:
+    """Consecutive active days up to today; a streak last extended yesterday still counts."""
+    today = day_number(today or datetime.utcnow())
+    return last_active_day - streak_start_day + 1 if last_active_day >= today - 1 else 0
+
+
+def progress_out(row, today: datetime = None) -> dict:
+    """Dashboard view (ProgressOut) of a progress_rollups row mapping."""
+    return {
+        "scope": row["scope"],
+        "scope_id": row["scope_id"],
+        "attempts": row["attempts"],
+        "questions": row["questions"],
+        "correct": row["correct"],
+        "average_score": row["score_sum"] / row["attempts"] if row["attempts"] else None,
+        "last_activity_at": row["last_activity_at"],
+        "streak_days": current_streak(row["last_active_day"], row["streak_start_day"], today),
+    }
@@ -1,34 +1,201 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
 # Use a pure-Python hasher by default to avoid platform-specific bcrypt
 # binary dependency issues during tests and in minimal environments.
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+# PASSWORD_SCHEME / PASSWORD_ROUNDS pick the scheme and cost for new hashes; run
+# `python -m app.core.security calibrate` to choose a cost for this host.
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "sha256_crypt")
+PASSWORD_ROUNDS = os.getenv("PASSWORD_ROUNDS")
 
-def hash_password(password: str) -> str:
+# Hashing runs outside the request path in a bounded pool ("thread" or "process").
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+
+# Hashes in these schemes still verify, but are upgraded on the next successful login
+LEGACY_SCHEMES = ("sha256_crypt", "bcrypt")
+
+
+def build_context(scheme: str = PASSWORD_SCHEME, rounds=PASSWORD_ROUNDS) -> CryptContext:
+    schemes = [scheme] + [s for s in LEGACY_SCHEMES if s != scheme]
+    settings = {}
+    if rounds:
+        # min_rounds makes needs_update() flag hashes made with a lower cost
+        settings = {f"{scheme}__default_rounds": int(rounds), f"{scheme}__min_rounds": int(rounds)}
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+pwd_context = build_context()
+_settings = (PASSWORD_SCHEME, PASSWORD_ROUNDS)
+
+
+def configure(scheme: str = PASSWORD_SCHEME, rounds=PASSWORD_ROUNDS):
+    """Rebuild the hashing context, e.g. after calibration or in tests.
+
+    Jobs of the hash pool carry the settings they were submitted with, so
+    process-pool workers follow a change on their next job.
+    """
+    global pwd_context, _settings
+    pwd_context = build_context(scheme, rounds)
+    _settings = (scheme, rounds)
+
+
+def _with_settings(settings, fn, *args):
+    # A process-pool worker keeps the context it was started with until told otherwise
+    if settings != _settings:
+        configure(*settings)
+    return fn(*args)
+
+
+def _truncate_for_bcrypt(password: str) -> str:
     # bcrypt has a 72-byte input limit. Truncate to avoid ValueError on long inputs
+    pw_bytes = password.encode("utf-8")[:72]
+    return pw_bytes.decode("utf-8", errors="ignore")
+
+
+def hash_password(password: str) -> str:
     try:
-        if "bcrypt" in pwd_context.schemes():
-            pw_bytes = password.encode("utf-8")[:72]
-            password = pw_bytes.decode("utf-8", errors="ignore")
+        if pwd_context.default_scheme() == "bcrypt":
+            password = _truncate_for_bcrypt(password)
     except Exception:
         # fallback: use the original password if anything goes wrong
         pass
     return pwd_context.hash(password)
 
+
 def verify_password(plain: str, hashed: str) -> bool:
+    return verify_and_update(plain, hashed)[0]
+
+
+def verify_and_update(plain: str, hashed: str):
+    """Return (valid, needs_update) for a stored hash."""
     try:
-        if "bcrypt" in pwd_context.schemes():
-            pw_bytes = plain.encode("utf-8")[:72]
-            plain = pw_bytes.decode("utf-8", errors="ignore")
+        if pwd_context.identify(hashed) == "bcrypt":
+            plain = _truncate_for_bcrypt(plain)
     except Exception:
         pass
-    return pwd_context.verify(plain, hashed)
+    valid = pwd_context.verify(plain, hashed)
+    return valid, valid and pwd_context.needs_update(hashed)
+
+
+def _timed_call(fn, args, enqueued_at):
+    # Runs inside the pool; wall-clock timestamps are comparable across processes
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at - enqueued_at, time.time() - started_at
+
+
+class HashPool:
+    """Bounded executor for password hashing with queue-time metrics.
+
+    At most `max_pending` hashes may be queued or running; beyond that callers
+    get a 503 instead of piling up behind a burst of logins.
+    """
+
+    def __init__(self, workers: int, max_pending: int, kind: str = "thread"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0, "in_flight": 0,
+                       "queue_wait_total": 0.0, "queue_wait_max": 0.0, "run_total": 0.0}
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    executor_cls = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+                    self._executor = executor_cls(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests in progress. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+        try:
+            future = self._get_executor().submit(_timed_call, fn, args, time.time())
+            result, queue_wait, run_time = await asyncio.wrap_future(future)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._stats["in_flight"] -= 1
+        with self._lock:
+            self._stats["completed"] += 1
+            self._stats["queue_wait_total"] += queue_wait
+            self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], queue_wait)
+            self._stats["run_total"] += run_time
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        done = s["completed"] or 1
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "submitted": s["submitted"],
+            "completed": s["completed"],
+            "rejected": s["rejected"],
+            "in_flight": s["in_flight"],
+            "queue_wait_ms_avg": round(s["queue_wait_total"] / done * 1000, 2),
+            "queue_wait_ms_max": round(s["queue_wait_max"] * 1000, 2),
+            "hash_ms_avg": round(s["run_total"] / done * 1000, 2),
+        }
+
+
+hash_pool = HashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_EXECUTOR)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hash_pool.run(_with_settings, _settings, hash_password, password)
+
+
+async def verify_and_update_async(plain: str, hashed: str):
+    return await hash_pool.run(_with_settings, _settings, verify_and_update, plain, hashed)
+
+
+def calibrate_rounds(scheme: str = PASSWORD_SCHEME, target_ms: float = 250.0) -> int:
+    """Pick a cost for `scheme` whose hash time on this host is close to `target_ms`."""
+    def measure(rounds):
+        ctx = build_context(scheme, rounds)
+        start = time.perf_counter()
+        ctx.hash("calibration-password")
+        return (time.perf_counter() - start) * 1000
+
+    handler = build_context(scheme).handler(scheme)
+    if scheme == "bcrypt":
+        # bcrypt's cost is log2(rounds): step up until we reach the target
+        cost = handler.min_rounds
+        while cost < handler.max_rounds and measure(cost) < target_ms:
+            cost += 1
+        return cost
+    # Linear-cost schemes (sha*_crypt, pbkdf2_*): extrapolate from a probe
+    probe = max(handler.min_rounds, handler.default_rounds // 10)
+    rounds = int(probe * target_ms / max(measure(probe), 0.01))
+    return max(handler.min_rounds, min(rounds, handler.max_rounds))
+
 
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-import os
 from dotenv import load_dotenv
-from fastapi import HTTPException
 
 load_dotenv()  # Load from .env file
 
@@ -49,3 +216,19 @@ def decode_token(token: str):
         return payload
     except JWTError:
         raise HTTPException(status_code=403, detail="Invalid token")
+
+
+if __name__ == "__main__":
+    # Usage: python -m app.core.security calibrate [--scheme sha256_crypt] [--target-ms 250]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Password hashing utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="pick PASSWORD_ROUNDS for a target hash latency")
+    cal.add_argument("--scheme", default=PASSWORD_SCHEME)
+    cal.add_argument("--target-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    rounds = calibrate_rounds(args.scheme, args.target_ms)
+    print(f"PASSWORD_SCHEME={args.scheme}")
+    print(f"PASSWORD_ROUNDS={rounds}")
@@ -0,0 +1,72 @@
+# app/core/systems.py
+"""
+Catalogue of `Question.systems` values.
+
+The `systems` table holds one row per distinct value with the number of
+questions using it, so GET /questions/systems reads a handful of rows instead of
+running SELECT DISTINCT over the whole questions table. Questions collapsed into
+another one (duplicate_of set) are not counted; unapproved questions are, as
+they always were listed by that endpoint.
+
+ORM writes are counted by a `before_flush` hook, like the change sequence in
+app.core.changes. Core-level writes (the bulk importer, the dedupe job) call
+`adjust_systems` themselves. `python -m app.db.rebuild_systems` recomputes the
+table from scratch if it ever drifts.
+"""
+from collections import Counter
+
+from sqlalchemy import delete, event, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.core.upsert import insert_on_conflict
+from app.models import Question, SystemEntry
+
+_systems = SystemEntry.__table__
+
+
+def adjust_systems(conn, deltas):
+    """Apply {system name: +/- question count} to the catalogue inside the caller's transaction."""
+    deltas = {name: n for name, n in deltas.items() if name and n}
+    added = [{"name": name, "question_count": n} for name, n in deltas.items() if n > 0]
+    if added:
+        insert_on_conflict(conn, _systems, added, ["name"], increment_columns=["question_count"])
+    removed = [(name, -n) for name, n in deltas.items() if n < 0]
+    for name, n in removed:
+        conn.execute(update(_systems).where(_systems.c.name == name)
+                     .values(question_count=_systems.c.question_count - n))
+    if removed:
+        conn.execute(delete(_systems).where(_systems.c.name.in_([name for name, _ in removed]),
+                                            _systems.c.question_count <= 0))
+
+
+def list_systems(db):
+    return [name for (name,) in db.query(SystemEntry.name).filter(SystemEntry.question_count > 0).order_by(SystemEntry.name)]
+
+
+def _counted(systems, duplicate_of):
+    return systems if systems and duplicate_of is None else None
+
+
+@event.listens_for(Session, "before_flush")
+def _count_systems(session, flush_context, instances):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Question) and _counted(obj.systems, obj.duplicate_of):
+            deltas[obj.systems] += 1
+    for obj in session.dirty:
+        if not isinstance(obj, Question):
+            continue
+        systems, duplicate_of = get_history(obj, "systems"), get_history(obj, "duplicate_of")
+        if not (systems.has_changes() or duplicate_of.has_changes()):
+            continue
+        old_systems = (systems.deleted or systems.unchanged or [None])[0]
+        old_duplicate_of = (duplicate_of.deleted or duplicate_of.unchanged or [None])[0]
+        deltas[_counted(old_systems, old_duplicate_of)] -= 1
+        deltas[_counted(obj.systems, obj.duplicate_of)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Question):
+            deltas[_counted(obj.systems, obj.duplicate_of)] -= 1
+    deltas.pop(None, None)
+    if any(deltas.values()):
+        adjust_systems(session.connection(), deltas)
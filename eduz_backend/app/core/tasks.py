@@ -0,0 +1,190 @@
+# app/core/tasks.py
+"""
+In-process background tasks backed by a transactional outbox.
+
+Request handlers ``enqueue`` work as task_outbox rows inside their own
+transaction, so a task exists if and only if the request's writes were
+committed, and it survives a restart of the process. After committing they
+call ``dispatch``, which wakes the worker thread started with the app
+(``start_worker``). The worker waits BATCH_DELAY_SECONDS so that more work
+piles up, claims up to BATCH_SIZE due rows (FOR UPDATE SKIP LOCKED on Postgres,
+so several API processes can share the outbox) and passes each kind's payloads
+to its handler in a single call. The handlers' writes and the deletion of the
+claimed rows commit together, so every task takes effect exactly once.
+
+If a batch fails its tasks are retried one at a time, so a single bad task
+cannot hold back the others. A failing task is retried after
+RETRY_BASE_SECONDS * 2**attempts and parked (available_at NULL, last_error kept
+for inspection) after MAX_ATTEMPTS. The worker also polls every POLL_SECONDS,
+which picks up tasks left behind by a process that stopped.
+
+No broker is involved. Capacity is bounded by one worker thread per process
+and the batch size; a backlog waits in the table, not in memory.
+
+TASK_MODE=inline runs the tasks in the request's session right after it
+commits. The tests use it and it suits single-process tools.
+"""
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, update
+
+from app.models import OutboxTask
+
+TASK_MODE = os.getenv("TASK_MODE", "background").lower()
+BATCH_SIZE = int(os.getenv("TASK_BATCH_SIZE", "200"))
+BATCH_DELAY_SECONDS = float(os.getenv("TASK_BATCH_DELAY_SECONDS", "0.2"))
+POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", "5"))
+MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "8"))
+RETRY_BASE_SECONDS = float(os.getenv("TASK_RETRY_BASE_SECONDS", "2"))
+
+logger = logging.getLogger(__name__)
+_outbox = OutboxTask.__table__
+_handlers = {}
+
+
+def handler(kind: str):
+    """Register `fn(db, payloads)` as the handler of `kind`; it gets the payloads of a batch in enqueue order."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db, kind: str, payloads):
+    """Add one task per payload to the outbox, in the caller's transaction."""
+    now = datetime.utcnow()
+    rows = [{"kind": kind, "payload": p, "created_at": now, "available_at": now} for p in payloads]
+    if rows:
+        db.execute(insert(OutboxTask), rows)
+
+
+def _claim(db, now, limit, task_id=None):
+    query = db.query(OutboxTask.id, OutboxTask.kind, OutboxTask.payload, OutboxTask.attempts)
+    if task_id is not None:
+        query = query.filter(OutboxTask.id == task_id)
+    query = query.filter(OutboxTask.available_at <= now).order_by(OutboxTask.id).limit(limit)
+    return query.with_for_update(skip_locked=True).all()
+
+
+def _execute(db, tasks):
+    by_kind = defaultdict(list)
+    for task in tasks:
+        by_kind[task.kind].append(task.payload)
+    for kind, payloads in by_kind.items():
+        if kind not in _handlers:
+            raise LookupError(f"No handler registered for task kind {kind!r}")
+        _handlers[kind](db, payloads)
+    db.execute(delete(_outbox).where(_outbox.c.id.in_([t.id for t in tasks])))
+
+
+def _fail(db, task, error, now):
+    attempts = task.attempts + 1
+    available_at = None if attempts >= MAX_ATTEMPTS else now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** task.attempts)
+    db.execute(update(_outbox).where(_outbox.c.id == task.id)
+               .values(attempts=attempts, available_at=available_at, last_error=repr(error)[:1000]))
+    db.commit()
+    logger.warning("Task %s (%s) failed, attempt %s: %r", task.id, task.kind, attempts, error)
+
+
+def run_pending(db, limit: int = None, now: datetime = None) -> int:
+    """Run up to `limit` due tasks with session `db`; returns how many were claimed."""
+    now = now or datetime.utcnow()
+    tasks = _claim(db, now, limit or BATCH_SIZE)
+    if not tasks:
+        db.rollback()
+        return 0
+    try:
+        _execute(db, tasks)
+        db.commit()
+        return len(tasks)
+    except Exception as exc:
+        db.rollback()
+        if len(tasks) == 1:
+            _fail(db, tasks[0], exc, now)
+            return 1
+    # Isolate the failing task(s): one transaction per task
+    for task in tasks:
+        claimed = _claim(db, now, 1, task.id)
+        if not claimed:
+            db.rollback()
+            continue
+        try:
+            _execute(db, claimed)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            _fail(db, claimed[0], exc, now)
+    return len(tasks)
+
+
+class TaskWorker:
+    """Daemon thread draining the outbox, woken by dispatch() and by a POLL_SECONDS timer."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="eduz-tasks", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if self._wake.wait(POLL_SECONDS):
+                self._stop.wait(BATCH_DELAY_SECONDS)  # let the batch fill up; on stop, make a last pass
+            self._wake.clear()
+            db = self.session_factory()
+            try:
+                while run_pending(db) >= BATCH_SIZE:
+                    pass
+            except Exception:
+                logger.exception("Task worker pass failed")
+            finally:
+                db.close()
+
+
+_worker = None
+
+
+def start_worker(session_factory) -> TaskWorker:
+    global _worker
+    if _worker is None:
+        _worker = TaskWorker(session_factory)
+    _worker.start()
+    return _worker
+
+
+def stop_worker():
+    if _worker is not None:
+        _worker.stop()
+
+
+def dispatch(db):
+    """Call once enqueued tasks are committed: runs them now in inline mode, otherwise wakes the worker."""
+    if TASK_MODE == "inline":
+        try:
+            while run_pending(db) >= BATCH_SIZE:
+                pass
+        except Exception:
+            db.rollback()
+            logger.exception("Inline task run failed; the tasks stay in the outbox")
+    elif _worker is not None:
+        _worker.notify()
@@ -0,0 +1,101 @@
+# app/core/taxonomy.py
+"""
+Process-local cache of the subject -> branch -> topic taxonomy.
+
+The taxonomy endpoints are called on nearly every screen of the frontend, but
+the data changes only when a teacher adds a subject, branch or topic. The whole
+tree is loaded with a handful of column queries and grouped by level, so that
+the by-level endpoints become dictionary lookups. Each response body is
+serialized once per snapshot and served with a strong ETag (a hash of the
+body), so clients revalidating with If-None-Match get a 304.
+
+The create endpoints invalidate the cache. Snapshots are also rebuilt after
+TAXONOMY_CACHE_TTL seconds, which picks up writes made by other worker
+processes.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from app.core.cache import can_block
+from app.core.systems import list_systems
+from app.models import Subject, Branch, Topic
+
+TAXONOMY_CACHE_TTL = float(os.getenv("TAXONOMY_CACHE_TTL", "60"))
+
+
+class TaxonomySnapshot:
+    def __init__(self, subjects, branches, topics, systems):
+        self.views = {"subjects": subjects, "branches": branches, "topics": topics, "systems": systems}
+        level_of = {s["id"]: s["level"] for s in subjects}
+        for name, rows in (("subjects", subjects), ("branches", branches), ("topics", topics)):
+            for row in rows:
+                level = row["level"] if name == "subjects" else level_of.get(row["subject_id"])
+                self.views.setdefault((name, level), []).append(row)
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def body(self, view):
+        """Return (json bytes, strong etag) for a view, e.g. "topics" or ("topics", "Form 4")."""
+        cached = self._bodies.get(view)
+        if cached is None:
+            content = json.dumps(self.views.get(view, []), separators=(",", ":")).encode("utf-8")
+            cached = (content, f'"{hashlib.sha256(content).hexdigest()}"')
+            with self._lock:
+                self._bodies[view] = cached
+        return cached
+
+
+class TaxonomyCache:
+    def __init__(self, ttl: float = TAXONOMY_CACHE_TTL):
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._build_lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _fresh(self, snapshot):
+        return snapshot is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def get(self, db) -> TaxonomySnapshot:
+        snapshot = self._snapshot
+        if self._fresh(snapshot):
+            return snapshot
+        if not self._build_lock.acquire(blocking=can_block()):
+            # Another request on this event loop is loading: serve the stale snapshot if there is one
+            return snapshot if snapshot is not None else self.load(db)
+        try:
+            if not self._fresh(self._snapshot):
+                self._snapshot, self._loaded_at = self.load(db), time.monotonic()
+            return self._snapshot
+        finally:
+            self._build_lock.release()
+
+    @staticmethod
+    def load(db) -> TaxonomySnapshot:
+        subjects = [
+            {"id": r.id, "name": r.name, "level": r.level}
+            for r in db.query(Subject.id, Subject.name, Subject.level).order_by(Subject.id)
+        ]
+        branches = [
+            {"id": r.id, "name": r.name, "subject_id": r.subject_id}
+            for r in db.query(Branch.id, Branch.name, Branch.subject_id).order_by(Branch.id)
+        ]
+        topics = [
+            {"id": r.id, "name": r.name, "subject_id": r.subject_id, "branch_id": r.branch_id}
+            for r in db.query(Topic.id, Topic.name, Topic.subject_id, Topic.branch_id).order_by(Topic.id)
+        ]
+        return TaxonomySnapshot(subjects, branches, topics, list_systems(db))
+
+    def note_system(self, system):
+        """Invalidate if a question was written with a system the snapshot does not list."""
+        snapshot = self._snapshot
+        if system and snapshot is not None and system not in snapshot.views["systems"]:
+            self.invalidate()
+
+
+taxonomy_cache = TaxonomyCache()
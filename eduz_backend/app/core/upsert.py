@@ -0,0 +1,35 @@
+# app/core/upsert.py
+"""
+Dialect-aware INSERT ... ON CONFLICT for bulk writes.
+
+Postgres and SQLite share the ON CONFLICT syntax but SQLAlchemy exposes it
+through dialect-specific ``insert`` constructs; this picks the right one for
+the connection so callers stay portable.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def insert_on_conflict(conn, table, rows, index_elements, update_columns=None, increment_columns=None, merge=None,
+                       returning=None):
+    """Insert `rows` (executemany) into `table`, skipping or updating conflicting rows.
+
+    With `update_columns` the conflicting rows take the incoming values of those
+    columns, and with `increment_columns` the incoming values are added to the
+    stored ones. `merge(stored, incoming)` can return {column: expression} for
+    any other rule, given the stored and incoming column collections. Otherwise
+    conflicting rows are left untouched. Returns the driver's rowcount, or with
+    `returning` (a list of columns) those columns of the rows actually written.
+    """
+    dialect = postgresql if conn.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    if update_columns or increment_columns or merge:
+        set_ = {c: stmt.excluded[c] for c in update_columns or ()}
+        set_.update({c: table.c[c] + stmt.excluded[c] for c in increment_columns or ()})
+        if merge:
+            set_.update(merge(table.c, stmt.excluded))
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    if returning:
+        return conn.execute(stmt.returning(*returning), rows).all()
+    return conn.execute(stmt, rows).rowcount
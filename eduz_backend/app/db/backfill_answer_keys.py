@@ -0,0 +1,55 @@
+# eduz-backend/app/db/backfill_answer_keys.py
+"""Fill questions.answer_key for rows written before the column existed.
+
+Walks the table in primary-key order, CHUNK_SIZE rows per transaction, so it can
+run against a live database and be safely re-run after an interruption.
+
+Usage: python -m app.db.backfill_answer_keys
+"""
+import os
+import sys
+
+if __name__ == "__main__":
+    parent = os.path.dirname(os.getcwd())
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+
+from sqlalchemy import update
+
+from app.core.answers import answer_key
+from app.core.database import SessionLocal
+from app.models import Question
+
+CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "1000"))
+
+
+def backfill_answer_keys(session_factory=SessionLocal, chunk_size: int = CHUNK_SIZE) -> int:
+    updated = 0
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = (
+                db.query(Question.id, Question.correct_option)
+                .filter(Question.id > last_id, Question.answer_key.is_(None))
+                .order_by(Question.id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not rows:
+                return updated
+            db.execute(
+                update(Question),
+                [{"id": r.id, "answer_key": answer_key(r.correct_option)} for r in rows],
+            )
+            db.commit()
+            updated += len(rows)
+            last_id = rows[-1].id
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    print("[INFO] Backfilling question answer keys...")
+    count = backfill_answer_keys()
+    print(f"[INFO] Done. {count} questions updated.")
@@ -0,0 +1,102 @@
+# eduz-backend/app/db/calibrate_irt.py
+"""Calibrate the IRT model over every stored quiz response.
+
+Reads every graded response from quiz_responses, fits student
+abilities and question difficulties (and discriminations for 2PL) with
+app.core.irt.calibrate, then writes the results back: questions with at least
+MIN_RESPONSES responses get irt_difficulty / irt_discrimination, and every
+student gets a fresh ability, ability variance and starting difficulty in
+user_progress. Questions below the threshold keep using their authored
+difficulty.
+
+Submissions between runs update abilities incrementally (see
+app.api.quiz.apply_progress_rule); run this periodically, e.g. nightly.
+Running API workers pick up the new question difficulties when their quiz
+index expires.
+
+Usage: python -m app.db.calibrate_irt [1pl|2pl]
+"""
+import os
+import sys
+
+if __name__ == "__main__":
+    parent = os.path.dirname(os.getcwd())
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+
+from array import array
+
+import numpy as np
+from sqlalchemy import update
+
+from app.core.database import SessionLocal
+from app.core.irt import ability_variance, calibrate, difficulty_level, difficulty_to_b
+from app.core.upsert import insert_on_conflict
+from app.models import Question, QuizResponse, UserProgress
+
+MIN_RESPONSES = int(os.getenv("IRT_MIN_RESPONSES", "20"))
+WRITE_CHUNK_SIZE = 5000
+
+
+def load_responses(db):
+    """Return (user_ids, question_ids, correct) numpy arrays, one entry per stored response."""
+    users, questions, correct = array("l"), array("l"), array("b")
+    rows = db.query(QuizResponse.user_id, QuizResponse.question_id, QuizResponse.correct).yield_per(50_000)
+    for user_id, question_id, is_correct in rows:
+        users.append(user_id)
+        questions.append(question_id)
+        correct.append(is_correct)
+    return np.frombuffer(users, dtype=np.int_), np.frombuffer(questions, dtype=np.int_), np.frombuffer(correct, dtype=np.int8)
+
+
+def fit(db, user_ids, question_ids, correct, model="2pl"):
+    """Calibrate on raw ids; returns per-user and per-question result arrays keyed by the unique ids."""
+    users, user_idx = np.unique(user_ids, return_inverse=True)
+    items, item_idx = np.unique(question_ids, return_inverse=True)
+    difficulty = {}
+    for start in range(0, len(items), WRITE_CHUNK_SIZE):
+        chunk = items[start:start + WRITE_CHUNK_SIZE].tolist()
+        difficulty.update(db.query(Question.id, Question.difficulty).filter(Question.id.in_(chunk)))
+    b_prior = difficulty_to_b([difficulty.get(int(q)) or 3 for q in items])
+    theta, b, a, iterations = calibrate(user_idx, item_idx, correct, len(users), len(items), b_prior, model)
+    theta_var = ability_variance(theta, b, a, user_idx, item_idx)
+    counts = np.bincount(item_idx, minlength=len(items))
+    return {"users": users, "theta": theta, "theta_var": theta_var,
+            "items": items, "b": b, "a": a, "counts": counts, "iterations": iterations}
+
+
+def calibrate_irt(session_factory=SessionLocal, model: str = "2pl", min_responses: int = MIN_RESPONSES) -> dict:
+    db = session_factory()
+    try:
+        user_ids, question_ids, correct = load_responses(db)
+        if not len(correct):
+            return {"responses": 0, "questions": 0, "students": 0, "iterations": 0}
+        result = fit(db, user_ids, question_ids, correct, model)
+
+        calibrated = [
+            {"id": int(q), "irt_difficulty": float(b), "irt_discrimination": float(a)}
+            for q, b, a, n in zip(result["items"], result["b"], result["a"], result["counts"]) if n >= min_responses
+        ]
+        for start in range(0, len(calibrated), WRITE_CHUNK_SIZE):
+            db.execute(update(Question), calibrated[start:start + WRITE_CHUNK_SIZE])
+
+        progress = [
+            {"user_id": int(u), "ability": float(t), "ability_var": float(v), "current_difficulty": difficulty_level(t)}
+            for u, t, v in zip(result["users"], result["theta"], result["theta_var"])
+        ]
+        for start in range(0, len(progress), WRITE_CHUNK_SIZE):
+            insert_on_conflict(db.connection(), UserProgress.__table__, progress[start:start + WRITE_CHUNK_SIZE],
+                               ["user_id"], update_columns=["ability", "ability_var", "current_difficulty"])
+        db.commit()
+        return {"responses": len(correct), "questions": len(calibrated), "students": len(progress),
+                "iterations": result["iterations"]}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    model = sys.argv[1] if len(sys.argv) > 1 else "2pl"
+    print(f"[INFO] Calibrating the {model.upper()} model over stored quiz responses...")
+    result = calibrate_irt(model=model)
+    print(f"[INFO] Done. {result['responses']} responses, {result['iterations']} iterations: "
+          f"{result['questions']} questions calibrated, {result['students']} abilities updated.")
@@ -0,0 +1,181 @@
+# eduz-backend/app/db/compute_question_stats.py
+"""Compute item statistics of questions from stored quiz responses.
+
+Full mode (the default) rebuilds question_stats from every submitted session.
+Incremental mode folds in only the sessions submitted since the previous run
+(tracked in job_state by submitted_at) by adding their totals to the stored
+ones. Sessions submitted in the last SETTLE_SECONDS are left for the next run,
+so results still being committed are not skipped. Run one instance at a time.
+
+Responses are read from quiz_responses in a single streamed query, ordered by
+session, and aggregated roughly CHUNK_SIZE sessions at a time with app.core.item_stats, so memory stays bounded by the
+number of questions, not the number of responses.
+
+Usage: python -m app.db.compute_question_stats [--incremental]
+"""
+import os
+import sys
+
+if __name__ == "__main__":
+    parent = os.path.dirname(os.getcwd())
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, insert
+
+from app.core import item_stats
+from app.core.answers import answer_key
+from app.core.database import SessionLocal
+from app.core.upsert import insert_on_conflict
+from app.models import JobState, Question, QuestionStats, QuizResponse, Quiz_session
+
+CHUNK_SIZE = int(os.getenv("STATS_CHUNK_SIZE", "20000"))  # sessions per aggregation batch
+SETTLE_SECONDS = int(os.getenv("STATS_SETTLE_SECONDS", "60"))
+JOB_NAME = "question_stats"
+LOOKUP_CHUNK_SIZE = 5000
+
+
+def _load_options(db, question_ids, options):
+    """Fill `options` with {question_id: {answer key: option index}} for ids not seen yet."""
+    missing = [qid for qid in question_ids if qid not in options]
+    for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+        chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+        for qid, opts in db.query(Question.id, Question.options).filter(Question.id.in_(chunk)):
+            options[qid] = {answer_key(o): i for i, o in reversed(list(enumerate(opts or [])))}
+        for qid in chunk:
+            options.setdefault(qid, None)  # deleted question: its responses are dropped
+
+
+def _chunk_totals(db, rows, options):
+    """Totals of a batch of (session_idx, question_id, correct, selected, time_ms) rows."""
+    session_idx, question_ids, correct, selected, time_ms = zip(*rows)
+    _load_options(db, set(question_ids), options)
+    keep = [options[q] is not None for q in question_ids]
+    option_idx = [
+        -2 if sel is None else options[q].get(sel, -1) if ok else -2
+        for q, sel, ok in zip(question_ids, selected, keep)
+    ]
+    keep = np.array(keep, dtype=bool)
+    return item_stats.aggregate(
+        np.array(session_idx)[keep], np.array(question_ids)[keep], np.array(correct, dtype=bool)[keep],
+        np.array(option_idx)[keep], np.array([-1 if t is None else t for t in time_ms], dtype=np.float64)[keep],
+    )
+
+
+def collect_totals(db, since=None, until=None, chunk_size: int = CHUNK_SIZE):
+    """Aggregate the responses of sessions submitted in (since, until].
+
+    Returns ``(ids, totals, options, sessions, responses)``, where `options` maps
+    each question id seen to its {answer key: option index} (None if deleted).
+    """
+    query = (
+        db.query(QuizResponse.session_id, QuizResponse.question_id, QuizResponse.correct,
+                 QuizResponse.selected, QuizResponse.time_ms)
+        .join(Quiz_session, Quiz_session.id == QuizResponse.session_id)
+    )
+    if since is not None:
+        query = query.filter(Quiz_session.submitted_at > since)
+    if until is not None:
+        query = query.filter(Quiz_session.submitted_at <= until)
+    # Ordered by session so a session's responses are never split across batches
+    query = query.order_by(QuizResponse.session_id)
+    options, parts, batch = {}, [], []
+    sessions = responses = batch_sessions = 0
+    current = None
+
+    def flush():
+        nonlocal responses
+        ids, totals = _chunk_totals(db, batch, options)
+        parts.append((ids, totals))
+        responses += int(totals[:, item_stats.N].sum())
+        batch.clear()
+
+    for session_id, question_id, correct, selected, time_ms in query.yield_per(LOOKUP_CHUNK_SIZE):
+        if session_id != current:
+            if batch_sessions >= chunk_size:
+                flush()
+                batch_sessions = 0
+                if len(parts) > 8:  # keep the number of pending rows bounded
+                    parts = [item_stats.combine(np.concatenate([p[0] for p in parts]),
+                                                np.concatenate([p[1] for p in parts]))]
+            current = session_id
+            sessions += 1
+            batch_sessions += 1
+        # session index within the batch, 0-based
+        batch.append((batch_sessions - 1, question_id, correct, selected, time_ms))
+    if batch:
+        flush()
+    if not parts:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, item_stats.TOTAL_COLUMNS)), options, sessions, responses
+    ids, totals = item_stats.combine(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+    return ids, totals, options, sessions, responses
+
+
+def _stats_rows(ids, totals, options, now):
+    p_value, discrimination, median = item_stats.derive(totals)
+    rows = []
+    for i, qid in enumerate(ids.tolist()):
+        n_options = min(len(options.get(qid) or ()), item_stats.MAX_OPTIONS)
+        counts = totals[i, item_stats.OPTIONS]
+        rows.append({
+            "question_id": qid,
+            "responses": int(totals[i, item_stats.N]),
+            "p_value": None if np.isnan(p_value[i]) else float(p_value[i]),
+            "discrimination": None if np.isnan(discrimination[i]) else float(discrimination[i]),
+            "median_time_ms": None if np.isnan(median[i]) else int(median[i]),
+            "option_counts": [int(c) for c in counts[:n_options]] + [int(counts[item_stats.MAX_OPTIONS])],
+            "totals": totals[i].tolist(),
+            "updated_at": now,
+        })
+    return rows
+
+
+def compute_question_stats(session_factory=SessionLocal, incremental: bool = False) -> dict:
+    db = session_factory()
+    try:
+        now = datetime.utcnow()
+        until = now - timedelta(seconds=SETTLE_SECONDS)
+        state = db.get(JobState, JOB_NAME)
+        since = state.watermark if incremental and state else None
+
+        ids, totals, options, sessions, responses = collect_totals(db, since, until)
+        if incremental and len(ids):
+            # Add the stored totals of the questions this run touched
+            stored = {}
+            id_list = ids.tolist()
+            for start in range(0, len(id_list), LOOKUP_CHUNK_SIZE):
+                chunk = id_list[start:start + LOOKUP_CHUNK_SIZE]
+                stored.update(db.query(QuestionStats.question_id, QuestionStats.totals)
+                              .filter(QuestionStats.question_id.in_(chunk)))
+            for i, qid in enumerate(id_list):
+                if qid in stored:
+                    totals[i] += np.asarray(stored[qid])
+
+        rows = _stats_rows(ids, totals, options, now)
+        conn = db.connection()
+        if not incremental:
+            conn.execute(delete(QuestionStats.__table__))
+        for start in range(0, len(rows), LOOKUP_CHUNK_SIZE):
+            chunk = rows[start:start + LOOKUP_CHUNK_SIZE]
+            if incremental:
+                insert_on_conflict(conn, QuestionStats.__table__, chunk, ["question_id"],
+                                   update_columns=[c for c in chunk[0] if c != "question_id"])
+            else:
+                conn.execute(insert(QuestionStats.__table__), chunk)
+        insert_on_conflict(conn, JobState.__table__, [{"name": JOB_NAME, "watermark": until}], ["name"],
+                           update_columns=["watermark"])
+        db.commit()
+        return {"sessions": sessions, "responses": responses, "questions": len(rows)}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    incremental = "--incremental" in sys.argv[1:]
+    print(f"[INFO] Computing question statistics ({'incremental' if incremental else 'full'})...")
+    result = compute_question_stats(incremental=incremental)
+    print(f"[INFO] Done. {result['sessions']} sessions, {result['responses']} responses folded; "
+          f"{result['questions']} questions updated.")
@@ -0,0 +1,97 @@
+# eduz-backend/app/db/dedupe_questions.py
+"""Fill questions.content_hash and collapse existing duplicate questions.
+
+Walks the questions that have no content_hash yet in primary-key order,
+CHUNK_SIZE rows per transaction. The first question seen with a given hash (or
+the one that already holds it) is kept and receives the hash. Later copies are
+collapsed into it: they are unapproved, point at the kept question through
+duplicate_of and keep a NULL hash, so the unique index is never violated. If any
+copy was approved, the kept question is approved as well. The rows are not
+deleted, so quiz history that references them stays valid. Devices see the
+copies as removed on their next /sync/questions.
+
+Safe to re-run after an interruption. Running API workers pick up the changes
+when their quiz index and pack registry expire.
+
+Usage: python -m app.db.dedupe_questions
+"""
+import os
+import sys
+
+if __name__ == "__main__":
+    parent = os.path.dirname(os.getcwd())
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+
+from collections import Counter
+
+from sqlalchemy import update
+
+from app.core.answers import content_hash
+from app.core.changes import next_change_seq
+from app.core.database import SessionLocal
+from app.core.systems import adjust_systems
+from app.models import Question
+
+CHUNK_SIZE = int(os.getenv("DEDUPE_CHUNK_SIZE", "1000"))
+
+
+def dedupe_questions(session_factory=SessionLocal, chunk_size: int = CHUNK_SIZE) -> dict:
+    stats = {"hashed": 0, "collapsed": 0}
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = (
+                db.query(Question.id, Question.question_text, Question.options, Question.approved, Question.systems)
+                .filter(Question.id > last_id, Question.content_hash.is_(None), Question.duplicate_of.is_(None))
+                .order_by(Question.id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not rows:
+                return stats
+            hashes = {r.id: content_hash(r.question_text, r.options) for r in rows}
+            # Questions already holding one of these hashes are the ones to keep
+            kept = dict(
+                db.query(Question.content_hash, Question.id)
+                .filter(Question.content_hash.in_(set(hashes.values())))
+                .all()
+            )
+            hashed, collapsed, approve, systems = [], [], set(), Counter()
+            for r in rows:
+                digest = hashes[r.id]
+                if digest in kept:
+                    collapsed.append({"id": r.id, "duplicate_of": kept[digest], "approved": False})
+                    systems[r.systems] -= 1  # collapsed questions leave the systems catalogue
+                    if r.approved:
+                        approve.add(kept[digest])
+                else:
+                    kept[digest] = r.id
+                    hashed.append({"id": r.id, "content_hash": digest})
+
+            # Core updates skip the ORM hook, so stamp the change sequence here
+            seq = next_change_seq(db.connection())
+            if hashed:
+                db.execute(update(Question), hashed)
+            if collapsed:
+                db.execute(update(Question), [dict(c, change_seq=seq) for c in collapsed])
+            if approve:
+                db.execute(
+                    update(Question)
+                    .where(Question.id.in_(approve), Question.approved.isnot(True))
+                    .values(approved=True, change_seq=seq)
+                )
+            adjust_systems(db.connection(), systems)
+            db.commit()
+            stats["hashed"] += len(hashed)
+            stats["collapsed"] += len(collapsed)
+            last_id = rows[-1].id
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    print("[INFO] Hashing questions and collapsing duplicates...")
+    result = dedupe_questions()
+    print(f"[INFO] Done. {result['hashed']} questions hashed, {result['collapsed']} duplicates collapsed.")
@@ -0,0 +1,76 @@
+# eduz-backend/app/db/rebuild_rollups.py
+"""Recompute the progress rollups from quiz_responses.
+
+The rollups are maintained incrementally by the submit and sync paths (see
+app.core.rollups); run this after upgrading to the progress_rollups schema,
+after raw SQL edits, or to repair streaks skewed by offline results uploaded
+out of order. Responses are streamed one student at a time and folded with
+the same code the submit path uses; the table is replaced in a single
+transaction.
+
+Usage: python -m app.db.rebuild_rollups
+"""
+import os
+import sys
+
+if __name__ == "__main__":
+    parent = os.path.dirname(os.getcwd())
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+
+from sqlalchemy import delete, insert
+
+from app.core.database import SessionLocal
+from app.core.rollups import question_scopes, rollup_rows
+from app.models import ProgressRollup, QuizResponse
+
+WRITE_CHUNK_SIZE = 5000
+
+
+def rebuild_rollups(session_factory=SessionLocal) -> dict:
+    db = session_factory()
+    try:
+        db.execute(delete(ProgressRollup))
+        scopes, pending = {}, []
+        students = written = 0
+
+        def fold(user_id, sessions):
+            nonlocal students, written
+            question_ids = {r["question_id"] for responses, _ in sessions.values() for r in responses}
+            scopes.update(question_scopes(db, question_ids - scopes.keys()))
+            pending.extend(rollup_rows(user_id, sessions.values(), scopes))
+            students += 1
+            if len(pending) >= WRITE_CHUNK_SIZE:
+                written += len(pending)
+                db.execute(insert(ProgressRollup), pending)
+                pending.clear()
+
+        rows = (
+            db.query(QuizResponse.user_id, QuizResponse.session_id, QuizResponse.question_id,
+                     QuizResponse.correct, QuizResponse.answered_at)
+            .order_by(QuizResponse.user_id, QuizResponse.session_id)
+            .yield_per(WRITE_CHUNK_SIZE)
+        )
+        current, sessions = None, {}
+        for user_id, session_id, question_id, correct, answered_at in rows:
+            if user_id != current:
+                if sessions:
+                    fold(current, sessions)
+                current, sessions = user_id, {}
+            responses, _ = sessions.setdefault(session_id, ([], answered_at))
+            responses.append({"question_id": question_id, "correct": correct})
+        if sessions:
+            fold(current, sessions)
+        if pending:
+            written += len(pending)
+            db.execute(insert(ProgressRollup), pending)
+        db.commit()
+        return {"students": students, "rows": written}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("[INFO] Rebuilding progress rollups...")
+    result = rebuild_rollups()
+    print(f"[INFO] Done. {result['rows']} rollup rows for {result['students']} students.")
@@ -0,0 +1,45 @@
+# eduz-backend/app/db/rebuild_systems.py
+"""Recompute the systems catalogue from the questions table.
+
+The catalogue is maintained incrementally by the write paths (see
+app.core.systems); run this after raw SQL edits or whenever the counts are
+suspected to have drifted. The table is replaced in a single transaction.
+
+Usage: python -m app.db.rebuild_systems
+"""
+import os
+import sys
+
+if __name__ == "__main__":
+    parent = os.path.dirname(os.getcwd())
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+
+from sqlalchemy import delete, func, insert
+
+from app.core.database import SessionLocal
+from app.models import Question, SystemEntry
+
+
+def rebuild_systems(session_factory=SessionLocal) -> int:
+    db = session_factory()
+    try:
+        counts = (
+            db.query(Question.systems, func.count(Question.id))
+            .filter(Question.systems != None, Question.systems != '', Question.duplicate_of.is_(None))
+            .group_by(Question.systems)
+            .all()
+        )
+        db.execute(delete(SystemEntry))
+        if counts:
+            db.execute(insert(SystemEntry), [{"name": name, "question_count": n} for name, n in counts])
+        db.commit()
+        return len(counts)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("[INFO] Rebuilding the systems catalogue...")
+    count = rebuild_systems()
+    print(f"[INFO] Done. {count} systems listed.")
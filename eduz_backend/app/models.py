@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
-from sqlalchemy import JSON
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Boolean, DateTime, Index, Float
+from sqlalchemy import JSON, text
+from sqlalchemy.orm import declarative_base, relationship, validates
 from datetime import datetime
 
+from app.core.answers import answer_key, content_hash
+
 Base = declarative_base()
 
 class User(Base):
@@ -19,7 +21,8 @@ class Subject(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String)
     subject_code = Column(String, nullable=True)  # optional exam code / external id (keep as string to preserve leading zeros)
-    level = Column(String)
+    level = Column(String, index=True)
+    change_seq = Column(BigInteger, nullable=False, server_default="0", index=True)  # see app.core.changes
     branches = relationship("Branch", back_populates="subject")
     topics = relationship("Topic", back_populates="subject")
 
@@ -27,7 +30,8 @@ class Branch(Base):
     __tablename__ = "branches"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False, index=True)
+    change_seq = Column(BigInteger, nullable=False, server_default="0", index=True)
     subject = relationship("Subject", back_populates="branches")
     topics = relationship("Topic", back_populates="branch") 
 
@@ -35,8 +39,9 @@ class Topic(Base):
     __tablename__ = "topics"
     id = Column(Integer, primary_key=True)
     name = Column(String)
-    subject_id = Column(Integer, ForeignKey("subjects.id"))
+    subject_id = Column(Integer, ForeignKey("subjects.id"), index=True)
     branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)
+    change_seq = Column(BigInteger, nullable=False, server_default="0", index=True)
     subject = relationship("Subject", back_populates="topics")
     branch = relationship("Branch", back_populates="topics")
 
@@ -46,15 +51,74 @@ class Question(Base):
     question_text = Column(String)
     options = Column(JSON) 
     correct_option = Column(String)
+    answer_key = Column(String, nullable=True)  # canonical form of correct_option, see app.core.answers
     topic_id = Column(Integer, ForeignKey("topics.id"))
     branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)
     created_by = Column(Integer, ForeignKey("users.id"))
     approved = Column(Boolean, default=False)
     systems = Column(String, nullable=True)
     difficulty = Column(Integer, default=3)  # 1=easy ... 6=very hard
+    change_seq = Column(BigInteger, nullable=False, server_default="0", index=True)
+    content_hash = Column(String(64), nullable=True)  # see app.core.answers.content_hash
+    duplicate_of = Column(Integer, ForeignKey("questions.id"), nullable=True)  # set when collapsed into another question
+    irt_difficulty = Column(Float, nullable=True)  # calibrated b on the logit scale, see app.core.irt
+    irt_discrimination = Column(Float, nullable=True)  # calibrated a (2PL)
     topic = relationship("Topic")
     branch = relationship("Branch")
 
+    @validates("correct_option")
+    def _set_answer_key(self, key, value):
+        # Normalize once at write time so grading is a plain string comparison
+        self.answer_key = answer_key(value)
+        return value
+
+    # Access paths of quiz selection, listings, packs and sync; tests/test_query_plans.py
+    # checks that none of them falls back to a table scan
+    __table_args__ = (
+        Index("uq_questions_content_hash", "content_hash", unique=True),
+        Index("ix_questions_approved_id", "approved", "id"),
+        Index("ix_questions_topic_id", "topic_id", "id"),
+        # Partial: only approved questions are ever served
+        Index("ix_questions_approved_topic_difficulty", "topic_id", "difficulty", "id",
+              postgresql_where=text("approved = true"), sqlite_where=text("approved = 1")),
+        Index("ix_questions_approved_branch_difficulty", "branch_id", "difficulty", "id",
+              postgresql_where=text("approved = true"), sqlite_where=text("approved = 1")),
+    )
+
+    @validates("question_text", "options")
+    def _set_content_hash(self, key, value):
+        text = value if key == "question_text" else self.question_text
+        options = value if key == "options" else self.options
+        if text is not None and options is not None:
+            self.content_hash = content_hash(text, options)
+        return value
+
+class SystemEntry(Base):
+    """Catalogue of Question.systems values with the number of questions using each (see app.core.systems)."""
+    __tablename__ = "systems"
+    name = Column(String, primary_key=True)
+    question_count = Column(Integer, nullable=False, default=0)
+
+class ChangeCounter(Base):
+    """Single-row counter handing out change_seq values for content tables."""
+    __tablename__ = "change_counter"
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+class QuestionScopeMove(Base):
+    """Previous sync scope of a question that left it (re-tagged topic, topic moved to another subject, level renamed)."""
+    __tablename__ = "question_scope_moves"
+    id = Column(Integer, primary_key=True)
+    change_seq = Column(BigInteger, nullable=False)  # the change that moved it, see app.core.changes
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    old_topic_id = Column(Integer, nullable=True)
+    old_subject_id = Column(Integer, nullable=True)
+    old_level = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_question_scope_moves_change_seq", "change_seq"),
+    )
+
 class Quiz_session(Base):
     __tablename__ = "quiz_sessions"
     id = Column(Integer, primary_key=True)
@@ -67,16 +131,106 @@ class Quiz_session(Base):
     correct_answers = Column(Integer, nullable=True)
     started_at = Column(DateTime, default=datetime.utcnow)
     ended_at = Column(DateTime, nullable=True)
-    responses = Column(JSON, nullable=True) # [{"question_id":1,"difficulty":3,"correct":True},...]
+    submitted_at = Column(DateTime, nullable=True, index=True) # server time the results were received (item statistics watermark)
+    manifest = Column(JSON, nullable=True) # {"ids":[...],"difficulty":[...],"answers":[...]} served by /quiz/start
+    client_key = Column(String, nullable=True) # idempotency key of a session taken offline and uploaded via /sync/results
     
     user = relationship("User")
     subject = relationship("Subject")
     topic = relationship("Topic")
     branch = relationship("Branch")
 
+    __table_args__ = (
+        Index("uq_quiz_sessions_user_client_key", "user_id", "client_key", unique=True),
+        Index("ix_quiz_sessions_user_id", "user_id", "id"),
+    )
+
+class QuizResponse(Base):
+    """One graded answer of a quiz session, written in bulk by /quiz/submit and /sync/results."""
+    __tablename__ = "quiz_responses"
+    session_id = Column(Integer, ForeignKey("quiz_sessions.id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    selected = Column(String, nullable=True)  # answer key of the chosen option, see app.core.answers
+    correct = Column(Boolean, nullable=False)
+    time_ms = Column(Integer, nullable=True)  # measured on the device, when it reports it
+    answered_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_quiz_responses_question", "question_id", "answered_at"),  # per-question analytics
+        Index("ix_quiz_responses_user", "user_id", "answered_at"),  # a student's answer history
+    )
+
 class UserProgress(Base):
     __tablename__ = "user_progress"
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
-    current_difficulty = Column(Integer, default=3)
+    current_difficulty = Column(Integer, default=3)  # difficulty_level(ability), where the next quiz starts
     incorrect_streak = Column(Integer, default=0)
+    ability = Column(Float, nullable=False, default=0.0, server_default="0")  # IRT theta, see app.core.irt
+    ability_var = Column(Float, nullable=False, default=1.0, server_default="1")
+
+
+class ReviewItem(Base):
+    """A question a student missed, scheduled to come back in a later quiz (see app.core.review)."""
+    __tablename__ = "review_items"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    due_at = Column(DateTime, nullable=False)
+    interval_days = Column(Float, nullable=False)
+    reps = Column(Integer, nullable=False, default=0)  # correct reviews since the last miss
+    lapses = Column(Integer, nullable=False, default=0)  # times missed
+
+    __table_args__ = (
+        Index("ix_review_items_user_due", "user_id", "due_at"),
+    )
+
+class ProgressRollup(Base):
+    """A student's totals for one subject, branch or topic, kept up to date by submissions (see app.core.rollups)."""
+    __tablename__ = "progress_rollups"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    scope = Column(String, primary_key=True)  # subject, branch or topic
+    scope_id = Column(Integer, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)  # quizzes with at least one question in scope
+    questions = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)  # per-quiz scores (0..100) within the scope
+    last_activity_at = Column(DateTime, nullable=False)
+    streak_start_day = Column(Integer, nullable=False)  # date.toordinal() of the first day of the current streak
+    last_active_day = Column(Integer, nullable=False)  # date.toordinal() of the last day with a quiz in scope
+
+    __table_args__ = (
+        Index("ix_progress_rollups_scope", "scope", "scope_id", "user_id"),  # class overview of one scope
+    )
+
+class QuestionStats(Base):
+    """Item statistics of a question, written by app/db/compute_question_stats.py (see app.core.item_stats)."""
+    __tablename__ = "question_stats"
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    responses = Column(Integer, nullable=False)
+    p_value = Column(Float, nullable=True)
+    discrimination = Column(Float, nullable=True)
+    median_time_ms = Column(Integer, nullable=True)
+    option_counts = Column(JSON, nullable=False)  # one count per option in Question.options order, then "other"
+    totals = Column(JSON, nullable=False)  # additive totals the statistics are derived from
+    updated_at = Column(DateTime, nullable=False)
+
+class OutboxTask(Base):
+    """Deferred work committed together with the request that caused it, run by app.core.tasks."""
+    __tablename__ = "task_outbox"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # selects the handler
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    available_at = Column(DateTime, nullable=True, default=datetime.utcnow)  # next attempt; NULL once retries are exhausted
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_task_outbox_available", "available_at", "id"),
+    )
 
+class JobState(Base):
+    """Progress marker of an incremental batch job, e.g. the last submitted_at folded into question_stats."""
+    __tablename__ = "job_state"
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=True)
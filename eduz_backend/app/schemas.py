@@ -101,6 +101,90 @@ class QuestionOut(BaseModel):
     class Config:
         from_attributes = True
 
+# Bulk import report
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row (CSV header and blank NDJSON lines not counted)
+    errors: List[str]
+
+class QuestionImportReport(BaseModel):
+    imported: int
+    duplicates: int  # rows matching an existing question (skipped, or merged into it)
+    failed: int
+    errors: List[ImportRowError]  # capped at IMPORT_MAX_ERRORS entries
+
+# Item statistics (see app.core.item_stats)
+class OptionCount(BaseModel):
+    option: str
+    count: int
+
+class QuestionStatsOut(BaseModel):
+    question_id: int
+    responses: int
+    p_value: Optional[float] = None  # share of correct answers
+    discrimination: Optional[float] = None  # point-biserial correlation with the rest of the quiz
+    median_time_ms: Optional[int] = None
+    options: List[OptionCount]
+    other: int  # answers matching none of the options
+    flags: List[str]
+    updated_at: datetime
+
+class QuestionStatsRow(BaseModel):
+    question_id: int
+    question_text: str
+    topic_id: int
+    difficulty: Optional[int] = None
+    responses: int
+    p_value: Optional[float] = None
+    discrimination: Optional[float] = None
+    median_time_ms: Optional[int] = None
+    flags: List[str]
+
+# Progress dashboards (see app.core.rollups)
+class ProgressOut(BaseModel):
+    scope: str  # subject, branch or topic
+    scope_id: int
+    attempts: int  # quizzes with at least one question in scope
+    questions: int
+    correct: int
+    average_score: Optional[float] = None  # mean per-quiz score within the scope
+    last_activity_at: datetime
+    streak_days: int  # consecutive days with a quiz in scope, up to today or yesterday
+
+class ClassProgressRow(ProgressOut):
+    user_id: int
+    name: Optional[str] = None
+
+# Delta sync of the question bank
+class SyncQuestion(BaseModel):
+    id: int
+    question_text: str
+    options: List[str]
+    correct_option: str
+    topic_id: int
+    branch_id: Optional[int] = None
+    difficulty: Optional[int] = None
+    systems: Optional[str] = None
+    change_seq: int
+
+class SyncSubject(SubjectOut):
+    change_seq: int
+
+class SyncBranch(BranchOut):
+    change_seq: int
+
+class SyncTopic(TopicOut):
+    change_seq: int
+
+class QuestionSyncPage(BaseModel):
+    since: int
+    subjects: List[SyncSubject] = []
+    branches: List[SyncBranch] = []
+    topics: List[SyncTopic] = []
+    questions: List[SyncQuestion] = []
+    removed_question_ids: List[int] = []
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to get the next page
+    version: Optional[int] = None  # set on the last page: use as ?since= next time
+
 # Quiz schemas
 class QuizQuestionResponse(BaseModel):
     id: int
@@ -115,6 +199,7 @@ class QuizStartRequest(BaseModel):
     branch_id: Optional[int] = None
     num_questions: int = 3
     level: Optional[str] = None
+    include_reviews: bool = False  # mix in due review items (questions missed earlier), see app.core.review
 
     @validator('num_questions')
     def num_questions_must_be_positive(cls, v):
@@ -131,6 +216,13 @@ class QuizStartRequest(BaseModel):
 class UserAnswer(BaseModel):
     question_id: int
     selected_option: str
+    time_ms: Optional[int] = None  # time spent on the question, measured on the device
+
+    @validator('time_ms')
+    def time_ms_not_negative(cls, v):
+        if v is not None and v < 0:
+            raise ValueError('time_ms cannot be negative.')
+        return v
 
 class QuizSubmissionRequest(BaseModel):
     quiz_session_id: int
@@ -150,6 +242,42 @@ class QuizSessionOut(BaseModel):
     class Config:
         from_attributes = True
 
+# Offline results uploaded in bulk
+class OfflineQuizResult(BaseModel):
+    client_key: str  # generated on the device; retried uploads reuse it
+    subject_id: Optional[int] = None
+    topic_id: Optional[int] = None
+    branch_id: Optional[int] = None
+    started_at: datetime
+    ended_at: datetime
+    answers: List[UserAnswer]
+
+    @validator('client_key')
+    def client_key_length(cls, v):
+        if not 1 <= len(v) <= 64:
+            raise ValueError('client_key must be between 1 and 64 characters.')
+        return v
+
+class ResultSyncRequest(BaseModel):
+    results: List[OfflineQuizResult]
+
+    @validator('results')
+    def batch_size_limit(cls, v):
+        if len(v) > 500:
+            raise ValueError('At most 500 results can be uploaded per batch.')
+        return v
+
+class ResultSyncItem(BaseModel):
+    client_key: str
+    quiz_session_id: int
+    duplicate: bool  # True when this client_key had already been uploaded
+    score: Optional[int] = None
+    correct_answers: Optional[int] = None
+    total_questions: Optional[int] = None
+
+class ResultSyncResponse(BaseModel):
+    results: List[ResultSyncItem]
+
 class QuizStartResponse(BaseModel):
     questions: List[QuizQuestionResponse]
     quiz_session_id: int
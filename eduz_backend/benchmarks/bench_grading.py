@@ -0,0 +1,55 @@
+"""Microbenchmark: answers graded per second, before and after write-time answer keys.
+
+before: normalize the stored correct_option and the submitted answer for every
+        answer, then compare as sets (multi-select) or strings.
+after:  compare the submitted answer's key against the precomputed answer_key.
+
+Usage: python -m benchmarks.bench_grading [--answers N]
+"""
+import argparse
+import json
+import random
+import time
+
+from app.core.answers import answer_key, normalize_answer
+
+CORRECT_OPTIONS = ["B", '"A, C"', "0\\n1\\n2", "Number of rows in users", "'D'", "a,b,c"]
+
+
+def grade_before(correct_option, selected):
+    nq, nu = normalize_answer(correct_option), normalize_answer(selected)
+    if nq["multi"] or nu["multi"]:
+        return set(nq["tokens"]) == set(nu["tokens"])
+    return nq["raw"] == nu["raw"]
+
+
+def grade_after(stored_key, selected):
+    return stored_key == answer_key(selected)
+
+
+def run(n: int) -> dict:
+    rng = random.Random(42)
+    correct = [rng.choice(CORRECT_OPTIONS) for _ in range(n)]
+    selected = [rng.choice(CORRECT_OPTIONS) for _ in range(n)]
+    keys = [answer_key(c) for c in correct]  # computed once at write time in production
+
+    t0 = time.perf_counter()
+    before = [grade_before(c, s) for c, s in zip(correct, selected)]
+    t1 = time.perf_counter()
+    after = [grade_after(k, s) for k, s in zip(keys, selected)]
+    t2 = time.perf_counter()
+
+    assert before == after, "answer_key grading must match the legacy comparison"
+    return {
+        "answers": n,
+        "before_per_sec": round(n / (t1 - t0)),
+        "after_per_sec": round(n / (t2 - t1)),
+        "speedup": round((t1 - t0) / (t2 - t1), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--answers", type=int, default=200_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.answers), indent=2))
@@ -0,0 +1,74 @@
+"""Benchmark: bulk question import throughput and peak memory.
+
+Generates a CSV of N questions (topics referenced by name) and runs it through
+the same import path as POST /questions/import against a throwaway SQLite
+database, reporting rows per second and the peak Python heap during import.
+
+Usage: python -m benchmarks.bench_import [--questions N] [--chunk-size 5000]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import resource
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.importer import import_questions
+from app.models import Base, Subject, Topic
+
+
+def make_csv(n: int, topics) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["question_text", "options", "correct_option", "topic", "subject", "difficulty"])
+    for i in range(n):
+        writer.writerow([f"Question {i}", "A|B|C|D", "ABCD"[i % 4], topics[i % len(topics)], "Bench", 1 + i % 6])
+    return buf.getvalue().encode()
+
+
+def run(n: int, chunk_size: int) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            subject = Subject(name="Bench", level="Form 4")
+            db.add(subject)
+            db.flush()
+            names = [f"Topic {i}" for i in range(50)]
+            db.add_all([Topic(name=name, subject_id=subject.id) for name in names])
+            db.commit()
+        upload = io.BytesIO(make_csv(n, names))
+
+        with Session(engine) as db:
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            t0 = time.perf_counter()
+            report = import_questions(db, upload, "csv", created_by=1, chunk_size=chunk_size)
+            elapsed = time.perf_counter() - t0
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            "questions": n,
+            "chunk_size": chunk_size,
+            "imported": report["imported"],
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(report["imported"] / elapsed),
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+        }
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.questions, args.chunk_size), indent=2))
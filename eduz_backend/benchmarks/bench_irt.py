@@ -0,0 +1,59 @@
+"""Benchmark: IRT calibration over simulated responses and the per-submission ability update.
+
+Simulates `--responses` answers from known 2PL parameters, then times
+app.core.irt.calibrate (1PL and 2PL) and reports how well the true parameters
+are recovered (Pearson correlation), plus the latency of update_ability for a
+10-question submission.
+
+Usage: python -m benchmarks.bench_irt [--responses 10000000] [--students 200000] [--questions 100000]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.irt import calibrate, update_ability
+
+
+def simulate(responses: int, students: int, questions: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    theta = rng.normal(0, 1, students)
+    b = rng.normal(0, 1, questions)
+    a = rng.uniform(0.5, 2.0, questions)
+    users = rng.integers(0, students, responses)
+    items = rng.integers(0, questions, responses)
+    p = 1 / (1 + np.exp(-a[items] * (theta[users] - b[items])))
+    return theta, b, a, users, items, rng.random(responses) < p
+
+
+def run(responses: int, students: int, questions: int) -> dict:
+    theta, b, a, users, items, correct = simulate(responses, students, questions)
+    report = {"responses": responses, "students": students, "questions": questions}
+    for model in ("1pl", "2pl"):
+        t0 = time.perf_counter()
+        est_theta, est_b, est_a, iterations = calibrate(users, items, correct, students, questions, model=model)
+        report[model] = {
+            "seconds": round(time.perf_counter() - t0, 2),
+            "iterations": iterations,
+            "theta_r": round(float(np.corrcoef(theta, est_theta)[0, 1]), 3),
+            "b_r": round(float(np.corrcoef(b, est_b)[0, 1]), 3),
+        }
+        if model == "2pl":
+            report[model]["a_r"] = round(float(np.corrcoef(a, est_a)[0, 1]), 3)
+
+    n = 10_000
+    t0 = time.perf_counter()
+    for i in range(n):
+        update_ability(0.0, 1.0, b[i % questions:i % questions + 10], a[:10], correct[:10])
+    report["update_ability_us"] = round((time.perf_counter() - t0) / n * 1e6, 1)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=10_000_000)
+    parser.add_argument("--students", type=int, default=200_000)
+    parser.add_argument("--questions", type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.responses, args.students, args.questions), indent=2))
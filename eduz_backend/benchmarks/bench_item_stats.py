@@ -0,0 +1,92 @@
+"""Benchmark: item statistics aggregated over simulated responses.
+
+Simulates `--responses` answers in quiz sessions of 10 questions and runs them
+through app.core.item_stats chunk by chunk, as app/db/compute_question_stats.py
+does: aggregate each chunk, combine, then derive the statistics. Reading the
+responses from the database is not included. A per-row Python aggregation
+over the first chunk is timed too, for comparison.
+
+Usage: python -m benchmarks.bench_item_stats [--responses 50000000] [--questions 100000]
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from app.core import item_stats
+
+QUESTIONS_PER_SESSION = 10
+CHUNK_RESPONSES = 1_000_000
+
+
+def simulate_chunk(rng, n: int, questions: int):
+    sessions = n // QUESTIONS_PER_SESSION
+    skill = np.repeat(rng.beta(5, 3, sessions), QUESTIONS_PER_SESSION)
+    session_idx = np.repeat(np.arange(sessions), QUESTIONS_PER_SESSION)
+    question_ids = rng.integers(1, questions + 1, sessions * QUESTIONS_PER_SESSION)
+    correct = rng.random(question_ids.size) < skill
+    option = np.where(correct, 0, rng.integers(1, 4, question_ids.size))
+    time_ms = rng.lognormal(9.5, 0.6, question_ids.size)
+    return session_idx, question_ids, correct, option, time_ms
+
+
+def python_baseline(session_idx, question_ids, correct):
+    """Per-row Python: p-value and point-biserial sums with dicts."""
+    n_s, c_s = defaultdict(int), defaultdict(int)
+    for s, x in zip(session_idx.tolist(), correct.tolist()):
+        n_s[s] += 1
+        c_s[s] += x
+    sums = defaultdict(lambda: [0, 0, 0.0, 0.0, 0.0])
+    for s, q, x in zip(session_idx.tolist(), question_ids.tolist(), correct.tolist()):
+        y = (c_s[s] - x) / (n_s[s] - 1)
+        t = sums[q]
+        t[0] += 1
+        t[1] += x
+        t[2] += y
+        t[3] += y * y
+        t[4] += x * y
+    return sums
+
+
+def run(responses: int, questions: int) -> dict:
+    rng = np.random.default_rng(42)
+    parts, aggregate_s = [], 0.0
+    baseline_s = None
+    for start in range(0, responses, CHUNK_RESPONSES):
+        chunk = simulate_chunk(rng, min(CHUNK_RESPONSES, responses - start), questions)
+        if baseline_s is None:
+            t0 = time.perf_counter()
+            python_baseline(*chunk[:3])
+            baseline_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        parts.append(item_stats.aggregate(*chunk))
+        if len(parts) > 8:
+            parts = [item_stats.combine(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))]
+        aggregate_s += time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ids, totals = item_stats.combine(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+    p_value, discrimination, median = item_stats.derive(totals)
+    finish_s = time.perf_counter() - t0
+    return {
+        "responses": int(totals[:, item_stats.N].sum()),
+        "questions": len(ids),
+        "aggregate_s": round(aggregate_s, 2),
+        "combine_and_derive_s": round(finish_s, 2),
+        "responses_per_s": round(responses / (aggregate_s + finish_s)),
+        "python_per_row_1m_s": round(baseline_s, 2),
+        "numpy_1m_s": round(aggregate_s / max(1, responses / CHUNK_RESPONSES), 3),
+        "mean_p_value": round(float(np.nanmean(p_value)), 3),
+        "mean_discrimination": round(float(np.nanmean(discrimination)), 3),
+        "median_time_ms": int(np.nanmedian(median)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=50_000_000)
+    parser.add_argument("--questions", type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.responses, args.questions), indent=2))
@@ -0,0 +1,79 @@
+"""Benchmark: per-page latency of GET /questions/ listings on a large bank.
+
+Seeds a throwaway SQLite database with N approved questions and times pages at
+increasing depth with the keyset query used by the endpoint (`id > cursor`)
+and, for comparison, the equivalent OFFSET query. Keyset latency should stay
+flat with depth; OFFSET grows linearly.
+
+Usage: python -m benchmarks.bench_listing [--questions N] [--page-size 100]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api.questions import QUESTION_LIST_COLUMNS
+from app.core.pagination import keyset_page
+from app.models import Base, Question, Subject, Topic
+
+
+def seed(session, n: int, chunk: int = 50_000):
+    subject = Subject(name="Bench", level="Form 4")
+    session.add(subject)
+    session.flush()
+    topics = [Topic(name=f"T{i}", subject_id=subject.id) for i in range(50)]
+    session.add_all(topics)
+    session.flush()
+    for start in range(0, n, chunk):
+        session.execute(insert(Question), [
+            {"question_text": f"Question {i}", "options": ["a", "b", "c", "d"], "correct_option": "a",
+             "answer_key": "a", "topic_id": topics[i % 50].id, "created_by": 1, "approved": True,
+             "difficulty": 1 + i % 6, "change_seq": 1}
+            for i in range(start, min(start + chunk, n))
+        ])
+    session.commit()
+    return topics[0].id
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return round(best * 1000, 3)
+
+
+def run(n: int, page_size: int) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        seed(session, n)
+        base = session.query(*QUESTION_LIST_COLUMNS).filter(Question.approved == True)
+
+        results = []
+        for depth in (0, n // 10, n // 2, n - page_size):
+            # id is the cursor; seeded ids are dense, so depth == last id seen
+            keyset_ms = timed(lambda: keyset_page(base, Question.id, depth or None, page_size))
+            offset_ms = timed(lambda: base.order_by(Question.id).offset(depth).limit(page_size).all())
+            results.append({"rows_skipped": depth, "keyset_ms": keyset_ms, "offset_ms": offset_ms})
+        session.close()
+        return {"questions": n, "page_size": page_size, "pages": results}
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=500_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(run(args.questions, args.page_size), indent=2))
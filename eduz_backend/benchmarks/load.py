@@ -0,0 +1,150 @@
+"""Concurrent load benchmark for the API.
+
+Each virtual client logs in as one of the seeded students, then loops until the
+deadline: start a quiz on a random subject, submit answers for it, and fetch a
+page of the question listing. Latencies are reported per endpoint
+(p50/p95/p99, requests per second, errors) as JSON.
+
+By default the app runs in-process through httpx.ASGITransport against
+--database-url (seed it first with benchmarks.seed), so no server or Postgres
+is needed. Pass --base-url to drive a running deployment instead.
+
+Usage:
+  python -m benchmarks.seed --database-url sqlite:///./bench.db --scale 10k
+  python -m benchmarks.load --database-url sqlite:///./bench.db --clients 50 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, user_email
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples, elapsed: float) -> dict:
+    """samples: {endpoint: [(seconds, ok), ...]}"""
+    report = {}
+    for endpoint, values in sorted(samples.items()):
+        latencies = sorted(s for s, _ in values)
+        report[endpoint] = {
+            "requests": len(values),
+            "errors": sum(1 for _, ok in values if not ok),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+    return report
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    async def call(self, client, endpoint, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+            ok = resp.status_code < 400
+        except httpx.HTTPError:
+            resp, ok = None, False
+        self.samples[endpoint].append((time.perf_counter() - start, ok))
+        return resp if ok else None
+
+
+async def run_client(client, recorder, user_index, subject_ids, topic_ids, deadline, questions_per_quiz):
+    rng = random.Random(user_index)
+    resp = await recorder.call(client, "POST /users/login", "POST", "/users/login",
+                               data={"username": user_email(user_index), "password": BENCH_PASSWORD})
+    if resp is None:
+        return
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    while time.perf_counter() < deadline:
+        resp = await recorder.call(client, "POST /quiz/start", "POST", "/quiz/start", headers=headers,
+                                   json={"subject_id": rng.choice(subject_ids), "num_questions": questions_per_quiz})
+        if resp is not None:
+            quiz = resp.json()
+            answers = [{"question_id": q["id"], "selected_option": rng.choice(q["options"])} for q in quiz["questions"]]
+            await recorder.call(client, "POST /quiz/submit", "POST", "/quiz/submit", headers=headers,
+                                json={"quiz_session_id": quiz["quiz_session_id"], "answers": answers})
+        await recorder.call(client, "GET /questions/", "GET", "/questions/", headers=headers,
+                            params={"topic_id": rng.choice(topic_ids), "limit": 50})
+
+
+async def run(args) -> dict:
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from main import app  # imported late: app.core.database reads DATABASE_URL at import time
+        from app.core import tasks
+        from app.core.database import SessionLocal
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+        # ASGITransport does not run the app's lifespan; start the task worker it would start
+        if tasks.TASK_MODE != "inline":
+            tasks.start_worker(SessionLocal)
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        subject_ids = [s["id"] for s in (await client.get("/questions/subjects")).json()]
+        topic_ids = [t["id"] for t in (await client.get("/questions/topics")).json()]
+        if not subject_ids or not topic_ids:
+            raise SystemExit("No subjects/topics found; seed the database with benchmarks.seed first")
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            run_client(client, recorder, 1 + i % args.users, subject_ids, topic_ids, deadline, args.questions_per_quiz)
+            for i in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - start
+    if not args.base_url:
+        tasks.stop_worker()
+
+    total = sum(len(v) for v in recorder.samples.values())
+    return {
+        "target": base_url if args.base_url else f"in-process ({os.environ.get('DATABASE_URL')})",
+        "db_mode": os.getenv("DB_MODE", "sync"),
+        "clients": args.clients,
+        "duration_s": round(elapsed, 2),
+        "total_requests": total,
+        "total_rps": round(total / elapsed, 1),
+        "endpoints": summarize(recorder.samples, elapsed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="database for the in-process app (default: DATABASE_URL)")
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--users", type=int, default=2000, help="number of seeded students to log in as")
+    parser.add_argument("--questions-per-quiz", type=int, default=10)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Generate a synthetic, production-sized dataset for benchmarks.
+
+Creates the schema, a taxonomy of subjects/branches/topics across levels,
+`--questions` approved questions, `--users` students who all share the password
+BENCH_PASSWORD (hashed once) and `--sessions` completed and submitted quiz
+sessions per student spread over the past HISTORY_DAYS days, with their graded
+answers in quiz_responses so the calibration, item statistics and rollup jobs
+have a history to process.
+
+Rows are generated in id-range chunks by a pool of `--workers` processes. Each
+chunk draws from its own RNG, seeded from (--seed, table, first id), so the
+output is identical whatever the worker count or completion order (apart from
+the salted password hash). The parent process writes the chunks in id order:
+with COPY on Postgres (psycopg2) and a Core executemany elsewhere. Difficulties
+follow DIFFICULTY_WEIGHTS and topics are picked with a long-tailed weighting,
+so a few topics hold most of the bank as in production. A question's topic,
+difficulty and correct option are a hash of its id (question_traits), which lets
+the session generator draw questions of one subject and answer them from a 1PL
+model without seeing the question chunks.
+
+The schema is dropped and recreated, so a database that already holds rows is
+refused unless --reset is given; the target defaults to sqlite:///./bench.db,
+never to the app's DATABASE_URL.
+
+Usage: python -m benchmarks.seed --database-url sqlite:///./bench.db --scale 1m [--users 20000] [--workers 8] [--reset]
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from sqlalchemy import JSON, create_engine, func, insert, inspect, select
+
+from app.core.answers import answer_key, content_hash
+from app.core.irt import DIFFICULTY_SCALE
+from app.core.security import hash_password
+from app.models import (Base, Branch, ChangeCounter, Question, Quiz_session, QuizResponse, Subject, SystemEntry,
+                        Topic, User)
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+LEVELS = ["Form 1", "Form 2", "Form 3", "Form 4", "Form 5"]
+SYSTEMS = ["GCE", "WAEC", "BEPC", None]
+# Share of the bank at difficulty 1..6: most questions are mid-range, few are very hard
+DIFFICULTY_WEIGHTS = [0.12, 0.22, 0.27, 0.21, 0.12, 0.06]
+_DIFFICULTY_CUM = list(itertools.accumulate(DIFFICULTY_WEIGHTS))
+BENCH_PASSWORD = "Bench123!"
+CHUNK_SIZE = 20_000
+SUBJECTS_PER_LEVEL, BRANCHES_PER_SUBJECT, TOPICS_PER_BRANCH = 4, 3, 5
+QUESTIONS_PER_SESSION = 10
+# Draws per session when sampling questions of the session's subject; small banks may yield shorter quizzes
+MAX_DRAWS_PER_SESSION = 50 * QUESTIONS_PER_SESSION
+HISTORY_DAYS = 180
+HISTORY_END = datetime(2026, 1, 1)
+
+
+def user_email(i: int) -> str:
+    return f"bench{i}@example.com"
+
+
+def taxonomy_rows():
+    subjects, branches, topics = [], [], []
+    for level in LEVELS:
+        for _ in range(SUBJECTS_PER_LEVEL):
+            sid = len(subjects) + 1
+            subjects.append({"id": sid, "name": f"Subject {sid}", "level": level, "change_seq": 1})
+            for _ in range(BRANCHES_PER_SUBJECT):
+                bid = len(branches) + 1
+                branches.append({"id": bid, "name": f"Branch {bid}", "subject_id": sid, "change_seq": 1})
+                for _ in range(TOPICS_PER_BRANCH):
+                    tid = len(topics) + 1
+                    topics.append({"id": tid, "name": f"Topic {tid}", "subject_id": sid, "branch_id": bid,
+                                   "change_seq": 1})
+    return subjects, branches, topics
+
+
+def _rng(seed: int, table: str, start: int) -> random.Random:
+    # String seeds are hashed with SHA-512, so they do not depend on PYTHONHASHSEED
+    return random.Random(f"{seed}:{table}:{start}")
+
+
+def topic_weights(n_topics: int):
+    # Topic i gets weight 1/(1 + i % 7): every subject has a few large topics and a tail of small ones
+    return list(itertools.accumulate(1 / (1 + i % 7) for i in range(n_topics)))
+
+
+def _mix64(x: int) -> int:
+    # splitmix64 finalizer: a cheap, well-spread hash of a 64-bit integer
+    x = (x + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+
+def question_traits(qid: int, seed: int, cum_topic_weights):
+    """(topic index, difficulty, correct option index) of question `qid`, a pure function of (seed, qid)."""
+    h = _mix64(((seed & 0xFFFFFFFF) << 32) | qid)
+    u_topic, u_difficulty = (h >> 11) / 2 ** 53, (_mix64(h) >> 11) / 2 ** 53
+    topic = min(bisect_right(cum_topic_weights, u_topic * cum_topic_weights[-1]), len(cum_topic_weights) - 1)
+    difficulty = 1 + min(bisect_right(_DIFFICULTY_CUM, u_difficulty * _DIFFICULTY_CUM[-1]), 5)
+    return topic, difficulty, h & 3
+
+
+def _option(qid: int, k: int) -> str:
+    return f"Option {qid}-{k}"
+
+
+def question_rows(start: int, stop: int, topics, seed: int):
+    """Questions with ids in [start, stop)."""
+    rng = _rng(seed, "questions", start)
+    cum_weights = topic_weights(len(topics))
+    rows = []
+    for qid in range(start, stop):
+        t, difficulty, k = question_traits(qid, seed, cum_weights)
+        topic = topics[t]
+        options = [_option(qid, j) for j in range(4)]
+        text = f"Synthetic question {qid}"
+        rows.append({
+            "id": qid, "question_text": text, "options": options, "correct_option": options[k],
+            "answer_key": answer_key(options[k]), "content_hash": content_hash(text, options),
+            "topic_id": topic["id"], "branch_id": topic["branch_id"], "created_by": 1, "approved": True,
+            "systems": SYSTEMS[rng.randrange(len(SYSTEMS))], "difficulty": difficulty, "change_seq": 1,
+        })
+    return rows
+
+
+def user_rows(start: int, stop: int, password_hash: str):
+    """Students 1-based index in [start, stop); student i has user id i + 1 (id 1 is the admin)."""
+    return [
+        {"id": i + 1, "name": f"Bench {i}", "email": user_email(i), "role": "student", "password_hash": password_hash,
+         "created_at": HISTORY_END - timedelta(days=HISTORY_DAYS)}
+        for i in range(start, stop)
+    ]
+
+
+def session_rows(start: int, stop: int, topics, sessions_per_user: int, questions: int, seed: int):
+    """Submitted quiz sessions of students in [start, stop) and their quiz_responses rows.
+
+    Session ids are fixed by student index. Each session covers one subject: the
+    subject of a first random question, then up to QUESTIONS_PER_SESSION
+    distinct questions of that subject. A student with ability theta ~ N(0, 1)
+    answers a question of difficulty d correctly with the 1PL probability used
+    by app.core.irt.
+    """
+    rng = _rng(seed, "quiz_sessions", start)
+    cum_weights = topic_weights(len(topics))
+    sessions, responses = [], []
+    for i in range(start, stop):
+        theta = rng.gauss(0, 1)
+        for k in range(sessions_per_user):
+            session_id = (i - 1) * sessions_per_user + k + 1
+            started = HISTORY_END - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+            ended = started + timedelta(seconds=rng.randrange(60, 900))
+            picked, subject_id = {}, None
+            for _ in range(MAX_DRAWS_PER_SESSION if questions else 0):
+                qid = rng.randint(1, questions)
+                traits = question_traits(qid, seed, cum_weights)
+                topic = topics[traits[0]]
+                if subject_id is None:
+                    subject_id = topic["subject_id"]
+                if topic["subject_id"] == subject_id:
+                    picked.setdefault(qid, traits)
+                    if len(picked) == QUESTIONS_PER_SESSION:
+                        break
+            correct = 0
+            for qid, (_, difficulty, key) in picked.items():
+                p = 1 / (1 + math.exp(-(theta - (difficulty - 3.5) * DIFFICULTY_SCALE)))
+                right = rng.random() < p
+                chosen = key if right else (key + 1 + rng.randrange(3)) % 4
+                correct += right
+                responses.append({
+                    "session_id": session_id, "question_id": qid, "user_id": i + 1,
+                    "selected": answer_key(_option(qid, chosen)), "correct": right,
+                    "time_ms": rng.randrange(3_000, 60_000), "answered_at": ended,
+                })
+            total = len(picked)
+            sessions.append({
+                "id": session_id, "user_id": i + 1, "subject_id": subject_id or topics[0]["subject_id"],
+                "topic_id": None, "branch_id": None, "total_questions": total,
+                "correct_answers": correct, "score": round(correct / total * 100) if total else 0,
+                "started_at": started, "ended_at": ended, "submitted_at": ended,
+            })
+    return sessions, responses
+
+
+# -- worker side -----------------------------------------------------------
+_context = {}
+
+
+def _init_worker(context):
+    _context.update(context)
+
+
+def _generate(task):
+    """Return the chunk as [(table name, rows), ...] in write order."""
+    kind, start, stop = task
+    c = _context
+    if kind == "questions":
+        return [(kind, question_rows(start, stop, c["topics"], c["seed"]))]
+    if kind == "users":
+        return [(kind, user_rows(start, stop, c["password_hash"]))]
+    sessions, responses = session_rows(start, stop, c["topics"], c["sessions_per_user"], c["questions"], c["seed"])
+    return [(kind, sessions), ("quiz_responses", responses)]
+
+
+def _tasks(kind, count, chunk_size, first=1):
+    return [(kind, start, min(start + chunk_size, first + count)) for start in range(first, first + count, chunk_size)]
+
+
+# -- writer side -----------------------------------------------------------
+TABLES = {"questions": Question.__table__, "users": User.__table__, "quiz_sessions": Quiz_session.__table__,
+          "quiz_responses": QuizResponse.__table__}
+
+
+def _copy_rows(conn, table, rows):
+    columns = list(rows[0])
+    json_columns = {c.name for c in table.columns if isinstance(c.type, JSON)}
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        # None is written as an unquoted empty field, which COPY reads as NULL
+        writer.writerow([json.dumps(r[c]) if c in json_columns else r[c] for c in columns])
+    buf.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def write_rows(conn, table, rows):
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        _copy_rows(conn, table, rows)
+    else:
+        conn.execute(insert(table), rows)
+
+
+def _reset_sequences(conn):
+    # Rows were written with explicit ids, so move the serial sequences past them
+    for table in (User, Subject, Branch, Topic, Question, Quiz_session):
+        name = table.__tablename__
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE((SELECT MAX(id) FROM {name}), 1))"
+        )
+
+
+def _has_rows(engine) -> bool:
+    existing = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        return any(conn.execute(select(1).select_from(table).limit(1)).first() is not None
+                   for table in Base.metadata.sorted_tables if table.name in existing)
+
+
+def seed(database_url: str, questions: int, users: int, seed_value: int = 42, sessions_per_user: int = 0,
+         workers: int = None, chunk_size: int = CHUNK_SIZE, reset: bool = False) -> dict:
+    workers = workers or os.cpu_count() or 1
+    engine = create_engine(database_url)
+    if not reset and _has_rows(engine):
+        engine.dispose()
+        raise SystemExit(f"{engine.url!r} already holds data; pass --reset to drop and recreate its tables")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    subjects, branches, topics = taxonomy_rows()
+    password_hash = hash_password(BENCH_PASSWORD)
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(ChangeCounter), [{"id": 1, "value": 1}])
+        conn.execute(insert(User), [{"id": 1, "name": "Bench Admin", "email": "benchadmin@example.com",
+                                     "role": "admin", "password_hash": password_hash,
+                                     "created_at": HISTORY_END - timedelta(days=HISTORY_DAYS)}])
+        conn.execute(insert(Subject), subjects)
+        conn.execute(insert(Branch), branches)
+        conn.execute(insert(Topic), topics)
+
+    context = {"topics": topics, "seed": seed_value, "sessions_per_user": sessions_per_user,
+               "questions": questions, "password_hash": password_hash}
+    # Users and questions before sessions and their responses (foreign keys)
+    tasks = _tasks("users", users, chunk_size) + _tasks("questions", questions, chunk_size)
+    if sessions_per_user:
+        tasks += _tasks("quiz_sessions", users, max(1, chunk_size // (sessions_per_user * QUESTIONS_PER_SESSION)))
+    written = dict.fromkeys(TABLES, 0)
+    with multiprocessing.get_context("spawn").Pool(workers, _init_worker, (context,)) as pool:
+        # imap yields in task order; windows of 2 * workers bound the chunks held in memory
+        for window in range(0, len(tasks), 2 * workers):
+            for chunk in pool.imap(_generate, tasks[window:window + 2 * workers]):
+                with engine.begin() as conn:
+                    for kind, rows in chunk:
+                        write_rows(conn, TABLES[kind], rows)
+                        written[kind] += len(rows)
+
+    with engine.begin() as conn:
+        counts = conn.execute(
+            select(Question.systems, func.count()).where(Question.systems.isnot(None)).group_by(Question.systems)
+        ).all()
+        if counts:
+            conn.execute(insert(SystemEntry), [{"name": name, "question_count": n} for name, n in counts])
+        if engine.dialect.name == "postgresql":
+            _reset_sequences(conn)
+            conn.exec_driver_sql("ANALYZE")
+    elapsed = time.perf_counter() - t0
+    engine.dispose()
+    return {"database_url": database_url, "questions": written["questions"], "users": written["users"],
+            "quiz_sessions": written["quiz_sessions"], "quiz_responses": written["quiz_responses"], "subjects": len(subjects), "topics": len(topics),
+            "workers": workers, "seconds": round(elapsed, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # Deliberately not DATABASE_URL: app.core.security loads the app's .env at import time
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--questions", type=int, help="overrides --scale")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=5, help="historical quiz sessions per student")
+    parser.add_argument("--workers", type=int, help="generator processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop the tables of a database that already holds data")
+    args = parser.parse_args(argv)
+    result = seed(args.database_url, args.questions or SCALES[args.scale], args.users, args.seed,
+                  sessions_per_user=args.sessions, workers=args.workers, reset=args.reset)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,11 @@ Usage:
   - Run: python bulk_insert_cs_questions.py
 
 Notes:
+  - For production-sized benchmark data use `python -m benchmarks.seed`.
   - This script is idempotent for the FK records (it will reuse existing
-    users/subjects/branches/topics). It does NOT attempt to deduplicate
-    question texts — running multiple times will insert more questions.
+    users/subjects/branches/topics). Questions whose content hash already
+    exists (same normalized text and options) are skipped, so running it
+    multiple times does not insert duplicates.
 """
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
@@ -462,11 +464,18 @@ def main():
         # Generate questions across topics (default total 120)
         questions = generate_questions_for_all_topics(topics, total_questions=120)
 
+        # Skip questions already in the bank (questions.content_hash is unique)
+        existing = {
+            h for (h,) in session.query(Question.content_hash)
+            .filter(Question.content_hash.in_({q.content_hash for q in questions}))
+        }
+        new_questions = {q.content_hash: q for q in questions if q.content_hash not in existing}
+
         # Bulk insert using add_all
-        session.add_all(questions)
+        session.add_all(new_questions.values())
         session.commit()
 
-        print(f"Inserted {len(questions)} new questions into the database.")
+        print(f"Inserted {len(new_questions)} new questions into the database.")
     except Exception as exc:
         session.rollback()
         print("Error during insertion:", exc)
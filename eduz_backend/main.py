@@ -1,8 +1,21 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import users,questions,quiz
+from app.api import users,questions,quiz,packs,sync,progress
+from app.core import tasks
+from app.core.database import SessionLocal
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Post-submission work runs on an in-process worker fed by the task_outbox table
+    if tasks.TASK_MODE != "inline":
+        tasks.start_worker(SessionLocal)
+    yield
+    tasks.stop_worker()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,8 +23,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # keyset pagination cursor on list endpoints
 )
 
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(questions.router, prefix="/questions", tags=["Questions"])
-app.include_router(quiz.router, prefix="/quiz", tags=["Quiz"])
\ No newline at end of file
+app.include_router(quiz.router, prefix="/quiz", tags=["Quiz"])
+app.include_router(packs.router, prefix="/packs", tags=["Packs"])
+app.include_router(sync.router, prefix="/sync", tags=["Sync"])
+app.include_router(progress.router, prefix="/progress", tags=["Progress"])
\ No newline at end of file
@@ -5,8 +5,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_read_db, get_async_db, get_async_read_db, DB_MODE, _async_url
 from app import models
+from app.core import packs, tasks
+from app.core.answer_keys import answer_key_cache
+from app.core.auth import principal_cache
+from app.core.question_index import question_index
+from app.core.taxonomy import taxonomy_cache
 
 import os
 
@@ -28,6 +33,24 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db  # no replica in tests
+
+# Run post-submission tasks within the request so tests can assert on their effects
+tasks.TASK_MODE = "inline"
+
+# In DB_MODE=async the routes depend on get_async_db; point it at the same test database
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(_async_url(TEST_DATABASE_URL))
+    TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -53,6 +76,17 @@ def setup_db():
         os.remove("./test.db")
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    # Tests write straight to the DB, so drop process-local caches between tests
+    question_index.invalidate()
+    principal_cache.clear()
+    packs.invalidate()
+    answer_key_cache.clear()
+    taxonomy_cache.invalidate()
+    yield
+
+
 @pytest.fixture
 def client():
     return TestClient(app)
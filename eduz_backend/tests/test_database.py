@@ -0,0 +1,145 @@
+import asyncio
+import inspect
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db, to_async_handler
+from app.models import Subject, ChangeCounter
+
+pytest.importorskip("aiosqlite")
+
+
+def test_async_handler_runs_sync_query_code_on_async_engine(tmp_path):
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    AsyncTestingSession = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Subject.__table__.create)
+            await conn.run_sync(ChangeCounter.__table__.create)
+    asyncio.run(setup())
+
+    async def get_test_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    def create_and_count(name: str, db: Session = Depends(get_db)):
+        db.add(Subject(name=name, level="Grade 1"))
+        db.commit()
+        return {"count": db.query(Subject).count()}
+
+    handler = to_async_handler(create_and_count, get_test_db)
+    assert inspect.iscoroutinefunction(handler)
+
+    app = FastAPI()
+    app.post("/subjects/{name}")(handler)
+    client = TestClient(app)
+    assert client.post("/subjects/Maths").json() == {"count": 1}
+    assert client.post("/subjects/Biology").json() == {"count": 2}
+    asyncio.run(engine.dispose())
+
+
+def _sqlite_with_subject(path, name):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    engine = create_engine(f"sqlite:///{path}")
+    Subject.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(Subject.__table__.insert(), [{"name": name, "level": "Grade 1"}])
+    return engine, sessionmaker(bind=engine)
+
+
+def test_read_routes_use_the_replica_and_fall_back_to_the_primary(tmp_path, monkeypatch):
+    from app.core import database
+    from app.core.database import ReplicaRouter, get_read_db
+
+    _, primary = _sqlite_with_subject(tmp_path / "primary.db", "from primary")
+    replica_engine, replica = _sqlite_with_subject(tmp_path / "replica.db", "from replica")
+    router = ReplicaRouter(replica_engine, max_lag=5, check_seconds=60)
+    monkeypatch.setattr(database, "SessionLocal", primary)
+    monkeypatch.setattr(database, "ReadSessionLocal", replica)
+    monkeypatch.setattr(database, "replica_router", router)
+
+    app = FastAPI()
+
+    @app.get("/subjects")
+    def subjects(db: Session = Depends(get_read_db)):
+        return [s.name for s in db.query(Subject)]
+
+    client = TestClient(app)
+    assert client.get("/subjects").json() == ["from replica"]
+    router.mark_down()
+    assert client.get("/subjects").json() == ["from primary"]
+
+
+def test_replica_router_checks_reachability_and_lag(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from app.core import database
+    from app.core.database import ReplicaRouter
+
+    router = ReplicaRouter(create_engine(f"sqlite:///{tmp_path / 'replica.db'}"), max_lag=5, check_seconds=0)
+    assert router.use_replica()
+    monkeypatch.setattr(database, "replica_lag", lambda conn: 30.0)
+    assert not router.use_replica()
+    monkeypatch.setattr(database, "replica_lag", lambda conn: 1.5)
+    assert router.use_replica()
+
+    unreachable = ReplicaRouter(create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"), check_seconds=60)
+    assert not unreachable.use_replica()
+
+
+def test_failed_replica_reads_are_retried_on_the_primary(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.orm import sessionmaker
+    from app.core import database
+    from app.core.database import ReplicaRouter, get_async_db, get_read_db, retry_on_primary
+
+    # The replica answers but has no subjects table, so every query on it fails
+    _, primary = _sqlite_with_subject(tmp_path / "primary.db", "from primary")
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    replica = sessionmaker(bind=replica_engine, info={"replica": True})
+    router = ReplicaRouter(replica_engine, max_lag=5, check_seconds=60)
+    monkeypatch.setattr(database, "SessionLocal", primary)
+    monkeypatch.setattr(database, "ReadSessionLocal", replica)
+    monkeypatch.setattr(database, "replica_router", router)
+
+    def subjects(db: Session = Depends(get_read_db)):
+        return [s.name for s in db.query(Subject)]
+
+    app = FastAPI()
+    app.get("/subjects")(retry_on_primary(subjects))
+    assert TestClient(app).get("/subjects").json() == ["from primary"]
+    assert not router.use_replica()
+
+    # Async handlers: same retry, and a second session declared with Depends(get_db) runs on the async primary
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}") for name in ("primary.db", "replica.db")]
+    async_primary = async_sessionmaker(engines[0], expire_on_commit=False)
+    async_replica = async_sessionmaker(engines[1], expire_on_commit=False, info={"replica": True})
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_primary)
+    router._usable, router._checked_until = True, float("inf")
+
+    async def get_replica_db():
+        async with async_replica() as db:
+            yield db
+
+    async def get_primary_db():
+        async with async_primary() as db:
+            yield db
+
+    def both(db: Session = Depends(get_read_db), primary: Session = Depends(get_db)):
+        return {"read": [s.name for s in db.query(Subject)], "primary": primary.query(Subject).count()}
+
+    app = FastAPI()
+    app.dependency_overrides[get_async_db] = get_primary_db
+    app.get("/both")(to_async_handler(both, get_replica_db))
+    assert TestClient(app).get("/both").json() == {"read": ["from primary"], "primary": 1}
+    assert not router.use_replica()
+    for engine in engines:
+        asyncio.run(engine.dispose())
@@ -0,0 +1,82 @@
+# tests/test_irt.py
+
+import numpy as np
+
+from app.core.irt import calibrate, difficulty_level, difficulty_to_b, update_ability
+
+
+def simulate(n_users=2000, n_items=200, per_user=60, seed=3):
+    rng = np.random.default_rng(seed)
+    theta = rng.normal(0, 1, n_users)
+    b = rng.normal(0, 1, n_items)
+    a = rng.uniform(0.6, 2.0, n_items)
+    users = np.repeat(np.arange(n_users), per_user)
+    items = rng.integers(0, n_items, users.size)
+    p = 1 / (1 + np.exp(-a[items] * (theta[users] - b[items])))
+    return theta, b, a, users, items, rng.random(users.size) < p
+
+
+def test_calibrate_recovers_simulated_parameters():
+    theta, b, a, users, items, correct = simulate()
+    est_theta, est_b, est_a, iterations = calibrate(users, items, correct, len(theta), len(b))
+    assert iterations < 50
+    assert np.corrcoef(theta, est_theta)[0, 1] > 0.85
+    assert np.corrcoef(b, est_b)[0, 1] > 0.95
+    assert np.corrcoef(a, est_a)[0, 1] > 0.6
+
+
+def test_calibrate_1pl_keeps_unit_discrimination():
+    _, b, _, users, items, correct = simulate(n_users=300, n_items=50, per_user=20)
+    _, est_b, est_a, _ = calibrate(users, items, correct, 300, 50, model="1pl")
+    assert np.all(est_a == 1.0) and np.all(np.isfinite(est_b))
+
+
+def test_update_ability_moves_towards_evidence_and_shrinks_variance():
+    b = difficulty_to_b([3, 4, 5])
+    up, var = update_ability(0.0, 1.0, b, np.ones(3), [True, True, True])
+    down, _ = update_ability(0.0, 1.0, b, np.ones(3), [False, False, False])
+    assert down < 0.0 < up and var < 1.0
+    assert update_ability(0.4, 0.3, [], [], []) == (0.4, 0.3)
+
+
+def test_difficulty_level_round_trips_authored_difficulties():
+    assert [difficulty_level(x) for x in difficulty_to_b(range(1, 7))] == [1, 2, 3, 4, 5, 6]
+    assert difficulty_level(-10) == 1 and difficulty_level(10) == 6
+
+
+def test_calibration_job_writes_question_and_student_parameters(db_session):
+    from datetime import datetime
+    from app.db.calibrate_irt import calibrate_irt
+    from app.models import Question, Quiz_session, QuizResponse, Subject, Topic, User, UserProgress
+    from tests.conftest import TestingSessionLocal
+
+    sub = Subject(name="Astronomy", level="Grade 6")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Planets", subject_id=sub.id)
+    strong, weak = User(name="Strong", email="irtstrong@example.com", role="student"), \
+        User(name="Weak", email="irtweak@example.com", role="student")
+    db_session.add_all([topic, strong, weak])
+    db_session.commit()
+    easy, hard = [Question(question_text=f"Planet {d}?", options=["yes", "no"], correct_option="yes",
+                           topic_id=topic.id, approved=True, difficulty=d, created_by=1) for d in (2, 5)]
+    db_session.add_all([easy, hard])
+    db_session.commit()
+    # The strong student gets both right; the weak one only ever gets the easy question right
+    for user, hard_correct in ((strong, True), (weak, False)):
+        for _ in range(5):
+            session = Quiz_session(user_id=user.id, topic_id=topic.id, ended_at=datetime(2026, 1, 1))
+            db_session.add(session)
+            db_session.flush()
+            db_session.add_all(QuizResponse(session_id=session.id, question_id=q.id, user_id=user.id, correct=correct,
+                                            answered_at=session.ended_at)
+                               for q, correct in ((easy, True), (hard, hard_correct)))
+    db_session.commit()
+
+    result = calibrate_irt(TestingSessionLocal, min_responses=1)
+    assert result["responses"] >= 20 and result["questions"] >= 2
+    db_session.expire_all()
+    assert db_session.get(Question, hard.id).irt_difficulty > db_session.get(Question, easy.id).irt_difficulty
+    abilities = dict(db_session.query(UserProgress.user_id, UserProgress.ability)
+                     .filter(UserProgress.user_id.in_([strong.id, weak.id])))
+    assert abilities[strong.id] > abilities[weak.id]
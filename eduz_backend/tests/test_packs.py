@@ -0,0 +1,85 @@
+import gzip
+import json
+import sqlite3
+
+import pytest
+from app.core import packs
+from app.models import Subject, Topic, Question
+
+
+@pytest.fixture(autouse=True)
+def pack_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(packs, "PACK_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def student_headers(client):
+    client.post("/users/register", json={
+        "email": "packstud@example.com",
+        "name": "PackStud",
+        "role": "student",
+        "password": "Secret123!"
+    })
+    login = client.post("/users/login", data={"username": "packstud@example.com", "password": "Secret123!"})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+@pytest.fixture
+def subject_with_questions(db_session):
+    sub = Subject(name="Chemistry", level="Form 5")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Acids", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    db_session.add_all([
+        Question(question_text=f"Acid {i} (topic {topic.id})?", options=["a", "b"], correct_option="a",
+                 topic_id=topic.id, approved=i < 3, difficulty=2, created_by=1)
+        for i in range(4)
+    ])
+    db_session.commit()
+    return sub
+
+
+def test_json_pack_download_etag_and_range(client, student_headers, subject_with_questions, db_session):
+    url = f"/packs/subjects/{subject_with_questions.id}"
+    resp = client.get(url, headers=student_headers)
+    assert resp.status_code == 200
+    pack = json.loads(gzip.decompress(resp.content))
+    assert len(pack["questions"]) == 3
+    assert pack["subjects"][0]["level"] == "Form 5"
+    etag = resp.headers["etag"]
+
+    # Unchanged content revalidates to 304
+    resp = client.get(url, headers={**student_headers, "If-None-Match": etag})
+    assert resp.status_code == 304
+
+    # Partial downloads can resume
+    resp = client.get(url, headers={**student_headers, "Range": "bytes=0-9"})
+    assert resp.status_code == 206
+    assert len(resp.content) == 10
+
+    # Approving a question changes the pack version
+    pending = (db_session.query(Question).join(Topic, Question.topic_id == Topic.id)
+               .filter(Topic.subject_id == subject_with_questions.id, Question.approved == False).first())
+    pending.approved = True
+    db_session.commit()
+    packs.invalidate()
+    resp = client.get(url, headers={**student_headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+
+def test_sqlite_pack_is_queryable(client, student_headers, subject_with_questions, tmp_path):
+    resp = client.get(f"/packs/subjects/{subject_with_questions.id}?format=sqlite", headers=student_headers)
+    assert resp.status_code == 200
+    db_file = tmp_path / "pack.sqlite"
+    db_file.write_bytes(gzip.decompress(resp.content))
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0] == 3
+    conn.close()
+
+
+def test_unknown_subject_pack_is_404(client, student_headers):
+    assert client.get("/packs/subjects/999999", headers=student_headers).status_code == 404
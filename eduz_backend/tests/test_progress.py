@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+from app.models import ProgressRollup, Question, Subject, Topic, User
+
+
+def _token(client, db_session, email, role):
+    client.post("/users/register", json={"email": email, "name": email.split("@")[0], "role": "student",
+                                         "password": "Secret123!"})
+    user = db_session.query(User).filter_by(email=email).first()
+    user.role = role
+    db_session.commit()
+    login = client.post("/users/login", data={"username": email, "password": "Secret123!"})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+@pytest.fixture
+def student(client, db_session):
+    return _token(client, db_session, "progstud@example.com", "student")
+
+
+@pytest.fixture
+def teacher(client, db_session):
+    return _token(client, db_session, "progteach@example.com", "teacher")
+
+
+def test_submissions_update_progress_rollups(client, student, teacher, db_session):
+    from app.db.rebuild_rollups import rebuild_rollups
+    from tests.conftest import TestingSessionLocal
+    sub = Subject(name="Geography", level="Form 2")
+    db_session.add(sub)
+    db_session.commit()
+    rivers, mountains = Topic(name="Rivers", subject_id=sub.id), Topic(name="Mountains", subject_id=sub.id)
+    db_session.add_all([rivers, mountains])
+    db_session.commit()
+    questions = [Question(question_text=f"Landform {i}?", options=["yes", "no"], correct_option="yes",
+                          topic_id=(rivers if i < 2 else mountains).id, approved=True, difficulty=3, created_by=1)
+                 for i in range(4)]
+    db_session.add_all(questions)
+    db_session.commit()
+
+    # One wrong answer, in Mountains
+    start = client.post("/quiz/start", json={"subject_id": sub.id, "num_questions": 4}, headers=student).json()
+    resp = client.post("/quiz/submit", json={"quiz_session_id": start["quiz_session_id"], "answers": [
+        {"question_id": q["id"], "selected_option": "no" if q["id"] == questions[3].id else "yes"}
+        for q in start["questions"]
+    ]}, headers=student)
+    assert resp.status_code == 200
+
+    subject_view = client.get("/progress/me", params={"scope": "subject", "scope_id": sub.id}, headers=student).json()
+    assert len(subject_view) == 1
+    assert {k: subject_view[0][k] for k in ("attempts", "questions", "correct", "average_score", "streak_days")} == \
+        {"attempts": 1, "questions": 4, "correct": 3, "average_score": 75, "streak_days": 1}
+    topics = {p["scope_id"]: p["average_score"]
+              for p in client.get("/progress/me", params={"scope": "topic"}, headers=student).json()}
+    assert topics == {rivers.id: 100, mountains.id: 50}
+
+    overview = client.get(f"/progress/subject/{sub.id}/students", headers=teacher)
+    assert overview.status_code == 200
+    assert [(r["name"], r["correct"]) for r in overview.json()] == [("progstud", 3)]
+    assert client.get(f"/progress/subject/{sub.id}/students", headers=student).status_code == 403
+    assert client.get("/progress/me", params={"scope": "level"}, headers=student).status_code == 422
+
+    # The rebuild command arrives at the same rows
+    before = client.get("/progress/me", params={"scope": "topic"}, headers=student).json()
+    rebuild_rollups(TestingSessionLocal)
+    assert client.get("/progress/me", params={"scope": "topic"}, headers=student).json() == before
+
+
+def test_rollup_streaks_merge_across_submissions(db_session):
+    from app.core.rollups import progress_out, record_rollups
+    user = User(name="Streaky", email="streaky@example.com", role="student")
+    sub = Subject(name="History", level="Form 3")
+    db_session.add_all([user, sub])
+    db_session.commit()
+    topic = Topic(name="Empires", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    question = Question(question_text="Which empire?", options=["a", "b"], correct_option="a",
+                        topic_id=topic.id, approved=True, difficulty=3, created_by=1)
+    db_session.add(question)
+    db_session.commit()
+    day = datetime(2026, 3, 10, 12)
+    right = [{"question_id": question.id, "correct": True}]
+
+    def view(today):
+        row = db_session.query(*ProgressRollup.__table__.c).filter_by(user_id=user.id, scope_id=topic.id).one()
+        return row.attempts, progress_out(row._mapping, today)["streak_days"]
+
+    record_rollups(db_session, user.id, [(right, day - timedelta(days=3)), (right, day - timedelta(days=2))])
+    db_session.commit()
+    record_rollups(db_session, user.id, [(right, day - timedelta(days=1)), (right, day)])
+    db_session.commit()
+    assert view(day) == (4, 4)
+    assert view(day + timedelta(days=1)) == (4, 4)  # still alive until the end of the next day
+    assert view(day + timedelta(days=2)) == (4, 0)
+
+    # An old session uploaded late counts but leaves the streak alone; a gap starts a new one
+    record_rollups(db_session, user.id, [(right, day - timedelta(days=10))])
+    db_session.commit()
+    assert view(day) == (5, 4)
+    record_rollups(db_session, user.id, [(right, day + timedelta(days=3))])
+    db_session.commit()
+    assert view(day + timedelta(days=3)) == (6, 1)
@@ -0,0 +1,146 @@
+"""EXPLAIN regression suite for the hot queries.
+
+Each hot query is built with the same ORM constructs the application uses, run
+through EXPLAIN on a seeded database, and fails if the plan scans a whole
+table. SQLite always runs with a small bank; EDUZ_SCALE_TESTS=1 raises it to
+1M questions. Postgres plans are checked when EXPLAIN_DATABASE_URL points to a
+scratch database (its tables are dropped and recreated) and scale tests are on,
+since the Postgres planner rightly prefers sequential scans on small tables.
+"""
+import os
+import random
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import and_, create_engine, insert, or_
+from sqlalchemy.orm import Session
+
+from app.api.questions import QUESTION_LIST_COLUMNS, _filter_questions
+from app.core import packs, review
+from app.models import Base, Branch, Question, ProgressRollup, Quiz_session, QuizResponse, ReviewItem, Subject, Topic, User
+
+SCALE = bool(os.getenv("EDUZ_SCALE_TESTS"))
+QUESTIONS = 1_000_000 if SCALE else 20_000
+LEVELS = ["Form 1", "Form 2", "Form 3", "Form 4", "Form 5"]
+
+BACKENDS = ["sqlite"]
+if SCALE and os.getenv("EXPLAIN_DATABASE_URL"):
+    BACKENDS.append("postgresql")
+
+
+def _seed(engine):
+    rng = random.Random(7)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": i, "name": f"u{i}", "email": f"u{i}@example.com", "role": "student"}
+                                    for i in range(1, 1001)])
+        conn.execute(insert(Subject), [{"id": i, "name": f"S{i}", "level": LEVELS[i % 5]} for i in range(1, 41)])
+        conn.execute(insert(Branch), [{"id": i, "name": f"B{i}", "subject_id": 1 + i % 40} for i in range(1, 121)])
+        conn.execute(insert(Topic), [{"id": i, "name": f"T{i}", "subject_id": 1 + i % 40, "branch_id": 1 + i % 120}
+                                     for i in range(1, 801)])
+        for start in range(1, QUESTIONS + 1, 50_000):
+            conn.execute(insert(Question), [
+                {"id": i, "question_text": f"Q{i}", "options": ["a", "b"], "correct_option": "a", "answer_key": "a",
+                 "topic_id": 1 + i % 800, "branch_id": 1 + i % 120, "created_by": 1,
+                 "approved": rng.random() < 0.9, "difficulty": 1 + i % 6, "change_seq": 1 + i // 1000}
+                for i in range(start, min(start + 50_000, QUESTIONS + 1))
+            ])
+        conn.execute(insert(Quiz_session), [{"id": i, "user_id": 1 + i % 1000, "score": 50} for i in range(1, 20_001)])
+        conn.execute(insert(QuizResponse), [
+            {"session_id": 1 + i // 5, "question_id": 1 + i * 7 % QUESTIONS, "user_id": 1 + (1 + i // 5) % 1000,
+             "correct": i % 3 > 0, "answered_at": datetime(2026, 1, 1) + timedelta(minutes=i)}
+            for i in range(100_000)
+        ])
+        conn.execute(insert(ProgressRollup), [
+            {"user_id": 1 + i % 1000, "scope": ("subject", "branch", "topic")[i // 1000 % 3], "scope_id": 1 + i // 1000,
+             "attempts": 1, "questions": 10, "correct": 5, "score_sum": 50, "last_activity_at": datetime(2026, 1, 1),
+             "streak_start_day": 739617, "last_active_day": 739617}
+            for i in range(60_000)
+        ])
+        conn.execute(insert(ReviewItem), [
+            {"user_id": 1 + i % 1000, "question_id": i, "due_at": datetime(2026, 1, 1) + timedelta(hours=i % 5000),
+             "interval_days": 1, "reps": 0, "lapses": 1}
+            for i in range(1, 50_001)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module", params=BACKENDS)
+def plan_db(request, tmp_path_factory):
+    if request.param == "sqlite":
+        url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    else:
+        url = os.environ["EXPLAIN_DATABASE_URL"]
+    engine = create_engine(url)
+    _seed(engine)
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+
+def hot_queries(db):
+    """(name, query) pairs mirroring the application's hot paths."""
+    listing = _filter_questions(db.query(*QUESTION_LIST_COLUMNS).filter(Question.approved == True),
+                                topic_id=17, difficulty=3)
+    sync = (
+        db.query(Question.id, Question.change_seq)
+        .join(Topic, Question.topic_id == Topic.id)
+        .filter(Question.change_seq > 990, Question.topic_id == 17)
+        .filter(or_(Question.change_seq > 995, and_(Question.change_seq == 995, Question.id > 10)))
+        .order_by(Question.change_seq, Question.id).limit(501)
+    )
+    return [
+        ("list approved page", db.query(*QUESTION_LIST_COLUMNS).filter(Question.approved == True, Question.id > 5000)
+            .order_by(Question.id).limit(101)),
+        ("list unapproved page", db.query(*QUESTION_LIST_COLUMNS).filter(Question.approved == False)
+            .order_by(Question.id).limit(101)),
+        ("list by topic and difficulty", listing.filter(Question.id > 100).order_by(Question.id).limit(101)),
+        ("list by branch", _filter_questions(db.query(Question.id).filter(Question.approved == True), branch_id=9)
+            .order_by(Question.id).limit(101)),
+        ("quiz hydrate", db.query(Question.id, Question.answer_key, Question.difficulty)
+            .filter(Question.id.in_([3, 50, 700]), Question.approved == True)),
+        ("pack by subject", packs._scoped(db.query(Question.id), "subject", 7).filter(Question.approved == True)),
+        ("pack by level", packs._scoped(db.query(Question.id), "level", "Form 3").filter(Question.approved == True)),
+        ("pack by topic", packs._scoped(db.query(Question.id), "topic", 17).filter(Question.approved == True)),
+        ("sync delta", sync),
+        ("quiz session lookup", db.query(Quiz_session).filter(Quiz_session.id == 42, Quiz_session.user_id == 43)),
+        ("user sessions", db.query(Quiz_session.id).filter(Quiz_session.user_id == 43).order_by(Quiz_session.id)),
+        ("offline result keys", db.query(Quiz_session.id).filter(Quiz_session.user_id == 43,
+                                                                 Quiz_session.client_key.in_(["k1", "k2"]))),
+        ("due reviews", review._due_query(db, 43, "topic", 17, datetime(2026, 3, 1)).limit(5)),
+        ("question responses", db.query(QuizResponse.correct)
+            .filter(QuizResponse.question_id == 42, QuizResponse.answered_at >= datetime(2026, 1, 2))),
+        ("student history", db.query(QuizResponse.question_id, QuizResponse.correct)
+            .filter(QuizResponse.user_id == 43).order_by(QuizResponse.answered_at.desc()).limit(50)),
+        ("student progress", db.query(ProgressRollup)
+            .filter(ProgressRollup.user_id == 43, ProgressRollup.scope == "topic").order_by(ProgressRollup.scope_id)),
+        ("class progress", db.query(ProgressRollup.user_id, ProgressRollup.correct)
+            .filter(ProgressRollup.scope == "subject", ProgressRollup.scope_id == 7, ProgressRollup.user_id > 100)
+            .order_by(ProgressRollup.user_id).limit(101)),
+        ("principal by email", db.query(User.id, User.role).filter(User.email == "u5@example.com")),
+        ("topics of level", db.query(Topic.id).join(Subject, Topic.subject_id == Subject.id)
+            .filter(Subject.level == "Form 2")),
+    ]
+
+
+def explain(db, query):
+    bind = db.get_bind()
+    sql = str(query.statement.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+    if bind.dialect.name == "sqlite":
+        return [row[-1] for row in db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+    return [row[0] for row in db.connection().exec_driver_sql("EXPLAIN " + sql)]
+
+
+def full_scans(plan):
+    # SQLite: "SCAN questions" without USING (covering) INDEX; Postgres: "Seq Scan on questions"
+    pattern = re.compile(r"^SCAN (\w+)$|Seq Scan on (\w+)")
+    return [line for line in plan if pattern.search(line.strip())]
+
+
+@pytest.mark.parametrize("name", [name for name, _ in hot_queries(Session())])
+def test_hot_query_uses_an_index(plan_db, name):
+    query = dict(hot_queries(plan_db))[name]
+    plan = explain(plan_db, query)
+    assert not full_scans(plan), f"{name} regressed to a table scan:\n" + "\n".join(plan)
@@ -1,4 +1,5 @@
 import json
+import os
 import pytest
 from app.models import Topic, Question
 from typing import List
@@ -62,3 +63,288 @@ def test_create_and_list_questions(client, teacher_token, topic, db_session):
     assert any(q["question_text"] == "What's 2+2?" for q in questions)
     # Verify options format
     assert all(isinstance(q["options"], list) for q in questions)
+
+
+def test_answer_key_written_on_create_and_backfilled(client, teacher_token, topic, db_session):
+    from app.db.backfill_answer_keys import backfill_answer_keys
+    from tests.conftest import TestingSessionLocal
+
+    resp = client.post("/questions", json={
+        "question_text": "Pick the primes",
+        "options": ["2", "3", "4", "2, 3"],
+        "correct_option": "2, 3",
+        "topic_id": topic.id
+    }, headers={"Authorization": f"Bearer {teacher_token}"})
+    assert resp.status_code == 200
+    question = db_session.get(Question, resp.json()["id"])
+    assert question.answer_key == "2 3"
+
+    # Simulate a row written before the column existed
+    question.answer_key = None
+    db_session.commit()
+    assert backfill_answer_keys(TestingSessionLocal, chunk_size=1) >= 1
+    db_session.expire_all()
+    assert db_session.get(Question, question.id).answer_key == "2 3"
+
+
+def test_list_questions_keyset_pages_and_filters(client, teacher_token, topic, db_session):
+    headers = {"Authorization": f"Bearer {teacher_token}"}
+    db_session.add_all([
+        Question(question_text=f"Q{i}", options=["a", "b"], correct_option="a", topic_id=topic.id,
+                 approved=True, difficulty=1 + i % 2, created_by=1)
+        for i in range(5)
+    ] + [Question(question_text="Pending", options=["a", "b"], correct_option="a", topic_id=topic.id,
+                  approved=False, difficulty=1, created_by=1)])
+    db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        url = f"/questions/?topic_id={topic.id}&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200
+        seen += [q["question_text"] for q in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [f"Q{i}" for i in range(5)]
+
+    hard = client.get(f"/questions/?topic_id={topic.id}&difficulty=2", headers=headers).json()
+    assert [q["question_text"] for q in hard] == ["Q1", "Q3"]
+
+    unapproved = client.get("/questions/unapproved", headers=headers)
+    assert unapproved.status_code == 200
+    assert ["a", "b"] in [q["options"] for q in unapproved.json()]
+
+
+def test_export_streams_ndjson_and_csv(client, teacher_token, topic, db_session):
+    import csv
+    headers = {"Authorization": f"Bearer {teacher_token}"}
+    db_session.add_all([
+        Question(question_text=f"Export {i}", options=["x", "y, z"], correct_option="x", topic_id=topic.id,
+                 approved=i % 2 == 0, difficulty=3, created_by=1)
+        for i in range(3)
+    ])
+    db_session.commit()
+
+    resp = client.get(f"/questions/export?topic_id={topic.id}&approved=true", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["question_text"] for r in rows if r["question_text"].startswith("Export")] == ["Export 0", "Export 2"]
+
+    resp = client.get(f"/questions/export?topic_id={topic.id}&format=csv", headers=headers)
+    assert resp.status_code == 200
+    records = list(csv.DictReader(resp.text.splitlines()))
+    exported = [r for r in records if r["question_text"].startswith("Export")]
+    assert len(exported) == 3 and json.loads(exported[0]["options"]) == ["x", "y, z"]
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+@pytest.mark.skipif(not os.getenv("EDUZ_SCALE_TESTS"), reason="set EDUZ_SCALE_TESTS=1 to run scale tests")
+def test_export_of_1m_rows_stays_under_rss_ceiling(tmp_path):
+    from sqlalchemy import create_engine, insert
+    from app.api.questions import iter_export
+    from app.models import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, 1_000_000, 50_000):
+            conn.execute(insert(Question), [
+                {"question_text": f"Synthetic question {i}", "options": ["a", "b", "c", "d"], "correct_option": "a",
+                 "topic_id": 1 + i % 100, "created_by": 1, "approved": True, "difficulty": 1 + i % 6, "change_seq": 1}
+                for i in range(start, start + 50_000)
+            ])
+
+    baseline, peak, rows = _rss_mb(), 0.0, 0
+    for chunk in iter_export(engine, "ndjson"):
+        rows += chunk.count("\n")
+        peak = max(peak, _rss_mb())
+    engine.dispose()
+    assert rows == 1_000_000
+    assert peak - baseline < 64, f"export grew RSS by {peak - baseline:.1f} MB"
+
+
+def test_import_csv_and_json_with_row_errors(client, teacher_token, topic, db_session):
+    from app.models import Subject
+    headers = {"Authorization": f"Bearer {teacher_token}"}
+    subject = Subject(name="Import Physics", level="Form 5")
+    db_session.add(subject)
+    db_session.commit()
+    optics = Topic(name="Optics Import", subject_id=subject.id)
+    db_session.add(optics)
+    db_session.commit()
+
+    body = (
+        "question_text,options,correct_option,topic,subject,topic_id,difficulty\n"
+        'Lens type?,"[""convex"", ""concave""]",convex,Optics Import,Import Physics,,2\n'
+        "Mirror?,plane|curved,plane,,,{tid},\n"
+        "Bad answer,a|b,c,,,{tid},\n"
+        "Unknown topic,a|b,a,Nowhere,,,\n"
+    ).format(tid=topic.id)
+    resp = client.post("/questions/import", headers=headers,
+                       files={"file": ("bank.csv", body.encode(), "text/csv")})
+    assert resp.status_code == 200, resp.text
+    report = resp.json()
+    assert report["imported"] == 2 and report["failed"] == 2
+    assert [e["row"] for e in report["errors"]] == [3, 4]
+    assert "unknown topic" in report["errors"][1]["errors"][0]
+
+    lens = db_session.query(Question).filter_by(question_text="Lens type?").one()
+    assert lens.topic_id == optics.id and lens.difficulty == 2 and not lens.approved
+    assert lens.answer_key == "convex" and lens.change_seq > 0
+
+    rows = [{"question_text": f"JSON {i}", "options": ["x", "y"], "correct_option": "y", "topic_id": topic.id}
+            for i in range(3)]
+    rows.append({"question_text": "JSON bad", "options": 5, "correct_option": "5", "topic_id": topic.id})
+    resp = client.post("/questions/import?format=json", headers=headers,
+                       files={"file": ("bank.txt", json.dumps(rows).encode(), "application/json")})
+    assert resp.json() == {"imported": 3, "duplicates": 0, "failed": 1,
+                           "errors": [{"row": 4, "errors": ["options must be a list or a string"]}]}
+
+    resp = client.post("/questions/import", headers=headers, files={"file": ("bank.xml", b"<x/>", "text/xml")})
+    assert resp.status_code == 400
+
+
+def test_duplicates_rejected_skipped_merged_and_collapsed(client, teacher_token, topic, db_session):
+    from app.db.dedupe_questions import dedupe_questions
+    from tests.conftest import TestingSessionLocal
+    headers = {"Authorization": f"Bearer {teacher_token}"}
+    payload = {"question_text": "Capital of Cameroon?", "options": ["Yaounde", "Douala"],
+               "correct_option": "Yaounde", "topic_id": topic.id}
+    assert client.post("/questions", json=payload, headers=headers).status_code == 200
+    # Case, spacing and option order do not make a new question
+    variant = dict(payload, question_text="capital of  CAMEROON?", options=["Douala", "Yaounde"])
+    assert client.post("/questions", json=variant, headers=headers).status_code == 409
+
+    rows = [dict(variant, difficulty=5), {**payload, "question_text": "Largest city of Cameroon?",
+                                          "correct_option": "Douala"}]
+    upload = {"file": ("dupes.json", json.dumps(rows).encode(), "application/json")}
+    report = client.post("/questions/import", headers=headers, files=upload).json()
+    assert (report["imported"], report["duplicates"]) == (1, 1)
+    report = client.post("/questions/import?on_duplicate=merge", headers=headers, files=upload).json()
+    assert (report["imported"], report["duplicates"]) == (0, 2)
+    original = db_session.query(Question).filter_by(question_text="Capital of Cameroon?").one()
+    db_session.refresh(original)
+    assert original.difficulty == 5
+
+    # Rows written before the hash existed are collapsed by the one-off job
+    from sqlalchemy import insert
+    legacy = db_session.execute(insert(Question).returning(Question.id), [
+        {"question_text": "Legacy dup", "options": ["a", "b"], "correct_option": "a", "topic_id": topic.id,
+         "approved": approved, "created_by": 1} for approved in (False, True)
+    ]).scalars().all()
+    db_session.commit()
+    assert dedupe_questions(TestingSessionLocal, chunk_size=1)["collapsed"] >= 1
+    db_session.expire_all()
+    kept, dup = db_session.get(Question, min(legacy)), db_session.get(Question, max(legacy))
+    assert kept.content_hash and kept.approved
+    assert dup.duplicate_of == kept.id and not dup.approved and dup.content_hash is None
+
+
+def test_taxonomy_endpoints_are_cached_with_etags(client, teacher_token):
+    headers = {"Authorization": f"Bearer {teacher_token}"}
+    subject = client.post("/questions/subjects", json={"name": "History", "level": "Form 9"}, headers=headers).json()
+
+    resp = client.get("/questions/topics/by_level/Form 9")
+    assert resp.status_code == 200 and resp.json() == []
+    etag = resp.headers["etag"]
+    assert client.get("/questions/topics/by_level/Form 9", headers={"If-None-Match": etag}).status_code == 304
+
+    # Creating a topic invalidates the cache, so the same ETag now gets the new body
+    client.post("/questions/topics", json={"name": "Empires", "subject_id": subject["id"], "level": "Form 9"},
+                headers=headers)
+    resp = client.get("/questions/topics/by_level/Form 9", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["etag"] != etag
+    assert [t["name"] for t in resp.json()] == ["Empires"]
+    assert subject in client.get("/questions/subjects/by_level/Form 9").json()
+
+
+def test_systems_catalogue_tracks_question_writes(client, teacher_token, topic, db_session):
+    from app.db.rebuild_systems import rebuild_systems
+    from app.models import SystemEntry
+    from tests.conftest import TestingSessionLocal
+    headers = {"Authorization": f"Bearer {teacher_token}"}
+    for i, system in enumerate(["GCE Catalogue", "GCE Catalogue", "WAEC Catalogue"]):
+        resp = client.post("/questions", json={"question_text": f"System question {i}", "options": ["a", "b"],
+                                               "correct_option": "a", "topic_id": topic.id, "systems": system},
+                           headers=headers)
+        assert resp.status_code == 200
+    systems = client.get("/questions/systems").json()
+    assert {"GCE Catalogue", "WAEC Catalogue"} <= set(systems)
+    assert db_session.get(SystemEntry, "GCE Catalogue").question_count == 2
+
+    # Moving the only WAEC question to another system drops WAEC from the catalogue
+    q = db_session.query(Question).filter_by(systems="WAEC Catalogue").one()
+    q.systems = "GCE Catalogue"
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(SystemEntry, "WAEC Catalogue") is None
+    assert db_session.get(SystemEntry, "GCE Catalogue").question_count == 3
+
+    # A drifted count is repaired by the rebuild command
+    db_session.get(SystemEntry, "GCE Catalogue").question_count = 99
+    db_session.commit()
+    rebuild_systems(TestingSessionLocal)
+    db_session.expire_all()
+    assert db_session.get(SystemEntry, "GCE Catalogue").question_count == 3
+
+
+def test_item_statistics_full_and_incremental(client, teacher_token, topic, db_session, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.db import compute_question_stats as job
+    from app.models import QuizResponse, Quiz_session
+    from tests.conftest import TestingSessionLocal
+    monkeypatch.setattr(job, "SETTLE_SECONDS", 0)
+    good, broken, anchor, anchor2 = [
+        Question(question_text=f"Item analysis {name}?", options=["alpha", "beta", "gamma"], correct_option="alpha",
+                 topic_id=topic.id, approved=True, difficulty=3, created_by=1)
+        for name in ("good", "broken", "anchor", "anchor 2")
+    ]
+    db_session.add_all([good, broken, anchor, anchor2])
+    db_session.commit()
+
+    def add_session(strong, submitted_at):
+        # Strong students answer the good and anchor items right; the broken item's key trips them up
+        session = Quiz_session(user_id=1, topic_id=topic.id, ended_at=submitted_at, submitted_at=submitted_at)
+        db_session.add(session)
+        db_session.flush()
+        db_session.add_all(
+            QuizResponse(session_id=session.id, question_id=q.id, user_id=1, correct=right,
+                         selected="alpha" if right else "beta", time_ms=time_ms, answered_at=submitted_at)
+            for q, right, time_ms in ((good, strong, 10_000), (anchor, strong, 20_000),
+                                      (anchor2, strong, 20_000), (broken, not strong, None))
+        )
+
+    past = datetime.utcnow() - timedelta(hours=1)
+    for i in range(10):
+        add_session(i % 2 == 0, past)
+    db_session.commit()
+    job.compute_question_stats(TestingSessionLocal)
+
+    headers = {"Authorization": f"Bearer {teacher_token}"}
+    stats = client.get(f"/questions/{good.id}/stats", headers=headers).json()
+    assert stats["responses"] == 10 and stats["p_value"] == 0.5 and stats["discrimination"] > 0.9
+    assert [o["count"] for o in stats["options"]] == [5, 5, 0] and stats["other"] == 0
+    assert 9_000 < stats["median_time_ms"] < 11_000
+    broken_stats = client.get(f"/questions/{broken.id}/stats", headers=headers).json()
+    assert broken_stats["discrimination"] < 0 and "negative_discrimination" in broken_stats["flags"]
+    assert broken_stats["median_time_ms"] is None
+
+    report = client.get("/questions/stats", params={"topic_id": topic.id, "min_responses": 5}, headers=headers)
+    assert report.status_code == 200
+    assert report.json()[0]["question_id"] == broken.id
+    assert client.get(f"/questions/{good.id}/stats").status_code == 401
+
+    # Incremental runs fold in only sessions submitted since the last run
+    for _ in range(2):
+        add_session(True, datetime.utcnow())
+    db_session.commit()
+    assert job.compute_question_stats(TestingSessionLocal, incremental=True)["sessions"] == 2
+    assert job.compute_question_stats(TestingSessionLocal, incremental=True)["sessions"] == 0
+    stats = client.get(f"/questions/{good.id}/stats", headers=headers).json()
+    assert stats["responses"] == 12 and stats["p_value"] == 7 / 12
@@ -67,3 +67,169 @@ def test_start_and_complete_quiz(client, student_token):
 
     # you’d add test for /quiz/submit here once implemented
     # e.g. resp2 = client.post("/quiz/submit", ...)
+
+def test_start_quiz_samples_distinct_questions_from_scope(client, student_token, db_session):
+    from app.models import Topic, Question
+    sub = Subject(name="Geography", level="Grade 2")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Rivers", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    ids = set()
+    for i, d in enumerate((1, 2, 3, 3, 5, 6)):
+        q = Question(question_text=f"River {i}", options=["a", "b"], correct_option="a",
+                     topic_id=topic.id, approved=True, difficulty=d, created_by=1)
+        db_session.add(q)
+        db_session.commit()
+        ids.add(q.id)
+
+    resp = client.post(
+        "/quiz/start",
+        json={"subject_id": sub.id, "num_questions": 4, "level": "Grade 2"},
+        headers={"Authorization": f"Bearer {student_token}"}
+    )
+    assert resp.status_code == 200
+    served = [q["id"] for q in resp.json()["questions"]]
+    assert len(served) == 4 and len(set(served)) == 4
+    assert set(served) <= ids
+
+    # A level that does not match the subject yields nothing
+    resp = client.post(
+        "/quiz/start",
+        json={"subject_id": sub.id, "level": "Grade 9"},
+        headers={"Authorization": f"Bearer {student_token}"}
+    )
+    assert resp.status_code == 404
+
+def test_difficulty_walk_prefers_nearest_easier_bucket():
+    from app.core.question_index import difficulty_walk
+    assert list(difficulty_walk({1: 1, 2: 1, 3: 1, 4: 1, 6: 1})) == [3, 2, 1, 4, 6]
+    assert list(difficulty_walk({5: 2, 6: 1})) == [5, 6]
+
+def test_submit_grades_only_served_questions(client, student_token, db_session):
+    from app.models import Topic, Question, Quiz_session
+    sub = Subject(name="Physics", level="Grade 3")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Optics", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    served_q = Question(question_text="Lens?", options=["A) convex", "B) flat"], correct_option='"A, C"',
+                        topic_id=topic.id, approved=True, difficulty=3, created_by=1)
+    extra_q = Question(question_text="Easy?", options=["yes", "no"], correct_option="yes",
+                       topic_id=topic.id, approved=False, difficulty=1, created_by=1)
+    db_session.add_all([served_q, extra_q])
+    db_session.commit()
+
+    headers = {"Authorization": f"Bearer {student_token}"}
+    start = client.post("/quiz/start", json={"topic_id": topic.id, "num_questions": 1}, headers=headers).json()
+    session_id = start["quiz_session_id"]
+    manifest = db_session.get(Quiz_session, session_id).manifest
+    assert manifest["ids"] == [served_q.id]
+    assert manifest["answers"] == ["a c"]
+
+    resp = client.post("/quiz/submit", json={
+        "quiz_session_id": session_id,
+        "answers": [
+            {"question_id": served_q.id, "selected_option": "c,a"},
+            # Never served: must not count towards the score
+            {"question_id": extra_q.id, "selected_option": "yes"},
+        ],
+    }, headers=headers)
+    assert resp.status_code == 200
+    result = resp.json()["quiz_session"]
+    assert result["correct_answers"] == 1
+    assert result["total_questions"] == 1
+    assert result["score"] == 100
+
+def test_quiz_starts_near_ability_and_submit_updates_it(client, student_token, db_session):
+    from app.models import Topic, Question, Quiz_session, QuizResponse, UserProgress
+    sub = Subject(name="Geology", level="Grade 2")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Rocks", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    questions = [
+        Question(question_text=f"Rock {d}?", options=["igneous", "other"], correct_option="igneous",
+                 topic_id=topic.id, approved=True, difficulty=d, created_by=1)
+        for d in range(1, 7)
+    ]
+    db_session.add_all(questions)
+    db_session.commit()
+    user = db_session.query(User).filter_by(email="quizstud@example.com").first()
+    progress = db_session.query(UserProgress).filter_by(user_id=user.id).first()
+    if progress is None:
+        progress = UserProgress(user_id=user.id)
+        db_session.add(progress)
+    progress.ability, progress.ability_var = 1.5, 0.5  # difficulty_level(1.5) == 5
+    db_session.commit()
+
+    headers = {"Authorization": f"Bearer {student_token}"}
+    start = client.post("/quiz/start", json={"topic_id": topic.id, "num_questions": 2}, headers=headers).json()
+    session = db_session.get(Quiz_session, start["quiz_session_id"])
+    assert session.manifest["difficulty"] == [5, 4]
+
+    resp = client.post("/quiz/submit", json={
+        "quiz_session_id": session.id,
+        "answers": [{"question_id": q["id"], "selected_option": "igneous"} for q in start["questions"]],
+    }, headers=headers)
+    assert resp.status_code == 200
+    db_session.expire_all()
+    answered = (db_session.query(Question.difficulty, QuizResponse.correct)
+                .join(Question, Question.id == QuizResponse.question_id)
+                .filter(QuizResponse.session_id == session.id).all())
+    assert sorted(answered) == [(4, True), (5, True)]
+    progress = db_session.query(UserProgress).filter_by(user_id=user.id).first()
+    assert progress.ability > 1.5 and progress.ability_var < 0.5
+
+def test_missed_questions_come_back_as_due_reviews(client, student_token, db_session):
+    from datetime import datetime, timedelta
+    from app.core.review import record_reviews
+    from app.models import Topic, Question, Quiz_session, ReviewItem
+    sub = Subject(name="Biology", level="Grade 4")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Cells", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    questions = [Question(question_text=f"Organelle {i}?", options=["yes", "no"], correct_option="yes",
+                          topic_id=topic.id, approved=True, difficulty=1 + i, created_by=1) for i in range(4)]
+    db_session.add_all(questions)
+    db_session.commit()
+    user = db_session.query(User).filter_by(email="quizstud@example.com").first()
+    headers = {"Authorization": f"Bearer {student_token}"}
+    missed = questions[3]
+
+    start = client.post("/quiz/start", json={"topic_id": topic.id, "num_questions": 4}, headers=headers).json()
+    client.post("/quiz/submit", json={"quiz_session_id": start["quiz_session_id"], "answers": [
+        {"question_id": q["id"], "selected_option": "no" if q["id"] == missed.id else "yes"}
+        for q in start["questions"]
+    ]}, headers=headers)
+    item = db_session.query(ReviewItem).filter_by(user_id=user.id, question_id=missed.id).one()
+    assert item.interval_days == 1 and item.lapses == 1
+    assert db_session.query(ReviewItem).filter_by(user_id=user.id).count() == 1
+
+    # Not due yet: a review quiz is an ordinary quiz
+    start = client.post("/quiz/start", json={"topic_id": topic.id, "num_questions": 2, "include_reviews": True},
+                        headers=headers).json()
+    item.due_at = datetime.utcnow() - timedelta(minutes=1)
+    db_session.commit()
+    start = client.post("/quiz/start", json={"topic_id": topic.id, "num_questions": 2, "include_reviews": True},
+                        headers=headers).json()
+    manifest = db_session.get(Quiz_session, start["quiz_session_id"]).manifest
+    assert manifest["ids"][0] == missed.id and len(manifest["ids"]) == 2
+
+    client.post("/quiz/submit", json={"quiz_session_id": start["quiz_session_id"], "answers": [
+        {"question_id": qid, "selected_option": "yes"} for qid in manifest["ids"]
+    ]}, headers=headers)
+    db_session.expire_all()
+    item = db_session.query(ReviewItem).filter_by(user_id=user.id, question_id=missed.id).one()
+    assert item.interval_days == 2.5 and item.reps == 1 and item.due_at > datetime.utcnow() + timedelta(days=2)
+
+    # Correct answers keep stretching the interval until the question is learnt and leaves the queue
+    right = [{"question_id": missed.id, "difficulty": 4, "correct": True}]
+    record_reviews(db_session, user.id, [(right, datetime.utcnow())] * 3)  # 6.25, 15.6, then 39 > 30 days
+    db_session.commit()
+    assert db_session.query(ReviewItem).filter_by(user_id=user.id).count() == 0
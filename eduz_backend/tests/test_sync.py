@@ -0,0 +1,172 @@
+import pytest
+from app.models import Subject, Topic, Question
+
+
+@pytest.fixture
+def headers(client, db_session):
+    from app.models import User
+    client.post("/users/register", json={
+        "email": "syncteach@example.com",
+        "name": "SyncTeach",
+        "role": "student",
+        "password": "Secret123!"
+    })
+    user = db_session.query(User).filter_by(email="syncteach@example.com").first()
+    user.role = "teacher"
+    db_session.commit()
+    login = client.post("/users/login", data={"username": "syncteach@example.com", "password": "Secret123!"})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def test_delta_sync_returns_only_changes_since_version(client, headers, db_session):
+    sub = Subject(name="Biology", level="Form 4")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Cells", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    questions = [
+        Question(question_text=f"Cell {i}?", options=["a", "b"], correct_option="a",
+                 topic_id=topic.id, approved=True, difficulty=2, created_by=1)
+        for i in range(3)
+    ]
+    db_session.add_all(questions)
+    db_session.commit()
+
+    # Full download in pages of two
+    first = client.get(f"/sync/questions?subject_id={sub.id}&limit=2", headers=headers).json()
+    assert len(first["questions"]) == 2 and first["next_cursor"] and first["version"] is None
+    assert [t["name"] for t in first["topics"]] == ["Cells"]
+    second = client.get(f"/sync/questions?subject_id={sub.id}&limit=2&cursor={first['next_cursor']}", headers=headers).json()
+    assert len(second["questions"]) == 1 and second["next_cursor"] is None
+    version = second["version"]
+
+    # Nothing changed: empty delta
+    empty = client.get(f"/sync/questions?subject_id={sub.id}&since={version}", headers=headers).json()
+    assert empty["questions"] == [] and empty["topics"] == [] and empty["version"] == version
+
+    # Unapproving a question shows up as a removal
+    resp = client.post(f"/questions/{questions[0].id}/unapprove", headers=headers)
+    assert resp.status_code == 200
+    delta = client.get(f"/sync/questions?subject_id={sub.id}&since={version}", headers=headers).json()
+    assert delta["removed_question_ids"] == [questions[0].id]
+    assert delta["questions"] == []
+    assert delta["version"] > version
+
+    # Re-tagging a question out of the scope is a removal there and an addition in its new scope
+    other = Subject(name="Biology", level="Form 5")
+    db_session.add(other)
+    db_session.commit()
+    genetics = Topic(name="Genetics", subject_id=other.id)
+    db_session.add(genetics)
+    db_session.commit()
+    version = delta["version"]
+    questions[1].topic_id = genetics.id
+    db_session.commit()
+    moved = client.get(f"/sync/questions?subject_id={sub.id}&since={version}", headers=headers).json()
+    assert moved["removed_question_ids"] == [questions[1].id] and moved["questions"] == []
+    level = client.get(f"/sync/questions?level=Form 5&since={version}", headers=headers).json()
+    assert [q["id"] for q in level["questions"]] == [questions[1].id] and level["removed_question_ids"] == []
+
+    # So is moving the whole topic to another subject
+    version = moved["version"]
+    topic.subject_id = other.id
+    db_session.commit()
+    moved = client.get(f"/sync/questions?level=Form 4&since={version}", headers=headers).json()
+    assert moved["removed_question_ids"] == [questions[0].id, questions[2].id]
+
+
+def test_offline_results_upload_is_idempotent(client, headers, db_session):
+    from app.models import Quiz_session, QuizResponse, User, UserProgress
+    sub = Subject(name="Chemistry", level="Form 4")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Acids", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    q1 = Question(question_text="pH of water?", options=["7", "1"], correct_option="7",
+                  topic_id=topic.id, approved=True, difficulty=3, created_by=1)
+    q2 = Question(question_text="Litmus in acid?", options=["red", "blue"], correct_option="red",
+                  topic_id=topic.id, approved=True, difficulty=4, created_by=1)
+    db_session.add_all([q1, q2])
+    db_session.commit()
+
+    batch = {"results": [
+        {"client_key": "dev1-001", "topic_id": topic.id, "started_at": "2026-01-01T10:00:00",
+         "ended_at": "2026-01-01T10:05:00",
+         "answers": [{"question_id": q1.id, "selected_option": "7"},
+                     {"question_id": q2.id, "selected_option": "Red"}]},
+        {"client_key": "dev1-002", "topic_id": topic.id, "started_at": "2026-01-02T10:00:00",
+         "ended_at": "2026-01-02T10:05:00",
+         "answers": [{"question_id": q1.id, "selected_option": "1"}]},
+    ]}
+    first = client.post("/sync/results", json=batch, headers=headers)
+    assert first.status_code == 200, first.text
+    items = {i["client_key"]: i for i in first.json()["results"]}
+    assert not items["dev1-001"]["duplicate"] and items["dev1-001"]["score"] == 100
+    assert items["dev1-002"]["correct_answers"] == 0
+
+    # Retrying the same batch (e.g. after a dropped response) inserts nothing new
+    retry = client.post("/sync/results", json=batch, headers=headers)
+    assert retry.status_code == 200
+    again = {i["client_key"]: i for i in retry.json()["results"]}
+    assert all(i["duplicate"] for i in again.values())
+    assert again["dev1-001"]["quiz_session_id"] == items["dev1-001"]["quiz_session_id"]
+
+    user = db_session.query(User).filter_by(email="syncteach@example.com").first()
+    db_session.expire_all()
+    sessions = db_session.query(Quiz_session).filter_by(user_id=user.id).all()
+    assert len(sessions) == 2
+    stored = next(s for s in sessions if s.client_key == "dev1-001")
+    answered = db_session.query(QuizResponse.question_id, QuizResponse.correct).filter_by(session_id=stored.id)
+    assert dict(answered.all()) == {q1.id: True, q2.id: True}
+    # Progress applied once per session, in ended_at order: two right answers raise the
+    # ability, the later wrong one pulls it back without undoing the gain
+    progress = db_session.query(UserProgress).filter_by(user_id=user.id).first()
+    assert 0 < progress.ability < 1 and progress.ability_var < 1
+    assert progress.current_difficulty == 4 and progress.incorrect_streak == 1
+
+
+def test_offline_results_upload_handles_overlap_and_unknown_ids(client, headers, db_session, monkeypatch):
+    import app.api.sync as sync_api
+    from app.models import Quiz_session
+    sub = Subject(name="Biology", level="Form 4")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Cells", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    question = Question(question_text="Powerhouse of the cell?", options=["mitochondria", "nucleus"],
+                        correct_option="mitochondria", topic_id=topic.id, approved=True, difficulty=3, created_by=1)
+    db_session.add(question)
+    db_session.commit()
+
+    def result(key, **scope):
+        return {"client_key": key, "started_at": "2026-02-01T10:00:00", "ended_at": "2026-02-01T10:05:00",
+                "answers": [{"question_id": question.id, "selected_option": "mitochondria"}], **scope}
+
+    bad = client.post("/sync/results", json={"results": [result("dev2-000", topic_id=topic.id),
+                                                         result("dev2-bad", topic_id=topic.id + 1000)]},
+                      headers=headers)
+    assert bad.status_code == 404 and str(topic.id + 1000) in bad.json()["detail"]
+    assert db_session.query(Quiz_session).filter(Quiz_session.client_key.like("dev2-%")).count() == 0
+
+    first = client.post("/sync/results", json={"results": [result("dev2-001", topic_id=topic.id)]}, headers=headers)
+    assert first.status_code == 200
+
+    # A concurrent upload of dev2-001 commits between the duplicate lookup and the insert
+    lookup, calls = sync_api._existing_sessions, []
+
+    def late_lookup(db, user_id, keys):
+        calls.append(keys)
+        return {} if len(calls) == 1 else lookup(db, user_id, keys)
+
+    monkeypatch.setattr(sync_api, "_existing_sessions", late_lookup)
+    overlap = client.post("/sync/results", json={"results": [result("dev2-001", topic_id=topic.id),
+                                                             result("dev2-002", topic_id=topic.id)]},
+                          headers=headers)
+    assert overlap.status_code == 200, overlap.text
+    items = {i["client_key"]: i for i in overlap.json()["results"]}
+    assert items["dev2-001"]["duplicate"] and items["dev2-001"]["quiz_session_id"] == \
+        first.json()["results"][0]["quiz_session_id"]
+    assert not items["dev2-002"]["duplicate"] and items["dev2-002"]["score"] == 100
@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from app.core import tasks
+from app.models import OutboxTask, Question, ReviewItem, Subject, Topic, User
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def student(client, db_session):
+    client.post("/users/register", json={"email": "taskstud@example.com", "name": "TaskStud", "role": "student",
+                                         "password": "Secret123!"})
+    login = client.post("/users/login", data={"username": "taskstud@example.com", "password": "Secret123!"})
+    user = db_session.query(User).filter_by(email="taskstud@example.com").first()
+    return user.id, {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def test_submission_effects_are_deferred_to_the_outbox(client, student, db_session, monkeypatch):
+    monkeypatch.setattr(tasks, "TASK_MODE", "background")
+    user_id, headers = student
+    sub = Subject(name="Physics", level="Form 5")
+    db_session.add(sub)
+    db_session.commit()
+    topic = Topic(name="Optics", subject_id=sub.id)
+    db_session.add(topic)
+    db_session.commit()
+    question = Question(question_text="Does light bend in water?", options=["yes", "no"], correct_option="yes",
+                        topic_id=topic.id, approved=True, difficulty=3, created_by=1)
+    db_session.add(question)
+    db_session.commit()
+
+    start = client.post("/quiz/start", json={"topic_id": topic.id, "num_questions": 1}, headers=headers).json()
+    resp = client.post("/quiz/submit", json={"quiz_session_id": start["quiz_session_id"], "answers": [
+        {"question_id": question.id, "selected_option": "no"}]}, headers=headers)
+    assert resp.status_code == 200 and resp.json()["quiz_session"]["score"] == 0
+
+    # The session is committed; the review queue is not updated yet
+    pending = db_session.query(OutboxTask).filter_by(kind="quiz_submitted").all()
+    assert [t.payload for t in pending] == [{"quiz_session_id": start["quiz_session_id"]}]
+    assert db_session.query(ReviewItem).filter_by(user_id=user_id).count() == 0
+
+    db = TestingSessionLocal()
+    try:
+        assert tasks.run_pending(db) == 1
+    finally:
+        db.close()
+    assert db_session.query(ReviewItem).filter_by(user_id=user_id, question_id=question.id).count() == 1
+    assert db_session.query(OutboxTask).filter_by(kind="quiz_submitted").count() == 0
+
+
+def test_failing_tasks_are_retried_then_parked(db_session, monkeypatch):
+    done = []
+
+    def flaky(db, payloads):
+        if any(p.get("fail") for p in payloads):
+            raise ValueError("boom")
+        done.extend(payloads)
+
+    monkeypatch.setitem(tasks._handlers, "test_flaky", flaky)
+    monkeypatch.setattr(tasks, "MAX_ATTEMPTS", 2)
+    tasks.enqueue(db_session, "test_flaky", [{"n": 1}, {"n": 2, "fail": True}, {"n": 3}])
+    db_session.commit()
+
+    # The bad task does not hold back the rest of its batch
+    assert tasks.run_pending(db_session) == 3
+    assert done == [{"n": 1}, {"n": 3}]
+    bad = db_session.query(OutboxTask).filter_by(kind="test_flaky").one()
+    assert bad.attempts == 1 and "boom" in bad.last_error and bad.available_at > datetime.utcnow()
+
+    # Not due again until its backoff has passed; parked after MAX_ATTEMPTS
+    assert tasks.run_pending(db_session) == 0
+    assert tasks.run_pending(db_session, now=datetime.utcnow() + timedelta(hours=1)) == 1
+    db_session.expire_all()
+    bad = db_session.query(OutboxTask).filter_by(kind="test_flaky").one()
+    assert bad.attempts == 2 and bad.available_at is None
+    db_session.delete(bad)
+    db_session.commit()
+
+
+def test_worker_thread_drains_the_outbox(db_session, monkeypatch):
+    seen = []
+    monkeypatch.setitem(tasks._handlers, "test_worker", lambda db, payloads: seen.extend(payloads))
+    monkeypatch.setattr(tasks, "BATCH_DELAY_SECONDS", 0.01)
+    worker = tasks.TaskWorker(TestingSessionLocal)
+    worker.start()
+    try:
+        tasks.enqueue(db_session, "test_worker", [{"n": n} for n in range(5)])
+        db_session.commit()
+        worker.notify()
+        deadline = time.monotonic() + 5
+        while len(seen) < 5 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        worker.stop()
+    assert seen == [{"n": n} for n in range(5)]
+    assert db_session.query(OutboxTask).filter_by(kind="test_worker").count() == 0
@@ -82,4 +82,81 @@ def test_admin_promote_flow(client, admin_token):
         f"/users/{dave_id}/promote?new_role=teacher",
         headers={"Authorization": f"Bearer {admin_token}"}
     )
-    assert promote_resp.status_code == 200
\ No newline at end of file
+    assert promote_resp.status_code == 200
+
+
+def test_warm_request_does_not_query_users(client):
+    from sqlalchemy import event
+    from tests import conftest
+    # Route handlers run on the async engine in DB_MODE=async
+    engine = conftest.async_engine.sync_engine if conftest.DB_MODE == "async" else conftest.engine
+
+    client.post("/users/register", json={
+        "email": "erin@example.com",
+        "name": "Erin",
+        "role": "student",
+        "password": "Secret123!"
+    })
+    token = client.post("/users/login", data={
+        "username": "erin@example.com", "password": "Secret123!"
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert client.get("/users/me", headers=headers).status_code == 200  # cold: one lookup
+        cold = [s for s in statements if "FROM users" in s]
+        statements.clear()
+        assert client.get("/users/me", headers=headers).status_code == 200
+        warm = [s for s in statements if "FROM users" in s]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert len(cold) == 1
+    assert warm == []
+
+
+def test_login_upgrades_hash_to_configured_cost(client, db_session):
+    from app.core import security
+    client.post("/users/register", json={
+        "email": "frank@example.com",
+        "name": "Frank",
+        "role": "student",
+        "password": "Secret123!"
+    })
+    user = db_session.query(models.User).filter_by(email="frank@example.com").first()
+    user.password_hash = security.build_context("sha256_crypt", 1000).hash("Secret123!")
+    db_session.commit()
+    old_hash = user.password_hash
+
+    security.configure("sha256_crypt", 2000)
+    try:
+        resp = client.post("/users/login", data={"username": "frank@example.com", "password": "Secret123!"})
+        assert resp.status_code == 200
+    finally:
+        security.configure()
+    db_session.expire_all()
+    new_hash = db_session.query(models.User).filter_by(email="frank@example.com").first().password_hash
+    assert new_hash != old_hash
+    assert "rounds=2000" in new_hash
+    assert verify_password("Secret123!", new_hash)
+    assert security.hash_pool.stats()["completed"] > 0
+
+
+def test_process_hash_pool_follows_configure():
+    import asyncio
+    from app.core import security
+    pool = security.HashPool(workers=1, max_pending=4, kind="process")
+    security.configure("sha256_crypt", 1000)
+    try:
+        async def hash_once():
+            return await pool.run(security._with_settings, security._settings, security.hash_password, "Secret123!")
+
+        assert "rounds=1000" in asyncio.run(hash_once())  # starts the worker with these settings
+        security.configure("sha256_crypt", 2000)
+        assert "rounds=2000" in asyncio.run(hash_once())
+    finally:
+        security.configure()
+        pool._get_executor().shutdown()